@@ -10,6 +10,8 @@ class ProfileInline(admin.StackedInline):
     can_delete = False
     verbose_name_plural = 'Профиль'
     fk_name = 'user'
+    # баланс меняется только движениями журнала BalanceEntry (orders/ledger.py)
+    readonly_fields = ('balance',)
 
 
 class UserAdmin(BaseUserAdmin):
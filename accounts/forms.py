@@ -1,7 +1,10 @@
 from django import forms
+from django.template import loader
 from django.core.validators import RegexValidator
+from django.contrib.auth.forms import PasswordResetForm
 
 from orders.forms import ChoiceField
+from orders.outbox import queue_email
 from orders.models import PaymentMethod
 
 
@@ -123,6 +126,11 @@ class BalanceForm(forms.Form):
         empty_label=None,
         label='Payment Method',
     )
+    idempotency_key = forms.CharField(
+        required=False,
+        max_length=64,
+        widget=forms.HiddenInput(),
+    )
 
 
 class ChangePasswordForm(forms.Form):
@@ -137,3 +145,12 @@ class ChangePasswordForm(forms.Form):
         label="New Password",
         widget=forms.PasswordInput(attrs={'class': 'Input', 'placeholder': '******', 'id': 'password2'})
     )
+
+
+class OutboxPasswordResetForm(PasswordResetForm):
+    """ Форма сброса пароля: письмо уходит через outbox, а не по SMTP в процессе запроса """
+    def send_mail(self, subject_template_name, email_template_name, context, from_email, to_email,
+                  html_email_template_name=None):
+        subject = ''.join(loader.render_to_string(subject_template_name, context).splitlines())
+        body = loader.render_to_string(email_template_name, context)
+        queue_email(subject, body, [to_email], from_email)
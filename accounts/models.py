@@ -28,5 +28,65 @@ class Profile(models.Model):
         verbose_name = "Профиль"
         verbose_name_plural = "Профили"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def save(self, *args, **kwargs):
+        if kwargs.get('update_fields') is None and not self._state.adding and not kwargs.get('force_insert'):
+            # баланс меняет только журнал (orders/ledger.py) через F(): полное сохранение (админка, формы)
+            # не перезаписывает его значением, загруженным до последнего движения
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields if not f.primary_key and f.name != 'balance'
+            ]
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        fields = self._meta.concrete_fields if update_fields is None else [
+            self._meta.get_field(name) for name in update_fields
+        ]
+        # снимок обновляется после post_save, чтобы сигналы видели значения до сохранения
+        self._loaded_values = {
+            **getattr(self, '_loaded_values', {}),
+            **{f.attname: self.__dict__[f.attname] for f in fields if f.attname in self.__dict__},
+        }
+
+    def get_dirty_fields(self) -> list[str]:
+        """ Поля профиля, измененные с момента загрузки из базы (или последнего сохранения) """
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is None:
+            return [f.name for f in self._meta.concrete_fields if not f.primary_key]
+
+        dirty = []
+        for f in self._meta.concrete_fields:
+            if f.primary_key or f.attname not in self.__dict__ or f.attname not in loaded:
+                continue
+            value = self.__dict__[f.attname]
+            if getattr(value, '_committed', True) is False or value != loaded[f.attname]:
+                dirty.append(f.name)
+
+        return dirty
+
+    def save_dirty(self) -> bool:
+        """ Сохранение только измененных полей, без запроса, если изменений нет """
+        if self._state.adding:
+            self.save()
+            return True
+
+        dirty = self.get_dirty_fields()
+        if dirty:
+            self.save(update_fields=dirty)
+
+        return bool(dirty)
+
+    def balance_increased(self) -> bool:
+        """ Баланс вырос с момента загрузки из базы (или последнего сохранения) """
+        loaded = getattr(self, '_loaded_values', {}).get('balance')
+        if loaded is None or hasattr(self.balance, 'resolve_expression'):
+            # F() выражение: итог известен только базе
+            return True
+        return (self.balance or 0) > loaded
+
     def __str__(self):
         return f'{self.user.first_name} {self.user.last_name}' if self.user.first_name else self.user.username
@@ -1,14 +1,15 @@
-import base64
 import logging
 import graphene
 import graphql_jwt
 from graphql import GraphQLError
 from django.contrib.auth.models import User
 from graphene_django import DjangoObjectType
-from django.core.files.base import ContentFile
 from graphql_jwt.decorators import login_required, superuser_required
 
 from .models import Profile
+from .tasks import save_profile_image
+from shop.optimizer import optimize
+from shop.dataloaders import get_loaders
 
 
 logger = logging.getLogger('api_logs')
@@ -20,6 +21,10 @@ class UserType(DjangoObjectType):
         model = User
         exclude = ('password',)
 
+    @staticmethod
+    def resolve_profile(root, info):
+        return get_loaders(info).profile_by_user.load_for(root, 'profile', root.pk)
+
 
 class ProfileType(DjangoObjectType):
     """Тип профиля"""
@@ -27,6 +32,10 @@ class ProfileType(DjangoObjectType):
         model = Profile
         fields = '__all__'
 
+    @staticmethod
+    def resolve_user(root, info):
+        return get_loaders(info).user.load_for(root, 'user', root.user_id)
+
 
 class Query(graphene.ObjectType):
     all_users = graphene.List(UserType)
@@ -37,7 +46,7 @@ class Query(graphene.ObjectType):
     @login_required
     def resolve_all_users(root, info):
         """Получение всех пользователей"""
-        return User.objects.prefetch_related('profile')
+        return get_loaders(info).seen(optimize(User.objects.all(), info))
 
     @staticmethod
     @login_required
@@ -144,14 +153,7 @@ class UpdateProfile(graphene.Mutation):
         if phone:
             profile.phone = phone
         if image:
-            if ';base64,' in image:
-                format, imgstr = image.split(';base64,')
-                ext = format.split('/')[-1]
-            else:
-                imgstr = image
-                ext = 'jpg'
-
-            profile.image.save(f'{user.pk}.{ext}', ContentFile(base64.b64decode(imgstr)), save=True)
+            save_profile_image.delay(user.pk, image)
         try:
             user.save()
             logger.info(f'Пользователь ({username}) зарегистрирован')
@@ -1,12 +1,10 @@
 import logging
-from decimal import Decimal
-from django.db import transaction
 from django.dispatch import receiver
 from django.contrib.auth.models import User
 from django.db.models.signals import post_save
 
 from .models import Profile
-from orders.models import Order
+from .tasks import settle_orders
 
 
 logger = logging.getLogger('logs')
@@ -20,37 +18,29 @@ def create_user_profile(sender, instance, created, **kwargs):
 
 
 @receiver(post_save, sender=User)
-def save_user_profile(sender, instance, **kwargs):
-    """ Сигнал сохранения профиля при сохранении юзера """
-    instance.profile.save()
+def save_user_profile(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Сигнал сохранения профиля при сохранении юзера.
+    Частичные сохранения (last_login при входе, пароль, is_active) профиль не затрагивают,
+    а профиль, не загруженный за запрос, не мог измениться - в обоих случаях запросов нет.
+    Загруженный профиль сохраняется только с измененными полями.
+    """
+    if created or update_fields is not None:
+        return
+
+    profile = instance._state.fields_cache.get('profile')
+    if profile is not None:
+        profile.save_dirty()
 
 
 @receiver(post_save, sender=Profile)
-def orders_paid(sender, instance, created, **kwargs):
-    """ Сигнал для того, чтобы при пополнении баланса оплачивать заказы """
-    if created:
+def orders_paid(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Сигнал для того, чтобы при пополнении баланса оплачивать заказы (в фоновой задаче).
+    Сохранения профиля без роста баланса (аватар, адрес, last_login) оплату не запускают.
+    """
+    if update_fields is not None and 'balance' not in update_fields:
         return
 
-    profile = instance
-    balance = profile.balance or Decimal('0')
-
-    with transaction.atomic():
-        cnt = 0
-        pending_orders = (
-            Order.objects
-                .filter(user=profile.user, status=Order.Status.PENDING)
-                .order_by('created_at')
-        )
-        for o in pending_orders:
-            total = Decimal(o.total_price or 0)
-            if balance >= total:
-                o.status = Order.Status.PAID
-                o.save(update_fields=['status'])
-                balance -= total
-                cnt += 1
-            else:
-                break
-
-        logger.info(f'Выполнено {cnt} заказов')
-
-        Profile.objects.filter(pk=profile.pk).update(balance=balance)
\ No newline at end of file
+    if not created and instance.balance_increased():
+        settle_orders.delay(instance.user_id)
@@ -0,0 +1,28 @@
+import logging
+
+from jobs.queue import task
+from shop.images import decode_base64_image
+from orders.services import settle_pending_orders
+from .models import Profile
+
+
+logger = logging.getLogger('logs')
+
+
+@task
+def save_profile_image(user_id: int, image: str):
+    """ Задача декодирования и сохранения аватара профиля из base64 """
+    profile = Profile.objects.filter(user_id=user_id).first()
+    if profile is None:
+        logger.warning(f'Профиль пользователя ({user_id}) удален до сохранения аватара')
+        return
+
+    ext, content = decode_base64_image(image)
+    profile.image.save(f'{user_id}.{ext}', content, save=False)
+    profile.save(update_fields=['image'])
+
+
+@task
+def settle_orders(user_id: int):
+    """ Задача оплаты ожидающих заказов с баланса пользователя """
+    settle_pending_orders(user_id)
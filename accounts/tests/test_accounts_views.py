@@ -1,7 +1,11 @@
 import pytest
+from decimal import Decimal
+from django.core import mail
 from django.contrib.auth.models import User
 
 from accounts.models import Profile
+from orders.ledger import post_entry
+from orders.models import BalanceEntry, OutgoingEmail
 
 
 @pytest.mark.django_db
@@ -32,3 +36,59 @@ def test_profile_edit_creation():
     assert profile.city == 'Moscow'
     assert profile.address == 'Mira'
     assert profile.phone == '79888888888'
+
+
+@pytest.mark.django_db
+def test_password_reset_goes_through_outbox(client, django_capture_on_commit_callbacks):
+    """ Проверка письма сброса пароля через outbox вместо отправки в запросе """
+    User.objects.create_user(username='Test', email='test@bk.ru', password='12345')
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = client.post('/accounts/password-reset/', {'email': 'test@bk.ru'})
+
+    assert response.status_code == 302
+    assert len(mail.outbox) == 0
+    assert OutgoingEmail.objects.get().recipients == ['test@bk.ru']
+
+
+@pytest.mark.django_db
+def test_user_save_does_not_resave_profile(django_assert_num_queries):
+    """ Проверка, что вход и частичные сохранения юзера не сохраняют профиль, а полное - только измененные поля """
+    from django.contrib.auth.models import update_last_login
+
+    user = User.objects.create_user(username='Test', email='test@bk.ru')
+    user = User.objects.get(pk=user.pk)
+
+    with django_assert_num_queries(1):
+        update_last_login(None, user)
+
+    with django_assert_num_queries(1):
+        user.save()
+
+    assert user.profile.get_dirty_fields() == []
+    with django_assert_num_queries(1):
+        user.save()
+
+    user.profile.city = 'Moscow'
+    assert user.profile.get_dirty_fields() == ['city']
+    with django_assert_num_queries(2):
+        user.save()
+
+    assert Profile.objects.get(user=user).city == 'Moscow'
+    assert user.profile.get_dirty_fields() == []
+
+
+@pytest.mark.django_db
+def test_profile_save_keeps_ledger_balance():
+    """ Проверка, что полное сохранение профиля не перезаписывает баланс, измененный журналом """
+    user = User.objects.create_user(username='Test', email='test@bk.ru')
+    profile = Profile.objects.get(user=user)
+
+    post_entry(user.pk, Decimal('40'), BalanceEntry.Kind.TOP_UP, 'payment:test')
+    profile.city = 'Moscow'
+    profile.balance = Decimal('1000')
+    profile.save()
+
+    profile.refresh_from_db()
+    assert profile.city == 'Moscow'
+    assert profile.balance == Decimal('40') == BalanceEntry.balance_of(user.pk)
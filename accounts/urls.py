@@ -1,6 +1,7 @@
 from django.urls import path, reverse_lazy
 from django.contrib.auth import views as auth_views
 
+from .forms import OutboxPasswordResetForm
 from .views import (
     UserLoginView, UserLogoutView, RegisterView, AccountBalanceView,
     AccountOrdersView, AccountProfileView, AccountSecurityView,
@@ -18,6 +19,7 @@ urlpatterns = [
     path('balance/', AccountBalanceView.as_view(), name='balance'),
     path('password-reset/', auth_views.PasswordResetView.as_view(
             template_name='accounts/forgot-password-form.html',
+            form_class=OutboxPasswordResetForm,
             email_template_name='accounts/forgot-password-email.html',
             subject_template_name='accounts/forgot-password-subject.txt',
             success_url=reverse_lazy('accounts:password_reset_done'),
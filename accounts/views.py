@@ -1,17 +1,18 @@
-import time
 import logging
 from django.views import View
 from django.db.models import Q
 from django.contrib import messages
 from django.contrib.auth.models import User
-from django.core.paginator import Paginator
 from django.shortcuts import render, redirect
 from django.http import HttpResponse, HttpRequest
 from django.contrib.auth import authenticate, login, logout
 
+from shop.pagination import KeysetPaginator
 from .mixins import AnonymousRequiredMixin, AuthenticatedRequiredMixin
 from .forms import UserLoginForm, RegisterForm, AccountForm, BalanceForm, ChangePasswordForm
-from orders.models import Order, PaymentMethod, Payment
+from orders.models import Order, PaymentMethod
+from shop.ids import new_id
+from orders.services import cancel_order, create_payment
 
 
 logger = logging.getLogger('logs')
@@ -108,7 +109,8 @@ class AccountBalanceView(View):
     def get(self, request: HttpRequest) -> HttpResponse:
         first_method = PaymentMethod.objects.first()
         form = BalanceForm(initial={
-            'method': first_method.pk if first_method else None
+            'method': first_method.pk if first_method else None,
+            'idempotency_key': new_id(),
         })
 
         return render(request, self.template_name, {'form': form})
@@ -118,20 +120,13 @@ class AccountBalanceView(View):
 
         if form.is_valid():
             try:
-                transaction_id = f'{request.user.pk}_{int(time.time())}'
-                amount = form.cleaned_data.get('amount')
-                method = form.cleaned_data.get('method')
-
-                Payment.objects.create(
-                    user=request.user,
-                    amount=amount,
-                    method=method,
-                    transaction_id=transaction_id,
-                    status='completed'
+                payment = create_payment(
+                    request.user,
+                    amount=form.cleaned_data.get('amount'),
+                    method_id=form.cleaned_data.get('method').pk,
+                    idempotency_key=form.cleaned_data.get('idempotency_key') or request.headers.get('Idempotency-Key'),
                 )
-
-                messages.success(request, f'Payment #{transaction_id} created')
-                logger.info(f'Пополнение: транзакция - {transaction_id}')
+                messages.success(request, f'Payment #{payment.transaction_id} created')
 
                 return redirect('accounts:profile')
             except Exception as e:
@@ -147,20 +142,17 @@ class AccountOrdersView(AuthenticatedRequiredMixin, View):
 
     def get(self, request: HttpRequest) -> HttpResponse:
         user = request.user
-        page_number = request.GET.get('page', 1)
         per_page = 10
-        orders = Order.objects.filter(user_id=user.pk).order_by('-created_at')
-        paginator = Paginator(orders, per_page)
-        page_obj = paginator.get_page(page_number)
+        orders = Order.objects.filter(user_id=user.pk)
+        paginator = KeysetPaginator(orders, per_page, ordering=('-created_at', '-pk'))
+        page_obj = paginator.get_page(after=request.GET.get('after'), before=request.GET.get('before'))
 
         ctx = {
             'orders': page_obj,
             'has_next': page_obj.has_next(),
             'has_previous': page_obj.has_previous(),
-            'next_page': f'?page={page_obj.next_page_number()}' if page_obj.has_next() else None,
-            'previous_page': f'?page={page_obj.previous_page_number()}' if page_obj.has_previous() else None,
-            'current_page': page_obj.number,
-            'total_pages': paginator.num_pages,
+            'next_page': f'?after={page_obj.next_cursor}' if page_obj.has_next() else None,
+            'previous_page': f'?before={page_obj.previous_cursor}' if page_obj.has_previous() else None,
         }
 
         return render(request, self.template_name, ctx)
@@ -169,19 +161,7 @@ class AccountOrdersView(AuthenticatedRequiredMixin, View):
         order_id = int(request.POST.get('id'))
 
         if order_id:
-            order = Order.objects.filter(pk=order_id).first()
-
-            if order:
-                order.status = Order.Status.CANCELED
-                order.save(update_fields=['status'])
-                request.user.profile.balance += order.total_price
-                request.user.profile.save(update_fields=['balance'])
-                items = order.items.all()
-
-                for i in items:
-                    product = i.product
-                    product.stock += i.quantity
-                    product.save(update_fields=['stock'])
+            cancel_order(request.user, order_id)
 
         return redirect('accounts:orders')
 
@@ -1,31 +1,33 @@
 import os
+import sys
 import time
 import psycopg2
 import subprocess
 from psycopg2 import OperationalError
 
 
-def wait_for_db():
-    db_name = os.getenv("DB_NAME")
-    db_user = os.getenv("DB_USER")
-    db_pass = os.getenv("DB_PASSWORD")
-    db_host = os.getenv("DB_HOST")
-    db_port = os.getenv("DB_PORT")
+# фазы запуска: migrate - разовая задача перед выкладкой, start - только сервер
+PHASES = ("migrate", "start")
+
+
+def connect():
+    return psycopg2.connect(
+        dbname=os.getenv("DB_NAME"),
+        user=os.getenv("DB_USER"),
+        password=os.getenv("DB_PASSWORD"),
+        host=os.getenv("DB_HOST"),
+        port=os.getenv("DB_PORT"),
+    )
 
+
+def wait_for_db():
     print("Жду базу данных...")
 
     while True:
         try:
-            conn = psycopg2.connect(
-                dbname=db_name,
-                user=db_user,
-                password=db_pass,
-                host=db_host,
-                port=db_port,
-            )
-            conn.close()
+            conn = connect()
             print("База доступна!")
-            break
+            return conn
         except OperationalError:
             time.sleep(1)
 
@@ -35,25 +37,52 @@ def run(cmd):
     subprocess.run(cmd, shell=False, check=True)
 
 
-if __name__ == "__main__":
-    wait_for_db()
+def migrate():
+    """
+    Миграции и фикстуры. Запускается один раз на выкладку (сервис migrate в docker-compose),
+    advisory lock не дает двум одновременно запущенным задачам мигрировать параллельно:
+    вторая дождется первой и найдет все миграции уже примененными
+    """
+    conn = wait_for_db()
+    conn.autocommit = True
 
-    # миграции
-    run(["python", "manage.py", "migrate"])
+    with conn.cursor() as cursor:
+        print("Жду блокировку миграций...")
+        cursor.execute("SELECT pg_advisory_lock(hashtext('shop:migrate'))")
+        try:
+            run(["python", "manage.py", "migrate", "--noinput"])
+
+            # фикстуры только в пустой каталог, чтобы не перезаписывать рабочие данные на каждой выкладке
+            cursor.execute("SELECT EXISTS (SELECT 1 FROM products_product)")
+            if os.path.exists("db_fixtures.json") and not cursor.fetchone()[0]:
+                run(["python", "manage.py", "loaddata", "db_fixtures.json"])
+        finally:
+            cursor.execute("SELECT pg_advisory_unlock(hashtext('shop:migrate'))")
 
-    run(["pytest", "--maxfail=1", "--disable-warnings"])
+    conn.close()
 
-    # фикстуры
-    if os.path.exists("db_fixtures.json"):
-        run(["python", "manage.py", "loaddata", "db_fixtures.json"])
 
-    # статика
-    run(["python", "manage.py", "collectstatic", "--noinput"])
+def start():
+    """ Только сервер: база, миграции и статика готовы заранее, готовность отдает /health/ready/ """
+    # воркеры, потоки и класс воркера подбираются по лимитам контейнера (shop/gunicorn_conf.py),
+    # SERVER_MODE=asgi - uvicorn-воркеры и async-контроллеры горячих страниц, иначе WSGI
+    if os.getenv("SERVER_MODE", "wsgi") == "asgi":
+        os.environ["ASYNC_VIEWS"] = "1"
+        # соединения живут в потоках sync_to_async отдельных запросов: постоянные соединения
+        # в ASGI не переиспользуются, переиспользование дает пул (DB_POOL=1)
+        os.environ.setdefault("DB_CONN_MAX_AGE", "0")
 
     print("Запускаю Gunicorn сервер...")
-    run([
-        "gunicorn",
-        "--bind", "0.0.0.0:8000",
-        "shop.wsgi:application",
-        "--workers", "3"
-    ])
+    # exec: gunicorn становится PID 1 и сам получает сигналы остановки от докера
+    os.execvp("gunicorn", ["gunicorn", "--config", "python:shop.gunicorn_conf"])
+
+
+if __name__ == "__main__":
+    phase = sys.argv[1] if len(sys.argv) > 1 else "start"
+    if phase not in PHASES:
+        sys.exit(f"Неизвестная фаза {phase}, ожидается одна из: {', '.join(PHASES)}")
+
+    if phase == "migrate":
+        migrate()
+    else:
+        start()
@@ -0,0 +1,19 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('task', 'status', 'attempts', 'run_after', 'locked_by', 'finished_at', 'created_at')
+    list_filter = ('status', 'task')
+    search_fields = ('task',)
+    readonly_fields = ('attempts', 'last_error', 'locked_by', 'locked_at', 'finished_at', 'created_at')
+    actions = ('requeue',)
+
+    @admin.action(description='Вернуть в очередь')
+    def requeue(self, request, queryset):
+        queryset.exclude(status=Job.Status.RUNNING).update(
+            status=Job.Status.QUEUED, attempts=0, run_after=timezone.now(), finished_at=None,
+        )
@@ -0,0 +1,32 @@
+import time
+import logging
+from django.core.management.base import BaseCommand
+
+from jobs.queue import run_pending, worker_name
+
+
+logger = logging.getLogger('logs')
+
+
+class Command(BaseCommand):
+    """ Воркер фоновых задач, процессов можно запускать сколько угодно """
+    help = 'Выполняет задачи из очереди jobs (SKIP LOCKED, повторы с задержкой, DEAD после max_attempts)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10, help='Задач за один захват')
+        parser.add_argument('--interval', type=float, default=1, help='Пауза между опросами пустой очереди, сек')
+        parser.add_argument('--once', action='store_true', help='Выполнить одну пачку и выйти')
+
+    def handle(self, *args, **options):
+        worker = worker_name()
+        logger.info(f'Задачи: Воркер {worker} запущен')
+
+        while True:
+            taken = run_pending(batch_size=options['batch_size'], worker=worker)
+
+            if options['once']:
+                self.stdout.write(self.style.SUCCESS(f'Выполнено задач: {taken}'))
+                return
+
+            if not taken:
+                time.sleep(options['interval'])
@@ -0,0 +1,32 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """ Модель фоновой задачи в очереди (выполняется командой runworker) """
+    class Status(models.TextChoices):
+        QUEUED = 'queued', 'В очереди'
+        RUNNING = 'running', 'Выполняется'
+        DONE = 'done', 'Выполнена'
+        DEAD = 'dead', 'Отклонена'
+
+    task = models.CharField(max_length=255, verbose_name='Задача')
+    args = models.JSONField(default=list, blank=True, verbose_name='Аргументы')
+    kwargs = models.JSONField(default=dict, blank=True, verbose_name='Именованные аргументы')
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.QUEUED, verbose_name='Статус')
+    attempts = models.PositiveIntegerField(default=0, verbose_name='Попыток')
+    max_attempts = models.PositiveIntegerField(default=5, verbose_name='Максимум попыток')
+    last_error = models.TextField(null=True, blank=True, verbose_name='Последняя ошибка')
+    run_after = models.DateTimeField(default=timezone.now, verbose_name='Выполнить после')
+    locked_by = models.CharField(max_length=255, null=True, blank=True, verbose_name='Воркер')
+    locked_at = models.DateTimeField(null=True, blank=True, verbose_name='Взята в работу')
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name='Дата завершения')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')
+
+    class Meta:
+        verbose_name = 'Задача'
+        verbose_name_plural = 'Фоновые задачи'
+        indexes = [models.Index(fields=['status', 'run_after'])]
+
+    def __str__(self):
+        return f'{self.task} ({self.get_status_display()})'
@@ -0,0 +1,145 @@
+import os
+import socket
+import logging
+import traceback
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Job
+
+
+logger = logging.getLogger('logs')
+
+MAX_ATTEMPTS = 5
+BACKOFF_SECONDS = 30
+
+_tasks = {}
+
+
+def task(func=None, *, max_attempts: int = MAX_ATTEMPTS):
+    """
+    Регистрация функции как фоновой задачи: func.delay(*args, **kwargs) ставит ее в очередь.
+    Аргументы сохраняются в JSON, поэтому передаются id объектов, а не сами объекты.
+    """
+    def register(f):
+        name = f'{f.__module__}.{f.__name__}'
+        _tasks[name] = f
+        f.task_name = name
+        f.max_attempts = max_attempts
+        f.delay = lambda *args, **kwargs: enqueue(f, *args, **kwargs)
+        return f
+
+    return register(func) if func is not None else register
+
+
+def enqueue(func, *args, run_after=None, **kwargs) -> Job | None:
+    """
+    Постановка задачи в очередь в текущей транзакции: откат запроса отменит и задачу,
+    а воркер увидит ее только после коммита. При JOBS_EAGER задача выполняется сразу.
+    """
+    if settings.JOBS_EAGER:
+        func(*args, **kwargs)
+        return None
+
+    return Job.objects.create(
+        task=func.task_name,
+        args=list(args),
+        kwargs=kwargs,
+        max_attempts=func.max_attempts,
+        run_after=run_after or timezone.now(),
+    )
+
+
+def worker_name() -> str:
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def claim(batch_size: int = 10, worker: str = None) -> list:
+    """
+    Захват пачки готовых задач. Строки берутся с SKIP LOCKED, так что параллельные воркеры
+    не получат одну задачу дважды. Задачи, зависшие в RUNNING дольше JOBS_LOCK_TIMEOUT
+    (воркер упал), возвращаются в работу, а исчерпавшие max_attempts (задача каждый раз роняет воркер) - в DEAD.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.JOBS_LOCK_TIMEOUT)
+
+    with transaction.atomic():
+        jobs = list(
+            Job.objects
+                .select_for_update(skip_locked=True)
+                .filter(status=Job.Status.QUEUED, run_after__lte=now)
+                .order_by('run_after', 'pk')[:batch_size]
+        )
+        if len(jobs) < batch_size:
+            stale_jobs = list(
+                Job.objects
+                    .select_for_update(skip_locked=True)
+                    .filter(status=Job.Status.RUNNING, locked_at__lt=stale)
+                    .order_by('locked_at', 'pk')[:batch_size - len(jobs)]
+            )
+            jobs += [job for job in stale_jobs if job.attempts < job.max_attempts]
+            _bury([job for job in stale_jobs if job.attempts >= job.max_attempts], now)
+
+        for job in jobs:
+            job.status = Job.Status.RUNNING
+            job.locked_by = worker or worker_name()
+            job.locked_at = now
+            job.attempts += 1
+
+        Job.objects.bulk_update(jobs, ['status', 'locked_by', 'locked_at', 'attempts'])
+
+    return jobs
+
+
+def _bury(jobs: list, now):
+    """ Перевод зависших задач без оставшихся попыток в DEAD """
+    for job in jobs:
+        job.status = Job.Status.DEAD
+        job.finished_at = now
+        job.last_error = f'Воркер {job.locked_by} не завершил задачу за {settings.JOBS_LOCK_TIMEOUT} с'
+        logger.error(f'Задачи: {job.task} ({job.pk}) отклонена после {job.attempts} попыток (воркер не ответил)')
+
+    Job.objects.bulk_update(jobs, ['status', 'finished_at', 'last_error'])
+
+
+def run_job(job: Job) -> bool:
+    """ Выполнение задачи вне транзакции захвата; ошибка ведет к повтору с задержкой или в DEAD """
+    func = _tasks.get(job.task)
+
+    try:
+        if func is None:
+            raise LookupError(f'Задача {job.task} не зарегистрирована')
+        with transaction.atomic():
+            func(*job.args, **job.kwargs)
+    except Exception as e:
+        logger.error(f'Задачи: {job.task} ({job.pk}) - ошибка попытки {job.attempts}: {e}')
+        job.last_error = traceback.format_exc()
+
+        if job.attempts >= job.max_attempts:
+            job.status = Job.Status.DEAD
+            job.finished_at = timezone.now()
+            logger.error(f'Задачи: {job.task} ({job.pk}) отклонена после {job.attempts} попыток')
+        else:
+            job.status = Job.Status.QUEUED
+            job.run_after = timezone.now() + timedelta(seconds=BACKOFF_SECONDS * 2 ** (job.attempts - 1))
+
+        job.save(update_fields=['status', 'last_error', 'run_after', 'finished_at'])
+        return False
+
+    job.status = Job.Status.DONE
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'finished_at'])
+
+    return True
+
+
+def run_pending(batch_size: int = 10, worker: str = None) -> int:
+    """ Захват и выполнение одной пачки задач, возвращает число взятых задач """
+    jobs = claim(batch_size, worker)
+
+    for job in jobs:
+        run_job(job)
+
+    return len(jobs)
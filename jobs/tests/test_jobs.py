@@ -0,0 +1,103 @@
+import pytest
+from decimal import Decimal
+from datetime import timedelta
+from django.utils import timezone
+from django.contrib.auth.models import User
+from django.core.management import call_command
+
+from jobs.models import Job
+from jobs.queue import task, claim, run_pending
+from orders.models import Order
+
+
+calls = []
+
+
+@task(max_attempts=2)
+def flaky(value, fail=False):
+    """ Тестовая задача """
+    if fail:
+        raise ValueError('boom')
+    calls.append(value)
+
+
+@pytest.mark.django_db
+def test_worker_runs_retries_and_dead_letters():
+    """ Проверка выполнения задач, повтора с задержкой и перевода в DEAD после max_attempts """
+    calls.clear()
+    ok = flaky.delay(1)
+    bad = flaky.delay(2, fail=True)
+
+    call_command('runworker', '--once')
+
+    ok.refresh_from_db()
+    bad.refresh_from_db()
+    assert calls == [1]
+    assert ok.status == Job.Status.DONE
+    assert bad.status == Job.Status.QUEUED
+    assert bad.attempts == 1
+    assert bad.run_after > timezone.now()
+    assert 'boom' in bad.last_error
+
+    Job.objects.filter(pk=bad.pk).update(run_after=timezone.now())
+    assert run_pending() == 1
+
+    bad.refresh_from_db()
+    assert bad.status == Job.Status.DEAD
+    assert bad.attempts == 2
+    assert run_pending() == 0
+
+
+@pytest.mark.django_db
+def test_claim_skips_taken_and_recovers_stale(settings):
+    """ Проверка захвата: взятую задачу не получает другой воркер, зависшая возвращается в работу """
+    settings.JOBS_LOCK_TIMEOUT = 60
+    job = flaky.delay(3)
+
+    assert [j.pk for j in claim(worker='w1')] == [job.pk]
+    assert claim(worker='w2') == []
+
+    Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timedelta(seconds=120))
+    taken = claim(worker='w2')
+    assert [j.pk for j in taken] == [job.pk]
+    assert taken[0].locked_by == 'w2'
+    assert taken[0].attempts == 2
+
+
+@pytest.mark.django_db
+def test_stale_job_without_attempts_left_is_dead(settings):
+    """ Проверка того, что задача, каждый раз роняющая воркер, после max_attempts уходит в DEAD, а не крутится вечно """
+    settings.JOBS_LOCK_TIMEOUT = 60
+    job = flaky.delay(4)
+
+    for worker in ('w1', 'w2'):
+        assert [j.pk for j in claim(worker=worker)] == [job.pk]
+        Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timedelta(seconds=120))
+
+    assert claim(worker='w3') == []
+
+    job.refresh_from_db()
+    assert job.status == Job.Status.DEAD
+    assert job.attempts == 2
+    assert 'w2' in job.last_error
+    assert job.finished_at is not None
+
+
+@pytest.mark.django_db
+def test_balance_top_up_settles_orders_in_worker():
+    """ Проверка оплаты ожидающих заказов фоновой задачей после пополнения баланса """
+    user = User.objects.create_user(username='payer', password='12345')
+    order = Order.objects.create(order_id='settle', user=user, total_amount=Decimal('10'))
+
+    user.profile.balance = Decimal('15')
+    user.profile.save(update_fields=['balance'])
+
+    order.refresh_from_db()
+    assert order.status == Order.Status.PENDING
+
+    call_command('runworker', '--once')
+
+    order.refresh_from_db()
+    user.profile.refresh_from_db()
+    assert order.status == Order.Status.PAID
+    assert user.profile.balance == Decimal('5')
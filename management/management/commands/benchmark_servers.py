@@ -0,0 +1,92 @@
+import os
+import sys
+import time
+import socket
+import asyncio
+import subprocess
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from products.models import Product
+from shop.benchmark import run_load
+
+
+HOST = '127.0.0.1'
+
+SERVERS = {
+    'wsgi': ['shop.wsgi:application'],
+    'asgi': ['shop.asgi:application', '--worker-class', 'uvicorn_worker.UvicornWorker'],
+}
+
+
+class Command(BaseCommand):
+    """ Нагрузочное сравнение gunicorn в режиме WSGI и ASGI (uvicorn-воркеры) при удаленной базе """
+    help = 'Запускает сервер в каждом режиме на одной базе и сравнивает пропускную способность и задержки'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--modes', nargs='+', choices=SERVERS, default=list(SERVERS))
+        parser.add_argument('--workers', type=int, default=2, help='Воркеров gunicorn в каждом режиме')
+        parser.add_argument('--requests', type=int, default=400, help='Запросов на режим')
+        parser.add_argument('--concurrency', type=int, default=50, help='Одновременных запросов')
+        parser.add_argument(
+            '--latency', type=float, default=0.02, help='Сетевая задержка до базы на SQL-запрос, секунд (BENCH_DB_LATENCY)',
+        )
+        parser.add_argument('--port', type=int, default=8099)
+
+    def handle(self, *args, **options):
+        if settings.SETTINGS_MODULE != 'shop.bench_settings':
+            raise CommandError('Запускайте с --settings shop.bench_settings')
+
+        call_command('migrate', verbosity=0)
+        if not Product.objects.exists():
+            call_command('loaddata', 'db_fixtures.json', verbosity=0)
+
+        product = Product.objects.filter(is_active=True).first()
+        paths = ['/', f'/products/{product.slug}/', '/orders/cart/']
+
+        self.stdout.write(
+            f'Задержка базы {options["latency"]} с на SQL-запрос, воркеров {options["workers"]}, '
+            f'запросов {options["requests"]}, одновременно {options["concurrency"]}'
+        )
+
+        for mode in options['modes']:
+            server = self.start_server(mode, options['workers'], options['port'], options['latency'])
+            try:
+                result = asyncio.run(run_load(HOST, options['port'], paths, options['requests'], options['concurrency']))
+            finally:
+                server.terminate()
+                server.wait()
+
+            self.stdout.write(
+                f'{mode}: {result["rps"]} запр/с, p50 {result["p50_ms"]} мс, p95 {result["p95_ms"]} мс, '
+                f'ошибок {result["errors"]} за {result["seconds"]} с'
+            )
+
+    def start_server(self, mode: str, workers: int, port: int, latency: float) -> subprocess.Popen:
+        env = dict(
+            os.environ,
+            DJANGO_SETTINGS_MODULE='shop.bench_settings',
+            ASYNC_VIEWS='1' if mode == 'asgi' else '0',
+            BENCH_DB_LATENCY=str(latency),
+        )
+        server = subprocess.Popen(
+            [
+                sys.executable, '-m', 'gunicorn', *SERVERS[mode],
+                '--bind', f'{HOST}:{port}',
+                '--workers', str(workers),
+                '--log-level', 'warning',
+            ],
+            env=env,
+        )
+
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            try:
+                socket.create_connection((HOST, port), timeout=1).close()
+                return server
+            except OSError:
+                time.sleep(0.2)
+
+        server.terminate()
+        raise CommandError(f'Сервер {mode} не запустился на порту {port}')
@@ -0,0 +1,48 @@
+import logging
+from pathlib import Path
+from graphql import parse, validate, GraphQLError
+from django.core.management.base import BaseCommand, CommandError
+
+from shop.schema import schema
+from shop.persisted_queries import get_registry, PersistedQueryRegistry
+
+
+logger = logging.getLogger('logs')
+
+
+class Command(BaseCommand):
+    """ Регистрация GraphQL-операций из .graphql файлов в реестре persisted queries """
+    help = 'Добавляет операции из .graphql файлов (или папок с ними) в GRAPHQL_PERSISTED_QUERIES_FILE'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help='Файлы .graphql или папки, в которых они ищутся рекурсивно')
+        parser.add_argument('--replace', action='store_true', help='Удалить из реестра операции, которых нет в файлах')
+
+    def handle(self, *args, **options):
+        files = []
+        for path in map(Path, options['paths']):
+            if path.is_dir():
+                files += sorted(path.rglob('*.graphql'))
+            elif path.is_file():
+                files.append(path)
+            else:
+                raise CommandError(f'Файл не найден: {path}')
+
+        current = get_registry()
+        registry = PersistedQueryRegistry(current.path, {} if options['replace'] else dict(current.queries))
+
+        for file in files:
+            query = file.read_text(encoding='utf-8')
+            try:
+                errors = validate(schema.graphql_schema, parse(query))
+            except GraphQLError as e:
+                errors = [e]
+            if errors:
+                raise CommandError(f'{file}: {errors[0].message}')
+
+            digest = registry.register(query)
+            self.stdout.write(f'{digest}  {file}')
+
+        registry.save()
+        logger.info(f'GraphQL: Зарегистрировано операций {len(files)}, в реестре {len(registry)}')
+        self.stdout.write(self.style.SUCCESS(f'Зарегистрировано операций: {len(files)}, в реестре: {len(registry)}'))
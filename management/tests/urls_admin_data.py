@@ -1,7 +1,7 @@
 from ..views import (
     ManagementView, ManagementProductView, ManagementProductsView, ManagementAddProductView,
     ManagementCategoriesView, ManagementCategoryView, ManagementAddCategoryView, ManagementDeleteCategoryView,
-    ManagementUsersView, ManagementReviewsView,
+    ManagementUsersView, ManagementReviewsView, ManagementDatabaseView,
 )
 
 urls = [
@@ -16,4 +16,5 @@ urls = [
     ("management:management-delete-category", ManagementDeleteCategoryView, {'pk': 1}, 200),
     ("management:management-users", ManagementUsersView, "???", 200),
     ("management:management-reviews", ManagementReviewsView, "???", 200),
+    ("management:management-db", ManagementDatabaseView, "???", 200),
 ]
\ No newline at end of file
@@ -3,7 +3,7 @@ from django.urls import path
 from .views import (
     ManagementView, ManagementProductView, ManagementProductsView, ManagementAddProductView,
     ManagementCategoriesView, ManagementCategoryView, ManagementAddCategoryView, ManagementDeleteCategoryView,
-    ManagementUsersView, ManagementReviewsView,
+    ManagementUsersView, ManagementReviewsView, ManagementDatabaseView,
 )
 
 
@@ -20,4 +20,5 @@ urlpatterns = [
     path('category/delete/<int:pk>/', ManagementDeleteCategoryView.as_view(), name='management-delete-category'),
     path('users/', ManagementUsersView.as_view(), name='management-users'),
     path('reviews/', ManagementReviewsView.as_view(), name='management-reviews'),
+    path('db/', ManagementDatabaseView.as_view(), name='management-db'),
 ]
\ No newline at end of file
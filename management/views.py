@@ -4,30 +4,27 @@ from django.contrib import messages
 from django.core.paginator import Paginator
 from django.contrib.auth.models import User
 from django.shortcuts import render, redirect
-from django.http import HttpResponse, HttpRequest
-from django.db.models import Sum, F, DecimalField, ExpressionWrapper
+from django.http import HttpResponse, HttpRequest, JsonResponse
+from django.db.models import Sum
 
 from orders.models import Order
 from .forms import CategoryForm, ProductForm
 from products.models import Category, Product, Review
+from shop.db import connection_stats
+from shop.replica import ReplicaReadMixin
+from shop.pagination import KeysetPaginator
 from accounts.mixins import SuperuserRequiredMixin
 
 
 logger = logging.getLogger('logs')
 
 
-class ManagementView(SuperuserRequiredMixin, View):
+class ManagementView(SuperuserRequiredMixin, ReplicaReadMixin, View):
     """ Контроллер дашборда кастомной админки """
     def get(self, request: HttpRequest) -> HttpResponse:
         total_sales = (
-                Order.objects.filter(status=Order.Status.PAID).annotate(
-                    order_total=Sum(
-                        ExpressionWrapper(
-                            F('items__quantity') * F('items__price'), output_field=DecimalField()
-                        )
-                    )
-                )
-                .aggregate(total_sales=Sum('order_total'))
+                Order.objects.filter(status=Order.Status.PAID)
+                .aggregate(total_sales=Sum('total_amount'))
                 .get('total_sales') or 0
         )
         total_orders = Order.objects.all().count()
@@ -42,13 +39,11 @@ class ManagementView(SuperuserRequiredMixin, View):
         return render(request, 'management/index.html', ctx)
 
 
-class ManagementProductsView(SuperuserRequiredMixin, View):
+class ManagementProductsView(SuperuserRequiredMixin, ReplicaReadMixin, View):
     """ Контроллер списка товаров каст.адм """
     def get(self, request: HttpRequest) -> HttpResponse:
-        lst = Product.objects.all().order_by('-id')
-        paginator = Paginator(lst, 10)
-        page_number = request.GET.get('page')
-        page_obj = paginator.get_page(page_number)
+        paginator = KeysetPaginator(Product.objects.all(), 10, ordering=('-pk',))
+        page_obj = paginator.get_page(after=request.GET.get('after'), before=request.GET.get('before'))
 
         return render(request, 'management/products.html', {'page_obj': page_obj})
 
@@ -128,7 +123,7 @@ class ManagementAddProductView(SuperuserRequiredMixin, View):
         return render(request, self.template_name, {'form': form})
 
 
-class ManagementCategoriesView(SuperuserRequiredMixin, View):
+class ManagementCategoriesView(SuperuserRequiredMixin, ReplicaReadMixin, View):
     """ Контроллер списка категорий каст.адм """
     def get(self, request: HttpRequest) -> HttpResponse:
         categories_list = Category.objects.all().order_by('id')
@@ -207,15 +202,13 @@ class ManagementDeleteCategoryView(SuperuserRequiredMixin, View):
         return redirect('management:management-categories')
 
 
-class ManagementUsersView(SuperuserRequiredMixin, View):
+class ManagementUsersView(SuperuserRequiredMixin, ReplicaReadMixin, View):
     """ Контроллер списка пользователей каст.адм """
     template_name = 'management/users.html'
 
     def get(self, request: HttpRequest) -> HttpResponse:
-        lst = User.objects.all().order_by('id')
-        paginator = Paginator(lst, 10)
-        page_number = request.GET.get('page')
-        page_obj = paginator.get_page(page_number)
+        paginator = KeysetPaginator(User.objects.all(), 10, ordering=('pk',))
+        page_obj = paginator.get_page(after=request.GET.get('after'), before=request.GET.get('before'))
 
         return render(request, self.template_name, {'page_obj': page_obj})
 
@@ -232,15 +225,14 @@ class ManagementUsersView(SuperuserRequiredMixin, View):
         return redirect('management:management-users')
 
 
-class ManagementReviewsView(SuperuserRequiredMixin, View):
+class ManagementReviewsView(SuperuserRequiredMixin, ReplicaReadMixin, View):
     """ Контроллер списка отзывов каст.адм """
     template_name = 'management/reviews.html'
 
     def get(self, request: HttpRequest) -> HttpResponse:
-        lst = Review.objects.all().order_by('id')
-        paginator = Paginator(lst, 10)
-        page_number = request.GET.get('page')
-        page_obj = paginator.get_page(page_number)
+        lst = Review.objects.select_related('product', 'user')
+        paginator = KeysetPaginator(lst, 10, ordering=('pk',))
+        page_obj = paginator.get_page(after=request.GET.get('after'), before=request.GET.get('before'))
 
         return render(request, self.template_name, {'page_obj': page_obj})
 
@@ -255,3 +247,9 @@ class ManagementReviewsView(SuperuserRequiredMixin, View):
                 logger.info(f'Менеджмент: Видимость отзыва изменена')
 
         return redirect('management:management-reviews')
+
+
+class ManagementDatabaseView(SuperuserRequiredMixin, View):
+    """ Контроллер метрик соединений с базой текущего процесса (пул, ожидающие, время ожидания) """
+    def get(self, request: HttpRequest) -> JsonResponse:
+        return JsonResponse(connection_stats())
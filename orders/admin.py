@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import Order, OrderItem, PaymentMethod, Payment
+
+from shop.ids import is_id
+from .models import Order, OrderItem, PaymentMethod, Payment, BalanceEntry, OutgoingEmail
 
 @admin.register(PaymentMethod)
 class PaymentMethodAdmin(admin.ModelAdmin):
@@ -16,15 +18,49 @@ class OrderItemInline(admin.TabularInline):
 
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
-    list_display = ('order_id', 'user', 'status', 'total_price', 'created_at')
+    list_display = ('order_id', 'user', 'status', 'total_amount', 'created_at')
     list_filter = ('status', 'created_at', 'method')
     search_fields = ('order_id', 'user__username', 'user__email', 'phone', 'city')
     inlines = [OrderItemInline]
-    readonly_fields = ('total_price',)
+    list_select_related = ('user',)
+    readonly_fields = ('total_amount',)
+
+    def get_search_results(self, request, queryset, search_term):
+        # номер заказа ищется точным совпадением по уникальному индексу, а не ILIKE по всем полям
+        if is_id(search_term):
+            return queryset.filter(order_id=search_term.strip().upper()), False
+        return super().get_search_results(request, queryset, search_term)
 
 
 @admin.register(Payment)
 class PaymentAdmin(admin.ModelAdmin):
     list_display = ('user', 'amount', 'method', 'status', 'created_at')
     list_filter = ('status', 'method', 'created_at')
-    search_fields = ('user__username', 'user__email', 'transaction_id')
\ No newline at end of file
+    search_fields = ('user__username', 'user__email', 'transaction_id')
+
+    def get_search_results(self, request, queryset, search_term):
+        if is_id(search_term):
+            return queryset.filter(transaction_id=search_term.strip().upper()), False
+        return super().get_search_results(request, queryset, search_term)
+
+
+@admin.register(BalanceEntry)
+class BalanceEntryAdmin(admin.ModelAdmin):
+    list_display = ('user', 'kind', 'amount', 'key', 'created_at')
+    list_filter = ('kind', 'created_at')
+    search_fields = ('user__username', 'key')
+    list_select_related = ('user',)
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(OutgoingEmail)
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'status', 'attempts', 'send_after', 'sent_at', 'created_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('subject', 'recipients')
+    readonly_fields = ('attempts', 'last_error', 'sent_at', 'created_at')
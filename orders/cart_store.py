@@ -0,0 +1,183 @@
+import time
+import secrets
+import threading
+from decimal import Decimal, InvalidOperation
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpRequest, HttpResponse
+from django.utils.module_loading import import_string
+
+
+def dumps(cart: dict) -> str:
+    """ Компактная запись корзины: "id:qty:price|id:qty:price" (только допустимые в cookie символы) """
+    return '|'.join(f'{pk}:{item["qty"]}:{item["price"]}' for pk, item in cart.items())
+
+
+def loads(raw: str) -> dict:
+    """ Корзина {id: {'qty', 'price'}} из компактной записи (битые позиции пропускаются) """
+    cart = {}
+    for line in (raw or '').split('|'):
+        try:
+            pk, qty, price = line.split(':')
+            cart[str(int(pk))] = {'qty': int(qty), 'price': str(Decimal(price))}
+        except (ValueError, InvalidOperation):
+            continue
+
+    return cart
+
+
+class CartStore:
+    """
+    Хранилище корзины вне сессии Django.
+    Корзина читается из запроса при первом обращении, а записывается CartMiddleware в ответ,
+    только если за запрос она менялась.
+    """
+    def load(self, request: HttpRequest) -> dict:
+        raise NotImplementedError
+
+    def save(self, request: HttpRequest, response: HttpResponse, cart: dict):
+        raise NotImplementedError
+
+    def _set_cookie(self, response: HttpResponse, value: str, salt: str):
+        response.set_signed_cookie(
+            settings.CART_COOKIE_NAME,
+            value,
+            salt=salt,
+            max_age=settings.CART_COOKIE_AGE,
+            secure=settings.SESSION_COOKIE_SECURE,
+            httponly=True,
+            samesite='Lax',
+        )
+
+
+class SignedCookieCartStore(CartStore):
+    """ Вся корзина в подписанной cookie: на сервере ничего не хранится """
+    salt = 'orders.cart'
+
+    def load(self, request):
+        value = request.get_signed_cookie(settings.CART_COOKIE_NAME, default=None, salt=self.salt)
+
+        return loads(value)
+
+    def save(self, request, response, cart):
+        if cart:
+            self._set_cookie(response, dumps(cart), self.salt)
+        elif settings.CART_COOKIE_NAME in request.COOKIES:
+            response.delete_cookie(settings.CART_COOKIE_NAME, samesite='Lax')
+
+
+class KeyValueCartStore(CartStore):
+    """ Корзина в key-value хранилище по случайному id из подписанной cookie """
+    salt = 'orders.cart.id'
+    prefix = 'cart:'
+
+    def get(self, key: str):
+        raise NotImplementedError
+
+    def set(self, key: str, value: str):
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+    def _cart_id(self, request):
+        return request.get_signed_cookie(settings.CART_COOKIE_NAME, default=None, salt=self.salt)
+
+    def load(self, request):
+        cart_id = self._cart_id(request)
+
+        return loads(self.get(self.prefix + cart_id)) if cart_id else {}
+
+    def save(self, request, response, cart):
+        cart_id = self._cart_id(request)
+
+        if cart:
+            if not cart_id:
+                cart_id = secrets.token_urlsafe(16)
+                self._set_cookie(response, cart_id, self.salt)
+            self.set(self.prefix + cart_id, dumps(cart))
+        elif cart_id:
+            self.delete(self.prefix + cart_id)
+            response.delete_cookie(settings.CART_COOKIE_NAME, samesite='Lax')
+
+
+class CacheCartStore(KeyValueCartStore):
+    """ Корзина в кеше Django (CART_CACHE_ALIAS) """
+    @property
+    def cache(self):
+        return caches[settings.CART_CACHE_ALIAS]
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, value):
+        self.cache.set(key, value, settings.CART_COOKIE_AGE)
+
+    def delete(self, key):
+        self.cache.delete(key)
+
+
+class InMemoryRedis:
+    """ Заменитель клиента Redis в памяти процесса (get/set/delete) для тестов и локальной разработки """
+    def __init__(self):
+        self.data = {}
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            value, expires = self.data.get(key, (None, None))
+            if expires is not None and expires < time.monotonic():
+                del self.data[key]
+                return None
+            return value
+
+    def set(self, key, value, ex=None):
+        with self.lock:
+            self.data[key] = (value.encode() if isinstance(value, str) else value, time.monotonic() + ex if ex else None)
+        return True
+
+    def delete(self, *keys):
+        with self.lock:
+            return sum(self.data.pop(key, None) is not None for key in keys)
+
+
+class RedisCartStore(KeyValueCartStore):
+    """ Корзина в Redis-совместимом сервере (CART_REDIS_URL, memory:// - InMemoryRedis) """
+    def __init__(self, client=None):
+        self.client = client or self.connect(settings.CART_REDIS_URL)
+
+    @staticmethod
+    def connect(url: str):
+        if url.startswith('memory://'):
+            return InMemoryRedis()
+
+        import redis
+        return redis.Redis.from_url(url)
+
+    def get(self, key):
+        value = self.client.get(key)
+        return value.decode() if value is not None else None
+
+    def set(self, key, value):
+        self.client.set(key, value, ex=settings.CART_COOKIE_AGE)
+
+    def delete(self, key):
+        self.client.delete(key)
+
+
+CART_BACKENDS = {
+    'cookie': 'orders.cart_store.SignedCookieCartStore',
+    'cache': 'orders.cart_store.CacheCartStore',
+    'redis': 'orders.cart_store.RedisCartStore',
+}
+
+_stores = {}
+
+
+def get_cart_store() -> CartStore:
+    """ Хранилище корзины из настройки CART_BACKEND (один экземпляр на процесс) """
+    backend = settings.CART_BACKEND
+    if backend not in _stores:
+        _stores[backend] = import_string(CART_BACKENDS.get(backend, backend))()
+
+    return _stores[backend]
@@ -1,23 +1,58 @@
 import json
 from decimal import Decimal
-from django.conf import settings
+from asgiref.sync import sync_to_async
 from django.http import HttpRequest
 
 from products.models import Product
+from .cart_store import get_cart_store
+
+
+class CartSnapshot:
+    """
+    Снимок корзины на время запроса: позиции с товарами и актуальными ценами.
+    price_changes - позиции, цена которых изменилась с момента добавления (old_price -> price),
+    removed - названия товаров, убранных из корзины, потому что их сняли с продажи или удалили.
+    """
+    def __init__(self, lines: list, price_changes: list, removed: list):
+        self.lines = lines
+        self.price_changes = price_changes
+        self.removed = removed
+        self.total = sum((line['total_price'] for line in lines), Decimal('0'))
+
+    def __iter__(self):
+        return iter(self.lines)
+
+    def __len__(self):
+        return len(self.lines)
 
 
 class Cart:
-    """ Класс сессионной корзины товаров """
+    """
+    Класс корзины товаров.
+    Корзина хранится не в сессии, а в хранилище CART_BACKEND (orders.cart_store): читается один раз за запрос,
+    все экземпляры Cart одного запроса работают с одним словарем, а сохраняет его CartMiddleware.
+    """
     def __init__(self, request: HttpRequest):
-        self.session = request.session
-        cart = self.session.get(settings.CART_SESSION_ID)
-        if not cart:
-            cart = self.session[settings.CART_SESSION_ID] = {}
-        self.cart = cart
+        self.request = request
+        if not hasattr(request, '_cart'):
+            request._cart = get_cart_store().load(request)
+            request._cart_modified = False
+        self.cart = request._cart
+
+    @classmethod
+    async def aload(cls, request: HttpRequest) -> 'Cart':
+        """ Cart для async-контроллеров: хранилище (cache/redis - блокирующий ввод-вывод) читается в потоке """
+        if not hasattr(request, '_cart'):
+            request._cart = await sync_to_async(get_cart_store().load)(request)
+            request._cart_modified = False
+
+        return cls(request)
 
     def change(self, product: Product, dec=False, qty=1):
         product_id = str(product.pk)
         if product_id not in self.cart:
+            if dec:
+                return
             self.cart[product_id] = {'qty': qty, 'price': str(product.price)}
         else:
             if dec:
@@ -29,8 +64,22 @@ class Cart:
                 self.cart[product_id]['qty'] += qty
         self.save()
 
+    def set_many(self, lines: dict):
+        """ Установка количества сразу нескольких товаров {product_id: (qty, price)} (qty 0 - удалить) с одним сохранением """
+        for product_id, (qty, price) in lines.items():
+            product_id = str(product_id)
+            if qty <= 0:
+                self.cart.pop(product_id, None)
+            elif product_id in self.cart:
+                self.cart[product_id]['qty'] = qty
+            else:
+                self.cart[product_id] = {'qty': qty, 'price': str(price)}
+        if lines:
+            self.save()
+
     def save(self):
-        self.session.modified = True
+        self.request._cart_modified = True
+        self.request._cart_snapshot = None
 
     def remove(self, product: Product):
         product_id = str(product.pk)
@@ -47,31 +96,66 @@ class Cart:
     def __str__(self):
         return json.dumps(self.cart, indent=2, ensure_ascii=False)
 
-    def get_products(self):
-        product_ids = self.cart.keys()
-        products = Product.objects.filter(id__in=product_ids)
-        cart = self.cart.copy()
+    @property
+    def snapshot(self) -> CartSnapshot:
+        """ Снимок корзины, строится одним запросом товаров и переиспользуется до следующего изменения """
+        snapshot = getattr(self.request, '_cart_snapshot', None)
+        if snapshot is None:
+            snapshot = self._build_snapshot()
+            self.request._cart_snapshot = snapshot
 
-        return products, cart
+        return snapshot
 
-    def items(self):
-        products, cart = self.get_products()
+    async def asnapshot(self) -> CartSnapshot:
+        """ snapshot для async-контроллеров: товары корзины загружаются через async ORM """
+        snapshot = getattr(self.request, '_cart_snapshot', None)
+        if snapshot is None:
+            qs = Product.objects.filter(pk__in=self.cart.keys()).order_by('pk')
+            self.use_products([p async for p in qs] if self.cart else [])
 
-        for p in products:
-            item = cart[str(p.pk)]
-            item['product'] = p
-            item['price'] = Decimal(item['price'])
-            item['total_price'] = item['price'] * item['qty']
-            yield item
+        return self.request._cart_snapshot
+
+    def use_products(self, products):
+        """ Снимок из уже загруженных товаров (должны быть все товары корзины) без повторного запроса """
+        self.request._cart_snapshot = self._build_snapshot(products)
+
+    def _build_snapshot(self, products=None) -> CartSnapshot:
+        if products is None:
+            products = Product.objects.filter(pk__in=self.cart.keys()).order_by('pk') if self.cart else []
+        products = {str(p.pk): p for p in products}
+        lines, price_changes, removed = [], [], []
+
+        for product_id in list(self.cart):
+            product = products.get(product_id)
+            if product is None or not product.is_active:
+                removed.append(product.name if product else f'#{product_id}')
+                del self.cart[product_id]
+                continue
+
+            item = self.cart[product_id]
+            line = {'product': product, 'qty': item['qty'], 'price': product.price}
+            if Decimal(item['price']) != product.price:
+                line['old_price'] = Decimal(item['price'])
+                item['price'] = str(product.price)
+                price_changes.append(line)
+            line['total_price'] = line['price'] * line['qty']
+            lines.append(line)
+
+        if removed or price_changes:
+            self.save()
+
+        return CartSnapshot(lines, price_changes, removed)
+
+    def items(self):
+        return self.snapshot.lines
 
     def __len__(self):
         return len(self.cart)
 
     def get_total_price(self):
-        return sum(
-            Decimal(item['price']) * item['qty'] for item in self.cart.values()
-        )
+        return self.snapshot.total
 
     def clear(self):
-        del self.session[settings.CART_SESSION_ID]
-        self.save()
+        if self.cart:
+            self.cart.clear()
+            self.save()
@@ -1,9 +1,11 @@
 from django.http import HttpRequest
+from django.utils.functional import SimpleLazyObject
+
 from orders.cert_session import Cart
 
 
 def orders_context(request: HttpRequest):
-    """ Контекст для доступа к данным корзины """
-    cart = Cart(request)
+    """ Контекст для доступа к данным корзины: корзина создается, только если шаблон к ней обратился """
+    cart = SimpleLazyObject(lambda: Cart(request))
 
-    return {'cart': cart, 'cart_len': len(cart)}
\ No newline at end of file
+    return {'cart': cart, 'cart_len': SimpleLazyObject(lambda: len(cart))}
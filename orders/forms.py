@@ -45,4 +45,9 @@ class OrderForm(forms.Form):
         widget=forms.RadioSelect(attrs={'class': 'payment-block'}),
         empty_label=None,
         label='Payment Method',
-    )
\ No newline at end of file
+    )
+    idempotency_key = forms.CharField(
+        required=False,
+        max_length=64,
+        widget=forms.HiddenInput(),
+    )
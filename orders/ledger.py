@@ -0,0 +1,62 @@
+import logging
+from decimal import Decimal
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import BalanceEntry
+
+
+logger = logging.getLogger('logs')
+
+
+class InsufficientFunds(Exception):
+    """ На балансе не хватает денег для списания """
+
+
+def post_entry(user_id: int, amount: Decimal, kind: str, key: str, require_funds: bool = False, **refs) -> bool:
+    """
+    Проведение движения по балансу: запись в журнал и изменение Profile.balance через F() в одной транзакции.
+    Повтор с тем же key ничего не меняет (уникальный индекс журнала), поэтому параллельные воркеры
+    могут проводить одни и те же платежи без блокировки строки профиля на время проверки.
+    require_funds - списание только при достаточном балансе (условный UPDATE).
+    Возвращает True, если движение проведено сейчас.
+    """
+    from accounts.models import Profile
+
+    try:
+        with transaction.atomic():
+            BalanceEntry.objects.create(user_id=user_id, amount=amount, kind=kind, key=key, **refs)
+
+            profiles = Profile.objects.filter(user_id=user_id)
+            if require_funds:
+                profiles = profiles.filter(balance__gte=-amount)
+            if not profiles.update(balance=F('balance') + amount):
+                raise InsufficientFunds(key)
+    except IntegrityError:
+        logger.info(f'Баланс: Движение {key} уже проведено')
+        return False
+    except InsufficientFunds:
+        return False
+
+    logger.info(f'Баланс: Движение {key} на сумму {amount} проведено')
+
+    return True
+
+
+def top_up(payment) -> bool:
+    """ Пополнение баланса завершенным платежом (один раз на transaction_id) """
+    return post_entry(
+        payment.user_id, payment.amount, BalanceEntry.Kind.TOP_UP, f'payment:{payment.transaction_id}', payment=payment,
+    )
+
+
+def charge_order(order) -> bool:
+    """ Оплата заказа с баланса, если денег хватает """
+    return post_entry(
+        order.user_id, -order.total_amount, BalanceEntry.Kind.ORDER, f'order:{order.pk}', require_funds=True, order=order,
+    )
+
+
+def refund_order(order) -> bool:
+    """ Возврат оплаченного заказа на баланс """
+    return post_entry(order.user_id, order.total_amount, BalanceEntry.Kind.REFUND, f'refund:{order.pk}', order=order)
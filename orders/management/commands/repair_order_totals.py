@@ -0,0 +1,31 @@
+import logging
+from django.db.models import F
+from django.core.management.base import BaseCommand
+
+from orders.models import Order
+
+
+logger = logging.getLogger('logs')
+
+
+class Command(BaseCommand):
+    """ Команда сверки сохраненных сумм заказов с их позициями """
+    help = 'Находит заказы с расхождением total_amount и суммы позиций и исправляет их'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Только показать расхождения')
+
+    def handle(self, *args, **options):
+        broken = (
+            Order.objects
+                .annotate(actual_total=Order.total_expression())
+                .exclude(total_amount=F('actual_total'))
+                .values_list('pk', flat=True)
+        )
+        pks = list(broken)
+
+        if pks and not options['dry_run']:
+            Order.refresh_total(*pks)
+            logger.info(f'Заказы: Исправлены суммы {len(pks)} заказов')
+
+        self.stdout.write(self.style.SUCCESS(f'Заказов с расхождением суммы: {len(pks)}'))
@@ -0,0 +1,32 @@
+import time
+import logging
+from django.core.management.base import BaseCommand
+
+from orders.outbox import send_pending, MAX_ATTEMPTS
+
+
+logger = logging.getLogger('logs')
+
+
+class Command(BaseCommand):
+    """ Воркер отправки писем из outbox """
+    help = 'Отправляет письма из очереди пачками через одно SMTP-соединение'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50, help='Писем за одно соединение')
+        parser.add_argument('--interval', type=float, default=5, help='Пауза между опросами пустой очереди, сек')
+        parser.add_argument('--max-attempts', type=int, default=MAX_ATTEMPTS, help='Попыток до статуса FAILED')
+        parser.add_argument('--once', action='store_true', help='Отправить одну пачку и выйти')
+
+    def handle(self, *args, **options):
+        logger.info('Почта: Воркер outbox запущен')
+
+        while True:
+            sent = send_pending(batch_size=options['batch_size'], max_attempts=options['max_attempts'])
+
+            if options['once']:
+                self.stdout.write(self.style.SUCCESS(f'Отправлено писем: {sent}'))
+                return
+
+            if not sent:
+                time.sleep(options['interval'])
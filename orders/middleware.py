@@ -0,0 +1,35 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.http import HttpRequest, HttpResponse
+
+from .cart_store import get_cart_store
+
+
+class CartMiddleware:
+    """ Сохранение корзины в хранилище CART_BACKEND, если за запрос она менялась """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        response = self.get_response(request)
+
+        if getattr(request, '_cart_modified', False):
+            get_cart_store().save(request, response, request._cart)
+
+        return response
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        response = await self.get_response(request)
+
+        if getattr(request, '_cart_modified', False):
+            # cache/redis хранилища - блокирующий ввод-вывод
+            await sync_to_async(get_cart_store().save)(request, response, request._cart)
+
+        return response
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:01
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+from django.db.models import Sum, F, DecimalField, ExpressionWrapper, OuterRef, Subquery
+
+
+def fill_total_amount(apps, schema_editor):
+    Order = apps.get_model('orders', 'Order')
+    OrderItem = apps.get_model('orders', 'OrderItem')
+    items = (
+        OrderItem.objects
+            .filter(order=OuterRef('pk'))
+            .order_by()
+            .values('order')
+            .annotate(total=Sum(ExpressionWrapper(F('quantity') * F('price'), output_field=DecimalField())))
+            .values('total')
+    )
+    Order.objects.update(total_amount=Coalesce(Subquery(items), 0, output_field=DecimalField()))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0005_order_method'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='total_amount',
+            field=models.DecimalField(blank=True, decimal_places=2, default=0, max_digits=11, verbose_name='Сумма'),
+        ),
+        migrations.RunPython(fill_total_amount, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:29
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def open_balances(apps, schema_editor):
+    """ Текущие балансы переносятся в журнал начальными остатками """
+    Profile = apps.get_model('accounts', 'Profile')
+    BalanceEntry = apps.get_model('orders', 'BalanceEntry')
+    BalanceEntry.objects.bulk_create([
+        BalanceEntry(user_id=user_id, kind='opening', amount=balance, key=f'opening:{user_id}')
+        for user_id, balance in Profile.objects.exclude(balance=0).values_list('user_id', 'balance').iterator()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0007_outgoingemail'),
+        ('accounts', '0006_alter_profile_balance'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BalanceEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('opening', 'Начальный остаток'), ('top_up', 'Пополнение'), ('order', 'Оплата заказа'), ('refund', 'Возврат')], max_length=20, verbose_name='Тип')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=11, verbose_name='Сумма')),
+                ('key', models.CharField(max_length=255, unique=True, verbose_name='Ключ')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('order', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='orders.order', verbose_name='Заказ')),
+                ('payment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='orders.payment', verbose_name='Платеж')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='balance_entries', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Движение по балансу',
+                'verbose_name_plural': 'Журнал баланса',
+                'indexes': [models.Index(fields=['user', 'created_at'], name='orders_bala_user_id_f7d47c_idx')],
+            },
+        ),
+        migrations.RunPython(open_balances, migrations.RunPython.noop),
+    ]
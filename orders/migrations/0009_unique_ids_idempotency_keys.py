@@ -0,0 +1,63 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:31
+
+import shop.ids
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def dedupe_ids(apps, schema_editor):
+    """ Старые номера вида "<user>_<секунды>" могли совпасть: повторы получают суффикс с pk """
+    for model, field in (('Order', 'order_id'), ('Payment', 'transaction_id')):
+        Model = apps.get_model('orders', model)
+        duplicates = (
+            Model.objects
+                .exclude(**{f'{field}__isnull': True})
+                .values(field)
+                .annotate(n=Count('pk'))
+                .filter(n__gt=1)
+                .values_list(field, flat=True)
+        )
+        for value in list(duplicates):
+            for pk in Model.objects.filter(**{field: value}).order_by('pk').values_list('pk', flat=True)[1:]:
+                Model.objects.filter(pk=pk).update(**{field: f'{value}_{pk}'})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0008_balanceentry'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_ids, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='order',
+            name='idempotency_key',
+            field=models.CharField(blank=True, max_length=64, null=True, verbose_name='Ключ идемпотентности'),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='idempotency_key',
+            field=models.CharField(blank=True, max_length=64, null=True, verbose_name='Ключ идемпотентности'),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='order_id',
+            field=models.CharField(blank=True, default=shop.ids.new_id, max_length=30, null=True, unique=True, verbose_name='Номер заказа'),
+        ),
+        migrations.AlterField(
+            model_name='payment',
+            name='transaction_id',
+            field=models.CharField(default=shop.ids.new_id, max_length=255, unique=True, verbose_name='Транзакция'),
+        ),
+        migrations.AddConstraint(
+            model_name='order',
+            constraint=models.UniqueConstraint(fields=('user', 'idempotency_key'), name='order_user_idempotency_key'),
+        ),
+        migrations.AddConstraint(
+            model_name='payment',
+            constraint=models.UniqueConstraint(fields=('user', 'idempotency_key'), name='payment_user_idempotency_key'),
+        ),
+    ]
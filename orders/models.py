@@ -1,8 +1,12 @@
+from decimal import Decimal
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator
-from django.db.models import Sum, F, DecimalField, ExpressionWrapper
+from django.db.models.functions import Coalesce
+from django.db.models import Sum, F, DecimalField, ExpressionWrapper, OuterRef, Subquery
 
+from shop.ids import new_id
 from products.models import Product
 
 
@@ -28,7 +32,7 @@ class Order(models.Model):
         DELIVERED = 'delivered', 'Доставлен'
         CANCELED = 'canceled', 'Отменён'
 
-    order_id = models.CharField(max_length=30, null=True, blank=True, verbose_name='Номер заказа')
+    order_id = models.CharField(max_length=30, unique=True, null=True, blank=True, default=new_id, verbose_name='Номер заказа')
     status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING, verbose_name='Статус')
     user = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name='Заказчик', related_name='orders')
     city = models.CharField(max_length=100, null=True, blank=True, verbose_name='Город')
@@ -36,12 +40,17 @@ class Order(models.Model):
     phone = models.CharField(max_length=11, null=True, blank=True, verbose_name='Телефон')
     method = models.ForeignKey(PaymentMethod, on_delete=models.SET_NULL, null=True, verbose_name='Метод')
     invoice_number = models.IntegerField(default=0, verbose_name='Инвойс')
+    total_amount = models.DecimalField(max_digits=11, decimal_places=2, default=0, blank=True, verbose_name='Сумма')
+    idempotency_key = models.CharField(max_length=64, null=True, blank=True, verbose_name='Ключ идемпотентности')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='Дата изменения')
 
     class Meta:
         verbose_name = "Заказ"
         verbose_name_plural = "Заказы"
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'idempotency_key'], name='order_user_idempotency_key'),
+        ]
 
     @property
     def total_price(self):
@@ -51,6 +60,26 @@ class Order(models.Model):
         )
         return result['total'] or 0
 
+    @staticmethod
+    def total_expression():
+        """ Подзапрос суммы позиций заказа для UPDATE по заказам """
+        items = (
+            OrderItem.objects
+                .filter(order=OuterRef('pk'))
+                .order_by()
+                .values('order')
+                .annotate(total=Sum(ExpressionWrapper(F('quantity') * F('price'), output_field=DecimalField())))
+                .values('total')
+        )
+        return Coalesce(Subquery(items), 0, output_field=DecimalField())
+
+    @classmethod
+    def refresh_total(cls, *pks):
+        """ Пересчет сохраненной суммы заказов одним UPDATE (без pks - по всем заказам) """
+        qs = cls.objects.filter(pk__in=pks) if pks else cls.objects.all()
+
+        return qs.update(total_amount=cls.total_expression())
+
     def __str__(self):
         return f'Заказ от {self.created_at} - {self.user.username}'
 
@@ -84,16 +113,79 @@ class Payment(models.Model):
 
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='payments', verbose_name='Заказчик')
     method = models.ForeignKey(PaymentMethod, on_delete=models.SET_NULL, null=True, verbose_name='Метод')
-    transaction_id = models.CharField(max_length=255, verbose_name='Транзакция')
+    transaction_id = models.CharField(max_length=255, unique=True, default=new_id, verbose_name='Транзакция')
     status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING, verbose_name='Статус')
     amount = models.DecimalField(max_digits=9, decimal_places=2, verbose_name='Сумма')
+    idempotency_key = models.CharField(max_length=64, null=True, blank=True, verbose_name='Ключ идемпотентности')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='Дата изменения')
 
     class Meta:
         verbose_name = "Оплата"
         verbose_name_plural = "Оплаты"
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'idempotency_key'], name='payment_user_idempotency_key'),
+        ]
 
     def __str__(self):
         return f'Платёж от {self.created_at} на сумму {self.amount}'
 
+
+class BalanceEntry(models.Model):
+    """
+    Модель движения по балансу (журнал только на добавление).
+    key - ключ идемпотентности: одно и то же движение (платеж, оплата или возврат заказа) проводится один раз.
+    """
+    class Kind(models.TextChoices):
+        OPENING = 'opening', 'Начальный остаток'
+        TOP_UP = 'top_up', 'Пополнение'
+        ORDER = 'order', 'Оплата заказа'
+        REFUND = 'refund', 'Возврат'
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='balance_entries', verbose_name='Пользователь')
+    kind = models.CharField(max_length=20, choices=Kind.choices, verbose_name='Тип')
+    amount = models.DecimalField(max_digits=11, decimal_places=2, verbose_name='Сумма')
+    key = models.CharField(max_length=255, unique=True, verbose_name='Ключ')
+    order = models.ForeignKey(Order, on_delete=models.SET_NULL, null=True, blank=True, verbose_name='Заказ')
+    payment = models.ForeignKey(Payment, on_delete=models.SET_NULL, null=True, blank=True, verbose_name='Платеж')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')
+
+    class Meta:
+        verbose_name = "Движение по балансу"
+        verbose_name_plural = "Журнал баланса"
+        indexes = [models.Index(fields=['user', 'created_at'])]
+
+    @classmethod
+    def balance_of(cls, user_id: int):
+        """ Баланс пользователя по журналу (для сверки с Profile.balance) """
+        return cls.objects.filter(user_id=user_id).aggregate(total=Coalesce(Sum('amount'), Decimal('0')))['total']
+
+    def __str__(self):
+        return f'{self.get_kind_display()} {self.amount} ({self.key})'
+
+
+class OutgoingEmail(models.Model):
+    """ Модель письма в очереди на отправку (outbox) """
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Ожидает'
+        SENT = 'sent', 'Отправлено'
+        FAILED = 'failed', 'Ошибка'
+
+    subject = models.CharField(max_length=255, verbose_name='Тема')
+    body = models.TextField(verbose_name='Текст')
+    from_email = models.CharField(max_length=255, null=True, blank=True, verbose_name='Отправитель')
+    recipients = models.JSONField(default=list, verbose_name='Получатели')
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING, verbose_name='Статус')
+    attempts = models.PositiveIntegerField(default=0, verbose_name='Попыток')
+    last_error = models.TextField(null=True, blank=True, verbose_name='Последняя ошибка')
+    send_after = models.DateTimeField(default=timezone.now, verbose_name='Отправить после')
+    sent_at = models.DateTimeField(null=True, blank=True, verbose_name='Дата отправки')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')
+
+    class Meta:
+        verbose_name = "Письмо"
+        verbose_name_plural = "Очередь писем"
+        indexes = [models.Index(fields=['status', 'send_after'])]
+
+    def __str__(self):
+        return f'{self.subject} -> {", ".join(self.recipients)}'
@@ -0,0 +1,128 @@
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.core.mail import EmailMessage, get_connection
+
+from .models import OutgoingEmail
+
+
+logger = logging.getLogger('logs')
+
+MAX_ATTEMPTS = 5
+BACKOFF_SECONDS = 30
+# на сколько письмо уходит из очереди, пока воркер его отправляет
+CLAIM_SECONDS = 300
+
+
+def queue_email(subject: str, message: str, recipient_list: list, from_email=None):
+    """
+    Постановка письма в outbox.
+    Запись создается только после коммита текущей транзакции, поэтому откат заказа не оставит писем,
+    а медленный SMTP не держит блокировки и воркер gunicorn.
+    """
+    email = OutgoingEmail(
+        subject=subject,
+        body=message,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        recipients=list(recipient_list),
+    )
+    transaction.on_commit(email.save)
+
+
+def send_pending(batch_size: int = 50, max_attempts: int = MAX_ATTEMPTS) -> int:
+    """
+    Отправка пачки писем из outbox через одно SMTP-соединение.
+    Пачка забирается короткой транзакцией с SKIP LOCKED (claim_pending), а отправка идет уже после коммита,
+    так что медленный SMTP не держит блокировки строк и транзакцию.
+    Неудачные письма откладываются с экспоненциальной задержкой, после max_attempts помечаются FAILED.
+    """
+    emails = claim_pending(batch_size, max_attempts)
+
+    if not emails:
+        return 0
+
+    sent = 0
+    connection = get_connection(fail_silently=False)
+
+    try:
+        connection.open()
+    except Exception as e:
+        logger.error(f'Почта: Нет соединения с SMTP - {e}')
+        for email in emails:
+            _postpone(email, e, max_attempts)
+        return 0
+
+    try:
+        for email in emails:
+            message = EmailMessage(
+                subject=email.subject,
+                body=email.body,
+                from_email=email.from_email,
+                to=email.recipients,
+                connection=connection,
+            )
+            try:
+                message.send()
+            except Exception as e:
+                logger.error(f'Почта: Письмо ({email.pk}) не отправлено - {e}')
+                _postpone(email, e, max_attempts)
+                continue
+
+            email.status = OutgoingEmail.Status.SENT
+            email.sent_at = timezone.now()
+            email.save(update_fields=['status', 'sent_at'])
+            sent += 1
+    finally:
+        connection.close()
+
+    logger.info(f'Почта: Отправлено {sent} из {len(emails)} писем')
+
+    return sent
+
+
+def claim_pending(batch_size: int, max_attempts: int) -> list:
+    """
+    Захват пачки писем: попытка засчитывается сразу, а send_after сдвигается на CLAIM_SECONDS,
+    поэтому пока воркер отправляет письма, другие воркеры их не берут, а если он упадет,
+    письма вернутся в очередь после этого срока. Письма, уже исчерпавшие попытки (воркер падал на них), - FAILED.
+    """
+    now = timezone.now()
+
+    with transaction.atomic():
+        emails = list(
+            OutgoingEmail.objects
+                .select_for_update(skip_locked=True)
+                .filter(status=OutgoingEmail.Status.PENDING, send_after__lte=now)
+                .order_by('send_after', 'pk')[:batch_size]
+        )
+
+        exhausted = [email.pk for email in emails if email.attempts >= max_attempts]
+        if exhausted:
+            OutgoingEmail.objects.filter(pk__in=exhausted).update(status=OutgoingEmail.Status.FAILED)
+            logger.error(f'Почта: Письма {exhausted} не отправлены за {max_attempts} попыток')
+
+        emails = [email for email in emails if email.pk not in exhausted]
+        OutgoingEmail.objects.filter(pk__in=[email.pk for email in emails]).update(
+            attempts=F('attempts') + 1,
+            send_after=now + timedelta(seconds=CLAIM_SECONDS),
+        )
+
+    for email in emails:
+        email.attempts += 1
+
+    return emails
+
+
+def _postpone(email: OutgoingEmail, error: Exception, max_attempts: int):
+    """ Перенос письма на повторную попытку или перевод в FAILED (попытка уже засчитана при захвате) """
+    email.last_error = str(error)
+
+    if email.attempts >= max_attempts:
+        email.status = OutgoingEmail.Status.FAILED
+    else:
+        email.send_after = timezone.now() + timedelta(seconds=BACKOFF_SECONDS * 2 ** (email.attempts - 1))
+
+    email.save(update_fields=['last_error', 'status', 'send_after'])
@@ -1,23 +1,23 @@
-import time
 import logging
 import graphene
-from decimal import Decimal
 from graphql import GraphQLError
-from django.conf import settings
-from django.db import transaction
-from django.core.mail import send_mail
-from django.contrib.auth.models import User
 from django.shortcuts import get_object_or_404
 from graphql_jwt.decorators import login_required
 from graphene_django.types import DjangoObjectType
 
 from .cert_session import Cart
+from .services import place_order, create_payment, update_cart, CartError
+from shop.optimizer import optimize
+from shop.dataloaders import get_loaders
+from shop.pagination import KeysetPaginator, connection_from_page
 from products.models import Product
 from .models import Order, OrderItem, Payment
 
 
 logger = logging.getLogger('api_logs')
 
+MAX_PAGE_SIZE = 100
+
 
 class OrderType(DjangoObjectType):
     """Тип заказа"""
@@ -25,6 +25,14 @@ class OrderType(DjangoObjectType):
         model = Order
         fields = '__all__'
 
+    @staticmethod
+    def resolve_items(root, info):
+        return get_loaders(info).items_by_order.load_for(root, 'items', root.pk)
+
+    @staticmethod
+    def resolve_user(root, info):
+        return get_loaders(info).user.load_for(root, 'user', root.user_id)
+
 
 class OrderItemType(DjangoObjectType):
     """Тип злемента заказа"""
@@ -32,6 +40,20 @@ class OrderItemType(DjangoObjectType):
         model = OrderItem
         fields = '__all__'
 
+    @staticmethod
+    def resolve_product(root, info):
+        return get_loaders(info).product.load_for(root, 'product', root.product_id)
+
+    @staticmethod
+    def resolve_order(root, info):
+        return get_loaders(info).order.load_for(root, 'order', root.order_id)
+
+
+class OrderConnection(graphene.relay.Connection):
+    """Соединение заказов с keyset-курсорами"""
+    class Meta:
+        node = OrderType
+
 
 class PaymentType(DjangoObjectType):
     """Тип платежа"""
@@ -52,6 +74,13 @@ class Query(graphene.ObjectType):
         limit=graphene.Int(),
         offset=graphene.Int(),
     )
+    orders_connection = graphene.Field(
+        OrderConnection,
+        pk=graphene.Int(required=True),
+        first=graphene.Int(default_value=20),
+        after=graphene.String(),
+        before=graphene.String(),
+    )
     order_by_id = graphene.Field(OrderType, pk=graphene.Int(required=True))
     all_order_items = graphene.List(OrderItemType, pk=graphene.Int(required=True))
     all_payments = graphene.List(PaymentType, pk=graphene.Int(required=True))
@@ -62,13 +91,24 @@ class Query(graphene.ObjectType):
     @login_required
     def resolve_all_orders_by_user_id(root, info, pk, limit=None, offset=None):
         """Получение всех заказов пользователя"""
-        lst = Order.objects.filter(user_id=pk).prefetch_related('items')
+        lst = optimize(Order.objects.filter(user_id=pk), info)
         if offset is not None:
             lst = lst[offset:]
         if limit is not None:
             lst = lst[:limit]
 
-        return lst
+        return get_loaders(info).seen(lst)
+
+    @staticmethod
+    @login_required
+    def resolve_orders_connection(root, info, pk, first=20, after=None, before=None):
+        """Получение заказов пользователя страницами по курсору"""
+        lst = optimize(Order.objects.filter(user_id=pk), info, path=('edges', 'node'), keep=('created_at',))
+        paginator = KeysetPaginator(lst, min(max(first, 1), MAX_PAGE_SIZE), ordering=('-created_at', '-pk'))
+        page = paginator.get_page(after=after, before=before)
+        get_loaders(info).seen(page)
+
+        return connection_from_page(OrderConnection, page)
 
     @staticmethod
     @login_required
@@ -84,7 +124,7 @@ class Query(graphene.ObjectType):
     @login_required
     def resolve_all_order_items(root, info, pk):
         """Получение элементов заказа по его ID"""
-        return OrderItem.objects.filter(order_id=pk)
+        return get_loaders(info).seen(optimize(OrderItem.objects.filter(order_id=pk), info))
 
     @staticmethod
     @login_required
@@ -121,25 +161,20 @@ class Query(graphene.ObjectType):
 
 
 class CreatePayment(graphene.Mutation):
-    """Создание платежа пополняющего баланс"""
+    """Создание платежа пополняющего баланс (повтор с тем же idempotencyKey вернет тот же платеж)"""
     class Arguments:
         amount = graphene.Decimal(required=True)
         method_id = graphene.Int(required=True)
+        idempotency_key = graphene.String(required=False)
 
     result = graphene.Field(PaymentType)
 
     @login_required
-    def mutate(self, info, amount, method_id):
+    def mutate(self, info, amount, method_id, idempotency_key=None):
         user = info.context.user
         try:
-            transaction_id = f'{user.pk}_{int(time.time())}'
-
-            payment = Payment.objects.create(
-                user=user,
-                amount=amount,
-                method_id=method_id,
-                transaction_id=transaction_id,
-                status='completed'
+            payment = create_payment(
+                user, amount, method_id, idempotency_key or info.context.headers.get('Idempotency-Key'),
             )
 
             return CreatePayment(result=payment)
@@ -177,80 +212,62 @@ class ChangeCart(graphene.Mutation):
         return ChangeCart(ok=True, cart=cart.cart)
 
 
+class CartLineInput(graphene.InputObjectType):
+    """Позиция корзины: итоговое количество товара (0 - удалить)"""
+    product_id = graphene.Int(required=True)
+    qty = graphene.Int(required=True)
+
+
+class UpdateCart(graphene.Mutation):
+    """Пакетное изменение корзины"""
+    class Arguments:
+        lines = graphene.List(graphene.NonNull(CartLineInput), required=True)
+
+    ok = graphene.Boolean()
+    cart = graphene.JSONString()
+    total = graphene.String()
+
+    @login_required
+    def mutate(self, info, lines):
+        cart = Cart(info.context)
+        try:
+            update_cart(cart, [(line.product_id, line.qty) for line in lines])
+        except CartError as e:
+            logger.error(f'Корзина не изменена: {e}')
+            raise GraphQLError(f'Корзина не изменена: {e}')
+
+        return UpdateCart(ok=True, cart=cart.cart, total=cart.get_total_price())
+
+
 class CreateOrder(graphene.Mutation):
-    """Создание заказа из корзины"""
+    """Создание заказа из корзины (повтор с тем же idempotencyKey вернет тот же заказ)"""
     class Arguments:
         phone = graphene.String(required=True)
         city = graphene.String(required=True)
         address = graphene.String(required=True)
         method_id = graphene.Int(required=True)
+        idempotency_key = graphene.String(required=False)
 
     result = graphene.Field(OrderType)
 
     @login_required
-    def mutate(self, info, phone, city, address, method_id):
+    def mutate(self, info, phone, city, address, method_id, idempotency_key=None):
         request = info.context
         user = request.user
         cart = Cart(request)
+        idempotency_key = idempotency_key or request.headers.get('Idempotency-Key')
 
-        if not len(cart):
+        if not len(cart) and not idempotency_key:
             logger.error('Корзина пуста')
             raise GraphQLError('Корзина пуста')
 
         try:
-            with transaction.atomic():
-                order = Order.objects.create(
-                    order_id=f'{user.pk}_{int(time.time())}',
-                    status='pending',
-                    user=user,
-                    city=city,
-                    phone=phone,
-                    address=address,
-                    method_id=method_id,
-                )
-
-                for p in cart.items():
-                    product = p['product']
-                    OrderItem.objects.create(
-                        order_id=order.pk,
-                        product=product,
-                        quantity=p['qty'],
-                        price=p['price'],
-                    )
-                    product.stock -= p['qty']
-                    product.save(update_fields=['stock'])
-
-                profile = getattr(user, 'profile', None)
-
-                if profile:
-                    total = Decimal(order.total_price or 0)
-                    if profile.balance >= total > 0:
-                        profile.balance -= total
-                        profile.save(update_fields=['balance'])
-                        order.status = Order.Status.PAID
-                        order.save(update_fields=['status'])
-
-                superuser = User.objects.filter(is_superuser=True).first()
-                if superuser and superuser.email:
-                    send_mail(
-                        subject=f'Новый заказ {order.order_id}',
-                        message=f'Даказ от пользователя {user.username}',
-                        from_email=settings.DEFAULT_FROM_EMAIL,
-                        recipient_list=[superuser.email],
-                    )
-
-                if user.email:
-                    send_mail(
-                        subject='Заказ создан успешно',
-                        message=f'Спасибо за заказ №{order.order_id}!',
-                        from_email=settings.DEFAULT_FROM_EMAIL,
-                        recipient_list=[user.email],
-                    )
-
-                cart.clear()
-                logger.info(f'Заказ №{order.order_id} создан')
-
-                return CreateOrder(result=order)
+            order = place_order(
+                user, cart, city=city, phone=phone, address=address, method_id=method_id,
+                idempotency_key=idempotency_key,
+            )
+
+            return CreateOrder(result=order)
         except Exception as e:
             logger.error(f'Ошибка заказа: {e}')
             raise GraphQLError(f'Ошибка заказа: {e}')
@@ -259,4 +276,5 @@ class CreateOrder(graphene.Mutation):
 class Mutation(graphene.ObjectType):
     create_payment = CreatePayment.Field()
     change_cart = ChangeCart.Field()
+    update_cart = UpdateCart.Field()
     create_order = CreateOrder.Field()
@@ -0,0 +1,292 @@
+import logging
+from decimal import Decimal
+from django.db import IntegrityError, transaction
+from django.contrib.auth.models import User
+from django.db.models import F, Q, Sum, Case, When, Value, Window
+from django.db.models.expressions import RowRange
+
+from .cert_session import Cart
+from . import ledger
+from .outbox import queue_email
+from products.models import Product
+from shop.ids import new_id
+from .models import Order, OrderItem, Payment, BalanceEntry
+
+
+logger = logging.getLogger('logs')
+
+
+class CheckoutError(Exception):
+    """ Ошибка оформления заказа (пустая корзина, нехватка остатков) """
+
+
+class CartError(Exception):
+    """ Ошибка изменения корзины, errors - сообщения по каждой отклоненной позиции """
+    def __init__(self, errors: list):
+        super().__init__('; '.join(errors))
+        self.errors = errors
+
+
+def update_cart(cart: Cart, lines) -> Cart:
+    """
+    Пакетное изменение корзины: lines - пары (product_id, qty), qty - итоговое количество (0 - удалить).
+    Все позиции проверяются по остаткам одним запросом id__in и применяются вместе с одним сохранением,
+    при любой ошибке корзина не меняется. Тем же запросом загружаются остальные товары корзины для ее снимка.
+    """
+    quantities = {}
+    errors = []
+    for product_id, qty in lines:
+        if qty < 0:
+            errors.append(f'Неверное количество товара {product_id}: {qty}')
+        quantities[int(product_id)] = qty
+
+    loaded = list(Product.objects.filter(pk__in=quantities.keys() | {int(pk) for pk in cart.cart}))
+    products = {p.pk: p for p in loaded if p.is_active and p.pk in quantities}
+
+    for product_id, qty in quantities.items():
+        product = products.get(product_id)
+        if product is None:
+            if qty > 0:
+                errors.append(f'Товар {product_id} не найден')
+        elif product.stock < qty:
+            errors.append(f'Недостаточно товара "{product.name}" на складе (доступно {product.stock})')
+
+    if errors:
+        raise CartError(errors)
+
+    cart.set_many({pk: (qty, products[pk].price if pk in products else None) for pk, qty in quantities.items()})
+    cart.use_products(loaded)
+
+    return cart
+
+
+def place_order(
+    user: User, cart: Cart, city: str, phone: str, address: str, method_id: int, idempotency_key: str = None,
+) -> Order:
+    """
+    Оформление заказа из корзины.
+    Все товары корзины блокируются одним select_for_update и оцениваются по текущим ценам, снятые с продажи
+    товары отклоняют заказ. Позиции пишутся через bulk_create,
+    а остатки списываются одним условным UPDATE, который не даст уйти в минус.
+    Оплата с баланса - условное списание через журнал баланса, без чтения баланса в Python.
+    Повтор с тем же idempotency_key (ретрай клиента, двойной клик) возвращает уже созданный заказ.
+    """
+    if idempotency_key:
+        existing = Order.objects.filter(user=user, idempotency_key=idempotency_key).first()
+        if existing:
+            cart.clear()
+            return existing
+
+    lines = {int(pk): item for pk, item in cart.cart.items()}
+
+    if not lines:
+        raise CheckoutError('Корзина пуста')
+
+    order, created = _create_order(user, lines, city, phone, address, method_id, idempotency_key)
+
+    # корзина очищается после коммита: если транзакция не прошла, товары остаются в корзине
+    cart.clear()
+
+    if created:
+        logger.info(f'Заказы: Заказ - {order.order_id} создан')
+
+    return order
+
+
+def _create_order(
+    user: User, lines: dict, city: str, phone: str, address: str, method_id: int, idempotency_key: str | None,
+) -> tuple[Order, bool]:
+    """ Транзакция оформления заказа, возвращает (заказ, создан ли он сейчас) """
+    with transaction.atomic():
+        products = list(
+            Product.objects
+                .select_for_update()
+                .filter(pk__in=lines.keys())
+                .order_by('pk')
+        )
+
+        if not products:
+            raise CheckoutError('Товары из корзины не найдены')
+
+        if len(products) != len(lines):
+            raise CheckoutError('Часть товаров из корзины больше не продается')
+
+        for product in products:
+            if not product.is_active:
+                raise CheckoutError(f'Товар "{product.name}" больше не продается')
+            if product.stock < lines[product.pk]['qty']:
+                raise CheckoutError(f'Недостаточно товара "{product.name}" на складе')
+
+        # цена - текущая цена заблокированной строки, как в снимке корзины на странице, а не цена на момент добавления
+        total = sum(p.price * lines[p.pk]['qty'] for p in products)
+
+        try:
+            with transaction.atomic():
+                order = Order.objects.create(
+                    order_id=new_id(),
+                    status=Order.Status.PENDING,
+                    user=user,
+                    city=city,
+                    phone=phone,
+                    address=address,
+                    method_id=method_id,
+                    total_amount=total,
+                    idempotency_key=idempotency_key or None,
+                )
+        except IntegrityError:
+            if not idempotency_key:
+                raise
+            # параллельный запрос с тем же ключом успел создать заказ
+            return Order.objects.get(user=user, idempotency_key=idempotency_key), False
+
+        OrderItem.objects.bulk_create([
+            OrderItem(
+                order=order,
+                product=p,
+                quantity=lines[p.pk]['qty'],
+                price=p.price,
+            ) for p in products
+        ])
+
+        in_stock = Q()
+        decrement = []
+        for p in products:
+            qty = lines[p.pk]['qty']
+            in_stock |= Q(pk=p.pk, stock__gte=qty)
+            decrement.append(When(pk=p.pk, then=Value(qty)))
+
+        updated = Product.objects.filter(in_stock).update(stock=F('stock') - Case(*decrement, default=Value(0)))
+
+        if updated != len(products):
+            raise CheckoutError('Недостаточно товара на складе')
+
+        if total > 0 and ledger.charge_order(order):
+            order.status = Order.Status.PAID
+            Order.objects.filter(pk=order.pk).update(status=order.status)
+
+        notify_order_created(order)
+
+    return order, True
+
+
+def create_payment(user: User, amount: Decimal, method_id: int, idempotency_key: str = None) -> Payment:
+    """
+    Завершенный платеж пополнения баланса с новым transaction_id.
+    Повтор с тем же idempotency_key возвращает уже созданный платеж, деньги второй раз не зачисляются.
+    """
+    if idempotency_key:
+        existing = Payment.objects.filter(user=user, idempotency_key=idempotency_key).first()
+        if existing:
+            return existing
+
+    try:
+        with transaction.atomic():
+            payment = Payment.objects.create(
+                user=user,
+                amount=amount,
+                method_id=method_id,
+                transaction_id=new_id(),
+                status=Payment.Status.COMPLETED,
+                idempotency_key=idempotency_key or None,
+            )
+    except IntegrityError:
+        if not idempotency_key:
+            raise
+        return Payment.objects.get(user=user, idempotency_key=idempotency_key)
+
+    logger.info(f'Пополнение: транзакция - {payment.transaction_id}')
+
+    return payment
+
+
+def cancel_order(user: User, pk: int) -> Order | None:
+    """
+    Отмена заказа пользователя: статус меняется условным UPDATE (повторная отмена ничего не делает),
+    оплаченный заказ возвращается на баланс через журнал, остатки возвращаются через F().
+    """
+    order = Order.objects.filter(pk=pk, user=user).exclude(status=Order.Status.CANCELED).first()
+    if order is None:
+        return None
+
+    with transaction.atomic():
+        if not Order.objects.filter(pk=order.pk, status=order.status).update(status=Order.Status.CANCELED):
+            return None
+
+        if order.status != Order.Status.PENDING:
+            ledger.refund_order(order)
+
+        for product_id, quantity in order.items.values_list('product_id', 'quantity'):
+            Product.objects.filter(pk=product_id).update(stock=F('stock') + quantity)
+
+    order.status = Order.Status.CANCELED
+    logger.info(f'Заказы: Заказ - {order.order_id} отменен')
+
+    return order
+
+
+def notify_order_created(order: Order):
+    """ Письма администратору и покупателю о новом заказе (через outbox после коммита) """
+    superuser = User.objects.filter(is_superuser=True).first()
+
+    if superuser and superuser.email:
+        queue_email(
+            subject=f'Новый заказ: {order.order_id}',
+            message=f'Добавлен пользователем {order.user.username}',
+            recipient_list=[superuser.email],
+        )
+
+    if order.user.email:
+        queue_email(
+            subject='Ваш заказ создан',
+            message=f'Спасибо за заказ №{order.order_id}!',
+            recipient_list=[order.user.email],
+        )
+
+
+def settle_pending_orders(user_id: int) -> int:
+    """
+    Оплата ожидающих заказов пользователя с баланса, от старых к новым, пока хватает денег.
+    Нарастающий итог сумм считается одним оконным запросом, оплачиваемый префикс переводится в PAID
+    одним UPDATE, движения пишутся в журнал одним INSERT, а баланс уменьшается через F()
+    под блокировкой строки профиля.
+    """
+    from accounts.models import Profile
+
+    with transaction.atomic():
+        profile = Profile.objects.select_for_update().filter(user_id=user_id).first()
+        if profile is None:
+            return 0
+
+        running = Window(
+            Sum('total_amount'),
+            order_by=[F('created_at').asc(), F('pk').asc()],
+            frame=RowRange(start=None, end=0),
+        )
+        payable = list(
+            Order.objects
+                .filter(user_id=user_id, status=Order.Status.PENDING)
+                .annotate(running_total=running)
+                .filter(running_total__lte=profile.balance or 0)
+                .values_list('pk', 'total_amount', 'running_total')
+        )
+
+        if not payable:
+            return 0
+
+        pks = [pk for pk, _, _ in payable]
+        spent = max(total for _, _, total in payable)
+        paid = Order.objects.filter(pk__in=pks, status=Order.Status.PENDING).update(status=Order.Status.PAID)
+        if paid != len(pks):
+            # часть заказов успели отменить - префикс уже не тот, оплата при следующем пополнении
+            transaction.set_rollback(True)
+            return 0
+
+        BalanceEntry.objects.bulk_create([
+            BalanceEntry(user_id=user_id, kind=BalanceEntry.Kind.ORDER, amount=-amount, key=f'order:{pk}', order_id=pk)
+            for pk, amount, _ in payable
+        ])
+        Profile.objects.filter(pk=profile.pk).update(balance=F('balance') - spent)
+
+    logger.info(f'Заказы: Оплачено {paid} заказов пользователя ({user_id}) на сумму {spent}')
+
+    return paid
@@ -1,9 +1,12 @@
 import logging
-from decimal import Decimal
-from .models import Payment
-from accounts.models import Profile
 from django.dispatch import receiver
 from django.db.models.signals import post_save
+from django.contrib.auth.signals import user_logged_out
+
+from .models import Payment
+from .ledger import top_up
+from .cert_session import Cart
+from accounts.tasks import settle_orders
 
 
 logger = logging.getLogger('api_logs')
@@ -11,12 +14,21 @@ logger = logging.getLogger('api_logs')
 
 @receiver(post_save, sender=Payment)
 def update_balance(sender, instance, created, **kwargs):
-    """ Сигнал пополнения баланса профиля при статусе платежа Завершен """
-    if instance.status == Payment.Status.COMPLETED:
-        try:
-            profile = Profile.objects.get(user=instance.user)
-            profile.balance = (profile.balance or Decimal('0')) + instance.amount
-            profile.save(update_fields=['balance'])
-            logger.info(f'Баланс профиля {instance.user.username} пополнен')
-        except Profile.DoesNotExist:
-            logger.error(f'Профиль не найден {instance.user.username}')
+    """
+    Сигнал пополнения баланса профиля при статусе платежа Завершен.
+    Пополнение проводится через журнал баланса один раз на transaction_id,
+    после него в фоне оплачиваются ожидающие заказы.
+    """
+    if instance.status != Payment.Status.COMPLETED:
+        return
+
+    if top_up(instance):
+        settle_orders.delay(instance.user_id)
+        logger.info(f'Баланс профиля {instance.user.username} пополнен')
+
+
+@receiver(user_logged_out)
+def clear_cart_on_logout(sender, request, user, **kwargs):
+    """ Сигнал очистки корзины при выходе (корзина живет не в сессии и сама с ней не сбрасывается) """
+    if request is not None:
+        Cart(request).clear()
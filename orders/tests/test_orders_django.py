@@ -1,14 +1,23 @@
 import time
 import pytest
 from decimal import Decimal
+from django.core import mail
+from django.utils import timezone
+from django.core.mail import EmailMessage
 from django.test import RequestFactory
 from django.contrib.auth.models import User
+from django.db import connection
 from django.core.management import call_command
+from django.test.utils import CaptureQueriesContext
 from django.contrib.sessions.middleware import SessionMiddleware
 
 from orders.cert_session import Cart
 from products.models import Product
-from orders.models import Order, OrderItem, PaymentMethod
+from orders.outbox import send_pending
+from orders.services import place_order, settle_pending_orders, cancel_order, CheckoutError
+from orders.models import Order, OrderItem, PaymentMethod, Payment, BalanceEntry, OutgoingEmail
+from jobs.models import Job
+from shop.ids import is_id
 
 
 def add_session_to_request(request):
@@ -118,3 +127,281 @@ def test_order_from_cart():
     assert Order.objects.count() == 1
     assert order.items.count() == 1
     assert order.total_price == Decimal('3.60')
+
+
+@pytest.mark.django_db
+def test_repair_order_totals():
+    """ Проверка сверки сохраненной суммы заказа """
+    user = User.objects.get(pk=1)
+    product = Product.objects.get(pk=1)
+    order = Order.objects.create(order_id='repair', user=user)
+    OrderItem.objects.create(order=order, product=product, quantity=3, price=product.price)
+
+    call_command('repair_order_totals')
+    order.refresh_from_db()
+
+    assert order.total_amount == Decimal('5.40')
+    assert order.total_amount == order.total_price
+
+
+@pytest.mark.django_db
+def test_place_order_decrements_stock():
+    """ Проверка оформления заказа через сервис checkout """
+    user = User.objects.get(pk=1)
+    product1 = Product.objects.get(pk=1)
+    product2 = Product.objects.get(pk=2)
+
+    request = add_session_to_request(RequestFactory().get('/'))
+    cart = Cart(request)
+    cart.change(product1, qty=2)
+    cart.change(product2, qty=3)
+
+    order = place_order(user, cart, city='Tver', phone='79888888888', address='Mira', method_id=1)
+    product1.refresh_from_db()
+    product2.refresh_from_db()
+
+    assert order.items.count() == 2
+    assert order.total_amount == Decimal('26.07')
+    assert product1.stock == 98
+    assert product2.stock == 97
+    assert len(cart) == 0
+
+
+@pytest.mark.django_db
+def test_place_order_rejects_oversell():
+    """ Проверка запрета продажи больше остатка """
+    user = User.objects.get(pk=1)
+    product = Product.objects.get(pk=5)
+
+    request = add_session_to_request(RequestFactory().get('/'))
+    cart = Cart(request)
+    cart.change(product, qty=product.stock + 1)
+
+    with pytest.raises(CheckoutError):
+        place_order(user, cart, city='Tver', phone='79888888888', address='Mira', method_id=1)
+
+    product.refresh_from_db()
+
+    assert product.stock == 10
+    assert Order.objects.count() == 0
+    assert len(cart) == 1
+
+
+@pytest.mark.django_db
+def test_order_emails_go_through_outbox(django_capture_on_commit_callbacks):
+    """ Проверка отправки писем о заказе через outbox после коммита """
+    user = User.objects.get(pk=1)
+    request = add_session_to_request(RequestFactory().get('/'))
+    cart = Cart(request)
+    cart.change(Product.objects.get(pk=1), qty=1)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        place_order(user, cart, city='Tver', phone='79888888888', address='Mira', method_id=1)
+
+    assert len(mail.outbox) == 0
+    assert OutgoingEmail.objects.filter(status=OutgoingEmail.Status.PENDING).count() == 2
+
+    call_command('send_outbox', '--once')
+
+    assert len(mail.outbox) == 2
+    assert OutgoingEmail.objects.filter(status=OutgoingEmail.Status.SENT).count() == 2
+
+
+@pytest.mark.django_db
+def test_outbox_claims_before_sending(monkeypatch):
+    """ Проверка захвата писем до отправки: во время SMTP письмо уже вне очереди, исчерпавшее попытки - FAILED """
+    email = OutgoingEmail.objects.create(subject='a', body='b', recipients=['a@bk.ru'])
+    crashed = OutgoingEmail.objects.create(subject='c', body='d', recipients=['c@bk.ru'], attempts=5)
+    seen = []
+
+    def send(message):
+        claimed = OutgoingEmail.objects.get(pk=email.pk)
+        seen.append((claimed.attempts, claimed.send_after > timezone.now()))
+        return 1
+
+    monkeypatch.setattr(EmailMessage, 'send', send)
+
+    assert send_pending(max_attempts=5) == 1
+    assert seen == [(1, True)]
+
+    email.refresh_from_db()
+    crashed.refresh_from_db()
+    assert (email.status, email.attempts) == (OutgoingEmail.Status.SENT, 1)
+    assert crashed.status == OutgoingEmail.Status.FAILED
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('backend', ['cookie', 'cache', 'redis'])
+def test_cart_store_backends(client, settings, backend):
+    """ Проверка хранения корзины вне сессии: между запросами корзина живет в cookie/кеше/Redis """
+    settings.CART_BACKEND = backend
+    settings.CART_REDIS_URL = 'memory://'
+    settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': backend}}
+    product = Product.objects.get(pk=1)
+
+    with CaptureQueriesContext(connection) as ctx:
+        client.post('/orders/cart/', {'product_id': product.pk, 'action': 'inc', 'next_page': '/'})
+        client.post('/orders/cart/', {'product_id': product.pk, 'action': 'inc', 'next_page': '/'})
+    assert not any('django_session' in q['sql'] for q in ctx.captured_queries)
+    assert 'sessionid' not in client.cookies
+
+    response = client.get('/orders/cart/')
+    assert response.context['cart'].cart == {str(product.pk): {'qty': 2, 'price': str(product.price)}}
+
+    client.post('/orders/cart/', {'product_id': product.pk, 'action': 'del', 'next_page': '/'})
+    assert client.cookies['cart'].value == ''
+
+
+@pytest.mark.django_db
+def test_cart_update_endpoint(client):
+    """ Проверка JSON-эндпоинта пакетного изменения корзины """
+    product = Product.objects.get(pk=5)
+    body = {'lines': [{'productId': 1, 'qty': 3}, {'productId': 5, 'qty': product.stock}]}
+
+    response = client.post('/orders/cart/update/', data=body, content_type='application/json')
+    data = response.json()
+    assert response.status_code == 200
+    assert data['cart_len'] == 2
+    assert Decimal(data['total']) == Decimal('1.80') * 3 + product.price * product.stock
+
+    body = {'lines': [{'productId': 5, 'qty': product.stock + 1}, {'productId': 999, 'qty': 1}]}
+    response = client.post('/orders/cart/update/', data=body, content_type='application/json')
+    assert response.status_code == 400
+    assert len(response.json()['errors']) == 2
+
+    response = client.post('/orders/cart/update/', data='{"lines": 1}', content_type='application/json')
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_cart_snapshot_reprices_and_drops(client):
+    """ Проверка снимка корзины: один запрос товаров, новые цены и удаление снятых с продажи товаров """
+    client.post('/orders/cart/update/', data={'lines': [
+        {'productId': 1, 'qty': 2}, {'productId': 2, 'qty': 1}, {'productId': 3, 'qty': 1},
+    ]}, content_type='application/json')
+    Product.objects.filter(pk=1).update(price=Decimal('2.00'))
+    Product.objects.filter(pk=3).update(is_active=False)
+
+    with CaptureQueriesContext(connection) as ctx:
+        response = client.get('/orders/cart/')
+    assert len([q for q in ctx.captured_queries if 'products_product' in q['sql']]) == 1
+
+    cart = response.context['cart']
+    assert [line['product'].pk for line in cart.items()] == [1, 2]
+    assert cart.snapshot.price_changes[0]['old_price'] == Decimal('1.80')
+    assert cart.snapshot.removed == [Product.objects.get(pk=3).name]
+    assert cart.get_total_price() == Decimal('4.00') + Product.objects.get(pk=2).price
+
+    response = client.get('/orders/cart/')
+    assert response.context['cart'].cart['1'] == {'qty': 2, 'price': '2.00'}
+    assert response.context['cart'].snapshot.price_changes == []
+
+
+@pytest.mark.django_db
+def test_settle_pending_orders_pays_prefix():
+    """ Проверка оплаты ожидающих заказов префиксом по нарастающему итогу одним UPDATE """
+    user = User.objects.get(pk=1)
+    orders = [Order.objects.create(order_id=f'settle_{i}', user=user, total_amount=t) for i, t in enumerate([10, 20, 5])]
+    profile = user.profile
+    profile.city = 'Tver'
+    profile.save(update_fields=['city'])
+    assert not Job.objects.exists()
+
+    profile.balance = Decimal('32')
+    profile.save(update_fields=['balance'])
+    assert Job.objects.filter(task='accounts.tasks.settle_orders').count() == 1
+
+    with CaptureQueriesContext(connection) as ctx:
+        assert settle_pending_orders(user.pk) == 2
+    assert len([q for q in ctx.captured_queries if q['sql'].startswith('UPDATE "orders_order"')]) == 1
+
+    statuses = [Order.objects.get(pk=o.pk).status for o in orders]
+    profile.refresh_from_db()
+    assert statuses == [Order.Status.PAID, Order.Status.PAID, Order.Status.PENDING]
+    assert profile.balance == Decimal('2')
+
+
+@pytest.mark.django_db
+def test_balance_ledger_is_idempotent():
+    """ Проверка журнала баланса: платеж зачисляется один раз, оплата и возврат заказа проводятся через журнал """
+    user = User.objects.get(pk=1)
+    stock = Product.objects.get(pk=1).stock
+    payment = Payment.objects.create(user=user, method_id=1, transaction_id='tx_1', amount=Decimal('50'))
+
+    payment.status = Payment.Status.COMPLETED
+    payment.save()
+    payment.save()
+    Payment.objects.get(pk=payment.pk).save()
+
+    user.profile.refresh_from_db()
+    assert user.profile.balance == Decimal('50')
+    assert BalanceEntry.objects.filter(kind=BalanceEntry.Kind.TOP_UP).count() == 1
+
+    request = add_session_to_request(RequestFactory().get('/'))
+    cart = Cart(request)
+    cart.change(Product.objects.get(pk=1), qty=2)
+    order = place_order(user, cart, city='Tver', phone='79888888888', address='Mira', method_id=1)
+
+    assert order.status == Order.Status.PAID
+    assert Order.objects.get(pk=order.pk).status == Order.Status.PAID
+
+    assert cancel_order(user, order.pk) is not None
+    assert cancel_order(user, order.pk) is None
+
+    user.profile.refresh_from_db()
+    assert user.profile.balance == Decimal('50')
+    assert BalanceEntry.balance_of(user.pk) == user.profile.balance
+    assert Product.objects.get(pk=1).stock == stock
+    assert list(BalanceEntry.objects.order_by('pk').values_list('kind', flat=True)) == [
+        BalanceEntry.Kind.TOP_UP, BalanceEntry.Kind.ORDER, BalanceEntry.Kind.REFUND,
+    ]
+
+
+@pytest.mark.django_db
+def test_checkout_and_payment_are_idempotent(client, settings):
+    """ Проверка повторной отправки оформления и пополнения с тем же ключом идемпотентности """
+    settings.MIDDLEWARE = [*settings.MIDDLEWARE, 'django.contrib.messages.middleware.MessageMiddleware']
+    user = User.objects.get(pk=1)
+    client.force_login(user)
+    client.post('/orders/cart/update/', data={'lines': [{'productId': 1, 'qty': 1}]}, content_type='application/json')
+    form = {'phone': '79888888888', 'city': 'Tver', 'address': 'Mira', 'method': 1, 'idempotency_key': 'checkout-1'}
+
+    client.post('/orders/checkout/', form)
+    client.post('/orders/cart/update/', data={'lines': [{'productId': 1, 'qty': 1}]}, content_type='application/json')
+    client.post('/orders/checkout/', form)
+
+    order = Order.objects.get()
+    assert is_id(order.order_id)
+    assert order.items.count() == 1
+
+    for _ in range(2):
+        client.post('/accounts/balance/', {'amount': '25', 'method': 1}, HTTP_IDEMPOTENCY_KEY='top-up-1')
+
+    payment = Payment.objects.get()
+    assert is_id(payment.transaction_id)
+    assert BalanceEntry.objects.filter(kind=BalanceEntry.Kind.TOP_UP).count() == 1
+
+
+@pytest.mark.django_db
+def test_checkout_uses_current_prices_and_rejects_inactive(client, settings):
+    """ Проверка оформления по текущим ценам заблокированных товаров и отказа по снятому с продажи товару """
+    settings.MIDDLEWARE = [*settings.MIDDLEWARE, 'django.contrib.messages.middleware.MessageMiddleware']
+    client.force_login(User.objects.get(pk=1))
+    client.post('/orders/cart/update/', data={'lines': [
+        {'productId': 1, 'qty': 2}, {'productId': 2, 'qty': 1}, {'productId': 3, 'qty': 1},
+    ]}, content_type='application/json')
+    Product.objects.filter(pk=1).update(price=Decimal('2.00'))
+    Product.objects.filter(pk=3).update(is_active=False)
+    form = {'phone': '79888888888', 'city': 'Tver', 'address': 'Mira', 'method': 1}
+
+    response = client.post('/orders/checkout/', form)
+    assert Order.objects.count() == 0
+    # страница заказа показывает снимок корзины: снятый с продажи товар убран, цены обновлены
+    assert [line['product'].pk for line in response.context['cart'].items()] == [1, 2]
+
+    client.post('/orders/checkout/', form)
+
+    order = Order.objects.get()
+    assert order.total_amount == Decimal('4.00') + Product.objects.get(pk=2).price
+    assert order.items.get(product_id=1).price == Decimal('2.00')
+    assert not order.items.filter(product_id=3).exists()
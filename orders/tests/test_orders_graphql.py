@@ -2,11 +2,14 @@
 import json
 import pytest
 from decimal import Decimal
+from django.db import connection
 from django.contrib.auth.models import User
+from django.test.utils import CaptureQueriesContext
 from django.core.management import call_command
 from django.contrib.sessions.middleware import SessionMiddleware
 
 from products.models import Product
+from orders.models import Order, OrderItem
 
 
 def add_session_to_request(request):
@@ -106,3 +109,78 @@ def test_order_from_cart_mutation(auth_client):
     assert data['id'] == '1'
     assert len(data['items']) == 1
     assert data['items'][0]['product']['name'] == 'Unmalted Wheat'
+
+
+def _create_orders(user, count):
+    """Создание заказов с позициями из разных категорий"""
+    for i in range(count):
+        order = Order.objects.create(user=user)
+        for product in Product.objects.filter(pk__in=[1, 2, 3]):
+            OrderItem.objects.create(order=order, product=product, quantity=1, price=product.price)
+
+
+@pytest.mark.django_db
+def test_orders_nested_query_is_batched(auth_client, user):
+    """Тест на постоянное число запросов для вложенных полей заказов"""
+    query = f"""
+        query {{
+          allOrdersByUserId(pk: {user.pk}) {{
+            items {{
+              product {{
+                category {{
+                  name
+                }}
+              }}
+            }}
+          }}
+        }}
+    """
+
+    def run():
+        with CaptureQueriesContext(connection) as queries:
+            response = auth_client.post('/graphql/', data={'query': query}, content_type='application/json')
+        assert 'errors' not in response.json()
+        return response.json()['data']['allOrdersByUserId'], len(queries)
+
+    _create_orders(user, 1)
+    data, few_queries = run()
+    assert len(data) == 1
+
+    _create_orders(user, 4)
+    data, many_queries = run()
+    assert len(data) == 5
+    assert all(item['product']['category']['name'] for order in data for item in order['items'])
+    assert many_queries == few_queries
+
+
+@pytest.mark.django_db
+def test_update_cart_mutation(auth_client):
+    """Тест пакетного изменения корзины: один запрос товаров, отказ целиком при нехватке остатка"""
+    mutation = """
+        mutation ($lines: [CartLineInput!]!) {
+          updateCart(lines: $lines) { ok cart total }
+        }
+    """
+    lines = [{'productId': 1, 'qty': 2}, {'productId': 2, 'qty': 1}, {'productId': 3, 'qty': 4}]
+
+    with CaptureQueriesContext(connection) as ctx:
+        response = auth_client.post(
+            '/graphql/', data={'query': mutation, 'variables': {'lines': lines}}, content_type='application/json',
+        )
+    data = response.json()
+    assert 'errors' not in data, data.get('errors')
+    cart = json.loads(data['data']['updateCart']['cart'])
+    assert {pk: item['qty'] for pk, item in cart.items()} == {'1': 2, '2': 1, '3': 4}
+    assert len([q for q in ctx.captured_queries if 'products_product' in q['sql']]) == 1
+
+    lines = [{'productId': 1, 'qty': 0}, {'productId': 5, 'qty': Product.objects.get(pk=5).stock + 1}]
+    response = auth_client.post(
+        '/graphql/', data={'query': mutation, 'variables': {'lines': lines}}, content_type='application/json',
+    )
+    assert 'errors' in response.json()
+
+    response = auth_client.post(
+        '/graphql/', data={'query': mutation, 'variables': {'lines': lines[:1]}}, content_type='application/json',
+    )
+    cart = json.loads(response.json()['data']['updateCart']['cart'])
+    assert sorted(cart) == ['2', '3']
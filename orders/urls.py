@@ -1,11 +1,15 @@
+from django.conf import settings
 from django.urls import path
 
-from .views import CartView, CheckoutView
+from .views import AsyncCartView, CartView, CartUpdateView, CheckoutView
 
 
 app_name='orders'
 
+cart_view = AsyncCartView if settings.ASYNC_VIEWS else CartView
+
 urlpatterns = [
-    path('cart/', CartView.as_view(), name='cart'),
+    path('cart/', cart_view.as_view(), name='cart'),
+    path('cart/update/', CartUpdateView.as_view(), name='cart-update'),
     path('checkout/', CheckoutView.as_view(), name='checkout'),
 ]
\ No newline at end of file
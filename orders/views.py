@@ -1,29 +1,40 @@
-import time
+import json
 import logging
-from decimal import Decimal
 from django.views import View
-from django.conf import settings
-from django.db import transaction
 from django.contrib import messages
-from django.core.mail import send_mail
-from django.contrib.auth.models import User
-from django.http import HttpResponse, HttpRequest
-from django.shortcuts import render, get_object_or_404, redirect
+from django.http import HttpResponse, HttpRequest, JsonResponse
+from django.shortcuts import render, get_object_or_404, aget_object_or_404, redirect
 
 from .forms import OrderForm
 from .cert_session import Cart
+from .services import place_order, update_cart, CartError
 from products.models import Product
-from .models import PaymentMethod, Order, OrderItem
+from shop.ids import new_id
+from shop.async_views import arender
+from .models import PaymentMethod
 from accounts.mixins import AuthenticatedRequiredMixin
 
 
 logger = logging.getLogger('logs')
 
 
+def notify_cart_changes(request: HttpRequest, cart: Cart):
+    """ Сообщения об изменившихся ценах и снятых с продажи товарах корзины """
+    for line in cart.snapshot.price_changes:
+        messages.warning(
+            request,
+            f'Цена товара "{line["product"].name}" изменилась: ${line["old_price"]} -> ${line["price"]}',
+            fail_silently=True,
+        )
+    for name in cart.snapshot.removed:
+        messages.warning(request, f'Товар "{name}" больше не продается и убран из корзины', fail_silently=True)
+
+
 class CartView(View):
     """ Контроллер корзины товаров """
     def get(self, request: HttpRequest) -> HttpResponse:
         cart = Cart(request)
+        notify_cart_changes(request, cart)
 
         return render(request, 'orders/cart.html', {'cart': cart})
 
@@ -32,37 +43,84 @@ class CartView(View):
         product_id = request.POST.get('product_id')
         next_page = request.POST.get('next_page')
         product = get_object_or_404(Product, id=product_id)
+        self.apply_action(cart, product, request.POST.get('action'))
+
+        return redirect(next_page) if next_page else redirect('products:product', product.slug)
 
-        if request.POST.get('action') == 'inc':
+    def delete(self, request: HttpRequest, pk: int) -> HttpResponse:
+        cart = Cart(request)
+        product = get_object_or_404(Product, pk=pk)
+        cart.remove(product)
+
+        return redirect('orders:cart')
+
+    @staticmethod
+    def apply_action(cart: Cart, product: Product, action: str):
+        if action == 'inc':
             if product.stock >= cart.in_cart(product) + 1:
                 cart.change(product)
-        if request.POST.get('action') == 'dec':
+        if action == 'dec':
             cart.change(product, True)
-        if request.POST.get('action') == 'del':
+        if action == 'del':
             cart.remove(product)
 
+
+class AsyncCartView(CartView):
+    """ Асинхронный вариант CartView (ASGI): товары корзины загружаются через async ORM """
+    async def get(self, request: HttpRequest) -> HttpResponse:
+        cart = await Cart.aload(request)
+        await cart.asnapshot()
+        notify_cart_changes(request, cart)
+
+        return await arender(request, 'orders/cart.html', {'cart': cart})
+
+    async def post(self, request: HttpRequest) -> HttpResponse:
+        cart = await Cart.aload(request)
+        next_page = request.POST.get('next_page')
+        product = await aget_object_or_404(Product, id=request.POST.get('product_id'))
+        self.apply_action(cart, product, request.POST.get('action'))
+
         return redirect(next_page) if next_page else redirect('products:product', product.slug)
 
-    def delete(self, request: HttpRequest, pk: int) -> HttpResponse:
-        cart = Cart(request)
-        product = get_object_or_404(Product, pk=pk)
-        cart.remove(product)
+    async def delete(self, request: HttpRequest, pk: int) -> HttpResponse:
+        cart = await Cart.aload(request)
+        cart.remove(await aget_object_or_404(Product, pk=pk))
 
         return redirect('orders:cart')
 
 
+class CartUpdateView(View):
+    """ JSON-контроллер пакетного изменения корзины: {"lines": [{"productId": 1, "qty": 2}, ...]} """
+    def post(self, request: HttpRequest) -> JsonResponse:
+        try:
+            lines = [(int(line['productId']), int(line['qty'])) for line in json.loads(request.body)['lines']]
+        except (ValueError, TypeError, KeyError):
+            return JsonResponse({'errors': ['Неверный формат запроса']}, status=400)
+
+        cart = Cart(request)
+        try:
+            update_cart(cart, lines)
+        except CartError as e:
+            logger.warning(f'Корзина: Изменение отклонено - {e}')
+            return JsonResponse({'errors': e.errors}, status=400)
+
+        return JsonResponse({'cart': cart.cart, 'cart_len': len(cart), 'total': str(cart.get_total_price())})
+
+
 class CheckoutView(AuthenticatedRequiredMixin, View):
     """ Контроллер создания заказа из корзины """
     template_name = 'orders/checkout.html'
 
     def get(self, request: HttpRequest) -> HttpResponse:
         cart = Cart(request)
+        notify_cart_changes(request, cart)
         first_method = PaymentMethod.objects.first()
         form = OrderForm(initial={
             'phone': request.user.profile.phone,
             'city': request.user.profile.city,
             'address': request.user.profile.address,
-            'method': first_method.pk if first_method else None
+            'method': first_method.pk if first_method else None,
+            'idempotency_key': new_id(),
         })
         ctx = {'form': form, 'cart': cart}
 
@@ -74,71 +132,19 @@ class CheckoutView(AuthenticatedRequiredMixin, View):
 
         if form.is_valid():
             try:
-                with transaction.atomic():
-                    phone = form.cleaned_data.get('phone')
-                    city = form.cleaned_data.get('city')
-                    address = form.cleaned_data.get('address')
-                    method = form.cleaned_data.get('method')
-
-                    order = Order.objects.create(
-                        order_id = f'{request.user.pk}_{int(time.time())}',
-                        status='pending',
-                        user=request.user,
-                        city=city,
-                        phone=phone,
-                        address=address,
-                        method=method,
-                    )
-
-                    for p in cart.items():
-                        product = Product.objects.filter(pk=p['product'].pk).first()
-                        if product:
-                            OrderItem.objects.create(
-                                order_id=order.pk,
-                                product=product,
-                                quantity=p['qty'],
-                                price=p['price'],
-                            )
-                            product.stock -= p['qty']
-                            product.save(update_fields=['stock'])
-
-                    profile = getattr(request.user, 'profile', None)
-
-                    if profile:
-                        total = Decimal(order.total_price or 0)
-                        if profile.balance >= total > 0:
-                            order.status = Order.Status.PAID
-                            order.save(update_fields=['status'])
-                            profile.balance -= total
-                            profile.save(update_fields=['balance'])
-
-                    superuser = User.objects.filter(is_superuser=True).first()
-
-                    if superuser and superuser.email:
-                        send_mail(
-                            subject=f'Новый заказ: {order.order_id}',
-                            message=f'Добавлен пользователем {request.user.username}',
-                            from_email=settings.DEFAULT_FROM_EMAIL,
-                            recipient_list=[superuser.email],
-                        )
-
-                    if request.user.email:
-                        send_mail(
-                            subject='Ваш заказ создан',
-                            message=f'Спасибо за заказ №{order.order_id}!',
-                            from_email=settings.DEFAULT_FROM_EMAIL,
-                            recipient_list=[request.user.email],
-                        )
-
-                    cart.clear()
-                    messages.success(request, f'Заказ - {order.order_id} создан')
-                    logger.info(f'Заказы: Заказ - {order.order_id} создан')
-
-                    return redirect('home')
-
+                order = place_order(
+                    request.user,
+                    cart,
+                    city=form.cleaned_data.get('city'),
+                    phone=form.cleaned_data.get('phone'),
+                    address=form.cleaned_data.get('address'),
+                    method_id=form.cleaned_data.get('method').pk,
+                    idempotency_key=form.cleaned_data.get('idempotency_key') or request.headers.get('Idempotency-Key'),
+                )
+                messages.success(request, f'Заказ - {order.order_id} создан')
+
+                return redirect('home')
             except Exception as e:
-                import traceback
-                traceback.print_exc()
                 messages.error(request, f'Заказ не создан: {e}')
                 logger.error(f'Заказы: Заказ не создан - {e}')
 
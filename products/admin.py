@@ -25,12 +25,12 @@ class ReviewInline(admin.TabularInline):
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
     """ Админка для товаров с миниатюрами """
-    list_display = ('name', 'category', 'price', 'stock', 'is_active', 'rating', 'image_preview')
+    list_display = ('name', 'category', 'price', 'stock', 'is_active', 'rating_avg', 'rating_count', 'image_preview')
     list_editable = ('price', 'stock', 'is_active')
     list_filter = ('category', 'is_active')
     search_fields = ('name', 'description')
     prepopulated_fields = {'slug': ('name',)}
-    readonly_fields = ('created_at', 'updated_at', 'rating', 'image_preview')
+    readonly_fields = ('created_at', 'updated_at', 'rating_avg', 'rating_count', 'image_preview')
     inlines = [ReviewInline]
 
     fieldsets = (
@@ -41,7 +41,7 @@ class ProductAdmin(admin.ModelAdmin):
             'fields': ('image', 'image_preview'),
         }),
         ('Служебное', {
-            'fields': ('created_at', 'updated_at'),
+            'fields': ('rating_avg', 'rating_count', 'created_at', 'updated_at'),
         }),
     )
 
@@ -56,9 +56,9 @@ class ProductAdmin(admin.ModelAdmin):
     image_preview.short_description = 'Превью'
 
     def get_queryset(self, request):
-        """ Подмешиваем аннотацию рейтинга для быстрого отображения """
+        """ Рейтинг хранится в самом товаре, отзывы не подгружаем """
         qs = super().get_queryset(request)
-        return qs.prefetch_related('category').prefetch_related('reviews')
+        return qs.select_related('category')
 
 
 @admin.register(Review)
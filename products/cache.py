@@ -0,0 +1,64 @@
+import hashlib
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.http import QueryDict
+
+from shop.pagination import KeysetPage
+
+
+VERSION_KEY = 'catalog:version'
+CATALOG_PARAMS = ('q', 'sort', 'category', 'after', 'before')
+
+
+def get_version() -> int:
+    """ Текущая версия каталога, входит в ключ каждой закешированной страницы """
+    cache.add(VERSION_KEY, 1, timeout=None)
+    return cache.get(VERSION_KEY) or 1
+
+
+def bump_version():
+    """ Инвалидация всех страниц каталога сменой версии (старые ключи просто истекают) """
+    cache.add(VERSION_KEY, 1, timeout=None)
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 2, timeout=None)
+
+
+def is_enabled() -> bool:
+    """ Страницы каталога действительно сохраняются в кеш (не DummyCache и ненулевой таймаут) """
+    return bool(settings.CATALOG_CACHE_TIMEOUT) and not isinstance(caches[DEFAULT_CACHE_ALIAS], DummyCache)
+
+
+def page_key(query: QueryDict) -> str:
+    """ Ключ страницы каталога по нормализованной строке запроса """
+    normalized = QueryDict(mutable=True)
+    for name in CATALOG_PARAMS:
+        if name == 'category':
+            values = sorted(set(v.strip() for v in query.getlist(name)))
+        else:
+            values = [(query.get(name) or '').strip()]
+        values = [v for v in values if v]
+        if values:
+            normalized.setlist(name, values)
+
+    digest = hashlib.md5(normalized.urlencode().encode()).hexdigest()
+
+    return f'catalog:page:{get_version()}:{digest}'
+
+
+def get_page(query: QueryDict):
+    """ Закешированные данные страницы каталога или None """
+    return cache.get(page_key(query))
+
+
+def set_page(query: QueryDict, categories, page_obj: KeysetPage) -> dict:
+    """ Сохранение страницы каталога: категории и товары страницы с курсорами """
+    data = {
+        'categories': list(categories),
+        'page': page_obj,
+    }
+    cache.set(page_key(query), data, settings.CATALOG_CACHE_TIMEOUT)
+
+    return data
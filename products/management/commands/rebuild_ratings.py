@@ -0,0 +1,17 @@
+import logging
+from django.core.management.base import BaseCommand
+
+from products.models import Product
+
+
+logger = logging.getLogger('logs')
+
+
+class Command(BaseCommand):
+    """ Команда массового пересчета сохраненного рейтинга товаров """
+    help = 'Пересчитывает rating_avg/rating_count всех товаров по активным отзывам'
+
+    def handle(self, *args, **options):
+        updated = Product.refresh_rating()
+        logger.info(f'Товары: Рейтинг пересчитан для {updated} товаров')
+        self.stdout.write(self.style.SUCCESS(f'Рейтинг пересчитан для {updated} товаров'))
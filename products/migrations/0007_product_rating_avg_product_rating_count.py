@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:00
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+from django.db.models import Avg, Count, OuterRef, Subquery, FloatField, IntegerField
+
+
+def fill_rating(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    Review = apps.get_model('products', 'Review')
+    reviews = Review.objects.filter(product=OuterRef('pk'), is_active=True).order_by().values('product')
+    Product.objects.update(
+        rating_avg=Coalesce(Subquery(reviews.annotate(avg=Avg('rating')).values('avg')), 0, output_field=FloatField()),
+        rating_count=Coalesce(Subquery(reviews.annotate(cnt=Count('pk')).values('cnt')), 0, output_field=IntegerField()),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0006_review_is_active'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='rating_avg',
+            field=models.FloatField(blank=True, default=0, verbose_name='Средний рейтинг'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_count',
+            field=models.PositiveIntegerField(blank=True, default=0, verbose_name='Количество оценок'),
+        ),
+        migrations.RunPython(fill_rating, migrations.RunPython.noop),
+    ]
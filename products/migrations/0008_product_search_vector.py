@@ -0,0 +1,60 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:06
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from functools import reduce
+from django.conf import settings
+from django.db import migrations
+from django.contrib.postgres.search import SearchVector
+
+
+def create_search_index(apps, schema_editor):
+    """ GIN индекс и заполнение векторов только для PostgreSQL """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS products_product_search_gin '
+        'ON products_product USING gin (search_vector)'
+    )
+    Product = apps.get_model('products', 'Product')
+    vectors = [
+        SearchVector(field, config=config, weight=weight)
+        for config in settings.PRODUCT_SEARCH_CONFIGS
+        for field, weight in (('name', 'A'), ('description', 'B'))
+    ]
+    Product.objects.update(search_vector=reduce(lambda a, b: a + b, vectors))
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    schema_editor.execute('DROP INDEX IF EXISTS products_product_search_gin')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_product_rating_avg_product_rating_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        # GinIndex из Product.Meta: в состоянии моделей всегда, в базе - только на PostgreSQL
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='product',
+                    index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='products_product_search_gin'),
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(create_search_index, drop_search_index),
+            ],
+        ),
+    ]
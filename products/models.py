@@ -1,9 +1,12 @@
 import os
 from django.db import models
-from django.db.models import Avg
 from django.utils.text import slugify
 from django.contrib.auth.models import User
-from django.db.models.signals import pre_save
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db.models.functions import Coalesce
+from django.db.models import Avg, Count, OuterRef, Subquery, FloatField, IntegerField
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.core.validators import MinValueValidator, MaxValueValidator
 
 
@@ -50,18 +53,42 @@ class Product(models.Model):
     is_active = models.BooleanField(default=True, blank=True, verbose_name='Активен')
     stock = models.IntegerField(default=0, blank=True, verbose_name='Количество')
     image = models.ImageField(upload_to=product_image_path, null=True, blank=True, verbose_name='Изображение')
+    rating_avg = models.FloatField(default=0, blank=True, verbose_name='Средний рейтинг')
+    rating_count = models.PositiveIntegerField(default=0, blank=True, verbose_name='Количество оценок')
+    search_vector = SearchVectorField(null=True, blank=True, editable=False, verbose_name='Поисковый вектор')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='Дата изменения')
 
     class Meta:
         verbose_name = "Товар"
         verbose_name_plural = "Товары"
+        # индекс создает миграция 0008 только на PostgreSQL, в состоянии моделей он объявлен для всех баз
+        indexes = [GinIndex(fields=['search_vector'], name='products_product_search_gin')]
 
     @property
     def rating(self):
-        result = self.reviews.aggregate(avg_rating=Avg('rating'))
+        return round(self.rating_avg or 0)
 
-        return round(result['avg_rating'] or 0)
+    @staticmethod
+    def rating_expressions():
+        """ Подзапросы среднего рейтинга и числа активных отзывов для UPDATE по товарам """
+        reviews = Review.objects.filter(product=OuterRef('pk'), is_active=True).order_by().values('product')
+
+        return {
+            'rating_avg': Coalesce(
+                Subquery(reviews.annotate(avg=Avg('rating')).values('avg')), 0, output_field=FloatField()
+            ),
+            'rating_count': Coalesce(
+                Subquery(reviews.annotate(cnt=Count('pk')).values('cnt')), 0, output_field=IntegerField()
+            ),
+        }
+
+    @classmethod
+    def refresh_rating(cls, *pks):
+        """ Пересчет сохраненного рейтинга одним UPDATE (без pks - по всем товарам) """
+        qs = cls.objects.filter(pk__in=pks) if pks else cls.objects.all()
+
+        return qs.update(**cls.rating_expressions())
 
     def __str__(self):
         return self.name
@@ -90,4 +117,16 @@ def pre_save_product_slug(sender, instance, **kwargs):
         instance.slug = slugify(instance.name)
 
 
+RATING_FIELDS = {'product', 'product_id', 'rating', 'is_active'}
+
+
+def review_rating_changed(sender, instance, update_fields=None, **kwargs):
+    """ сигнал пересчета рейтинга товара при изменении/удалении отзыва """
+    if update_fields is not None and not RATING_FIELDS & set(update_fields):
+        return
+    Product.refresh_rating(instance.product_id)
+
+
 pre_save.connect(pre_save_product_slug, sender=Product)
+post_save.connect(review_rating_changed, sender=Review)
+post_delete.connect(review_rating_changed, sender=Review)
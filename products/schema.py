@@ -1,16 +1,21 @@
-import base64
 import logging
 import graphene
 from graphql import GraphQLError
-from django.core.files.base import ContentFile
 from graphene_django.types import DjangoObjectType
 from graphql_jwt.decorators import login_required, superuser_required
 
+from .search import search_products
+from .tasks import save_product_image
+from shop.optimizer import optimize
+from shop.dataloaders import get_loaders
+from shop.pagination import KeysetPaginator, connection_from_page
 from .models import Category, Product, Review
 
 
 logger = logging.getLogger('api_logs')
 
+MAX_PAGE_SIZE = 100
+
 
 class CategoryType(DjangoObjectType):
     """Тип категорий"""
@@ -18,12 +23,34 @@ class CategoryType(DjangoObjectType):
         model = Category
         fields = '__all__'
 
+    @staticmethod
+    def resolve_parent(root, info):
+        return get_loaders(info).category.load_for(root, 'parent', root.parent_id)
+
+    @staticmethod
+    def resolve_product_set(root, info):
+        return get_loaders(info).products_by_category.load_for(root, 'product_set', root.pk)
+
 
 class ProductType(DjangoObjectType):
     """Тип товаров"""
     class Meta:
         model = Product
-        fields = '__all__'
+        exclude = ('search_vector',)
+
+    @staticmethod
+    def resolve_category(root, info):
+        return get_loaders(info).category.load_for(root, 'category', root.category_id)
+
+    @staticmethod
+    def resolve_reviews(root, info):
+        return get_loaders(info).reviews_by_product.load_for(root, 'reviews', root.pk)
+
+
+class ProductConnection(graphene.relay.Connection):
+    """Соединение товаров с keyset-курсорами"""
+    class Meta:
+        node = ProductType
 
 
 class ReviewType(DjangoObjectType):
@@ -32,18 +59,33 @@ class ReviewType(DjangoObjectType):
         model = Review
         fields = '__all__'
 
+    @staticmethod
+    def resolve_product(root, info):
+        return get_loaders(info).product.load_for(root, 'product', root.product_id)
+
+    @staticmethod
+    def resolve_user(root, info):
+        return get_loaders(info).user.load_for(root, 'user', root.user_id)
+
 
 class Query(graphene.ObjectType):
     all_cats = graphene.List(CategoryType)
     cat_by_id = graphene.Field(CategoryType, pk=graphene.Int(required=True))
     all_products = graphene.List(ProductType, limit=graphene.Int(), offset=graphene.Int())
+    products_connection = graphene.Field(
+        ProductConnection,
+        first=graphene.Int(default_value=20),
+        after=graphene.String(),
+        before=graphene.String(),
+    )
     product_by_id = graphene.Field(ProductType, pk=graphene.Int(required=True))
     all_reviews = graphene.List(ReviewType)
+    search_products = graphene.List(ProductType, q=graphene.String(required=True), limit=graphene.Int())
 
     @staticmethod
     def resolve_all_cats(root, info):
         """Получение всех категорий"""
-        return Category.objects.select_related('parent').prefetch_related('product_set')
+        return get_loaders(info).seen(optimize(Category.objects.all(), info))
 
     @staticmethod
     def resolve_cat_by_id(root, info, pk):
@@ -57,13 +99,23 @@ class Query(graphene.ObjectType):
     @staticmethod
     def resolve_all_products(root, info, limit=None, offset=None):
         """Получение всех товаров"""
-        lst = Product.objects.filter(is_active=True).select_related('category').prefetch_related('reviews')
+        lst = optimize(Product.objects.filter(is_active=True), info)
         if offset is not None:
             lst = lst[offset:]
         if limit is not None:
             lst = lst[:limit]
 
-        return lst
+        return get_loaders(info).seen(lst)
+
+    @staticmethod
+    def resolve_products_connection(root, info, first=20, after=None, before=None):
+        """Получение товаров страницами по курсору"""
+        lst = optimize(Product.objects.filter(is_active=True), info, path=('edges', 'node'), keep=('created_at',))
+        paginator = KeysetPaginator(lst, min(max(first, 1), MAX_PAGE_SIZE), ordering=('-created_at', '-pk'))
+        page = paginator.get_page(after=after, before=before)
+        get_loaders(info).seen(page)
+
+        return connection_from_page(ProductConnection, page)
 
     @staticmethod
     def resolve_product_by_id(root, info, pk):
@@ -74,10 +126,20 @@ class Query(graphene.ObjectType):
             logger.error(f'Товар {pk} не найден')
             raise GraphQLError(f'Товар {pk} не найден')
 
+    @staticmethod
+    def resolve_search_products(root, info, q, limit=None):
+        """Полнотекстовый поиск товаров по релевантности"""
+        lst = optimize(Product.objects.filter(is_active=True), info)
+        lst = search_products(lst, q.strip()) if q.strip() else lst.none()
+        if limit is not None:
+            lst = lst[:limit]
+
+        return get_loaders(info).seen(lst)
+
     @staticmethod
     def resolve_all_reviews(root, info):
         """Получение всех отзывов"""
-        return Review.objects.filter(is_active=True).select_related('product')
+        return get_loaders(info).seen(optimize(Review.objects.filter(is_active=True), info))
 
 
 class CreateCategory(graphene.Mutation):
@@ -168,10 +230,8 @@ class CreateProduct(graphene.Mutation):
             stock=stock, description=description, is_active=is_active,
         )
         if image:
-            format, imgstr = image.split(';base64,') if ';base64,' in image else (None, image)
-            ext = format.split('/')[-1] if format else 'jpg'
-            obj.image.save(f'{obj.pk}.{ext}', ContentFile(base64.b64decode(imgstr)), save=True)
-            logger.info(f'Товар ({obj.name}) создан')
+            save_product_image.delay(obj.pk, image)
+        logger.info(f'Товар ({obj.name}) создан')
 
         return CreateProduct(result=obj)
 
@@ -210,9 +270,7 @@ class UpdateProduct(graphene.Mutation):
             obj.save()
 
             if image:
-                format, imgstr = image.split(';base64,') if ';base64,' in image else (None, image)
-                ext = format.split('/')[-1] if format else 'jpg'
-                obj.image.save(f'{obj.pk}.{ext}', ContentFile(base64.b64decode(imgstr)), save=True)
+                save_product_image.delay(obj.pk, image)
             logger.info(f'Товар ({obj.name}) обновлен')
 
             return UpdateProduct(result=obj)
@@ -274,8 +332,8 @@ class UpdateReview(graphene.Mutation):
     def mutate(self, info, pk, is_active):
         try:
             obj = Review.objects.get(pk=pk)
-            obj.is_active = is_active if is_active else obj.is_active
-            obj.save()
+            obj.is_active = is_active
+            obj.save(update_fields=['is_active'])
             logger.info(f'Отзыв на товар ({obj.product_id}) обновлен')
 
             return UpdateReview(result=obj)
@@ -0,0 +1,58 @@
+from functools import reduce
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q, F, QuerySet
+from django.contrib.postgres.search import SearchVector, SearchQuery, SearchRank
+
+
+SEARCH_FIELDS = (('name', 'A'), ('description', 'B'))
+
+
+def is_supported() -> bool:
+    """ Полнотекстовый поиск есть только в PostgreSQL, на остальных базах работает icontains """
+    return connection.vendor == 'postgresql'
+
+
+def vector_expression():
+    """ Вектор товара: название с весом A, описание с весом B, по каждому языку из настроек """
+    vectors = [
+        SearchVector(field, config=config, weight=weight)
+        for config in settings.PRODUCT_SEARCH_CONFIGS
+        for field, weight in SEARCH_FIELDS
+    ]
+
+    return reduce(lambda a, b: a + b, vectors)
+
+
+def query_expression(q: str):
+    """ Запрос в websearch-синтаксисе по каждому языку из настроек """
+    queries = [SearchQuery(q, config=config, search_type='websearch') for config in settings.PRODUCT_SEARCH_CONFIGS]
+
+    return reduce(lambda a, b: a | b, queries)
+
+
+def update_search_vector(*pks):
+    """ Пересчет сохраненного вектора одним UPDATE (без pks - по всем товарам) """
+    from .models import Product
+
+    if not is_supported():
+        return 0
+
+    qs = Product.objects.filter(pk__in=pks) if pks else Product.objects.all()
+
+    return qs.update(search_vector=vector_expression())
+
+
+def search_products(queryset: QuerySet, q: str) -> QuerySet:
+    """ Фильтрация товаров по строке поиска, на PostgreSQL с сортировкой по релевантности """
+    if not is_supported():
+        return queryset.filter(Q(name__icontains=q) | Q(description__icontains=q))
+
+    query = query_expression(q)
+
+    return (
+        queryset
+            .filter(search_vector=query)
+            .annotate(rank=SearchRank(F('search_vector'), query))
+            .order_by('-rank', '-created_at')
+    )
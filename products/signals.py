@@ -0,0 +1,28 @@
+from django.db import transaction
+from django.dispatch import receiver
+from django.db.models.signals import post_save, post_delete
+
+from . import cache as catalog_cache
+from .search import update_search_vector
+from .models import Category, Product, Review
+
+
+SEARCH_FIELDS = {'name', 'description'}
+
+
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=Review)
+def invalidate_catalog(sender, **kwargs):
+    """ Сигнал сброса кеша каталога при изменении товаров, категорий и отзывов """
+    # Второй сброс после коммита не дает закешировать страницу, прочитанную до коммита
+    catalog_cache.bump_version()
+    transaction.on_commit(catalog_cache.bump_version)
+
+
+@receiver(post_save, sender=Product)
+def update_product_search_vector(sender, instance, update_fields=None, **kwargs):
+    """ Сигнал пересчета поискового вектора при изменении названия или описания """
+    if update_fields is not None and not SEARCH_FIELDS & set(update_fields):
+        return
+    update_search_vector(instance.pk)
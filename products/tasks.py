@@ -0,0 +1,21 @@
+import logging
+
+from jobs.queue import task
+from shop.images import decode_base64_image
+from .models import Product
+
+
+logger = logging.getLogger('logs')
+
+
+@task
+def save_product_image(product_id: int, image: str):
+    """ Задача декодирования и сохранения картинки товара из base64 """
+    product = Product.objects.filter(pk=product_id).first()
+    if product is None:
+        logger.warning(f'Товары: Товар ({product_id}) удален до сохранения картинки')
+        return
+
+    ext, content = decode_base64_image(image)
+    product.image.save(f'{product.pk}.{ext}', content, save=True)
+    logger.info(f'Товары: Картинка товара ({product.name}) сохранена')
@@ -1,7 +1,10 @@
 import pytest
 from django.test import TestCase
 from django.urls import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth.models import User
+from django.core.management import call_command
 from django.core.files.uploadedfile import SimpleUploadedFile
 
 from products.models import Product, Category, Review
@@ -112,3 +115,72 @@ class CatalogViewTest(TestCase):
         )
         response = self.client.get(reverse('products:product', kwargs={'slug': 'one'}))
         self.assertEqual(response.status_code, 200)
+
+
+@pytest.mark.django_db
+def test_product_rating_aggregate():
+    """ Проверка пересчета сохраненного рейтинга при изменении отзывов """
+    user = User.objects.create_user(username='TestUser', email='test@mail.ru')
+    other = User.objects.create_user(username='OtherUser', email='other@mail.ru')
+    category = Category.objects.create(name='Pytest Cat')
+    product = Product.objects.create(name='Product First', unit='1l', price=100, category=category)
+
+    Review.objects.create(user=user, product=product, rating=5, comment='Good')
+    review = Review.objects.create(user=other, product=product, rating=2, comment='Bad')
+    product.refresh_from_db()
+
+    assert product.rating_count == 2
+    assert product.rating_avg == 3.5
+    assert product.rating == 4
+
+    review.is_active = False
+    review.save(update_fields=['is_active'])
+    product.refresh_from_db()
+
+    assert product.rating_count == 1
+    assert product.rating_avg == 5
+
+    Review.objects.filter(product=product).delete()
+    product.refresh_from_db()
+
+    assert product.rating_count == 0
+    assert product.rating_avg == 0
+
+
+@pytest.mark.django_db
+def test_rebuild_ratings_command():
+    """ Проверка команды массового пересчета рейтинга """
+    user = User.objects.create_user(username='TestUser', email='test@mail.ru')
+    category = Category.objects.create(name='Pytest Cat')
+    product = Product.objects.create(name='Product First', unit='1l', price=100, category=category)
+    Review.objects.create(user=user, product=product, rating=4, comment='Good')
+    Product.objects.filter(pk=product.pk).update(rating_avg=0, rating_count=0)
+
+    call_command('rebuild_ratings')
+    product.refresh_from_db()
+
+    assert product.rating_count == 1
+    assert product.rating_avg == 4
+
+
+@pytest.mark.django_db
+def test_catalog_page_cache(client, settings, django_capture_on_commit_callbacks):
+    """ Проверка кеша страницы каталога и его сброса при изменении товара """
+    settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+    category = Category.objects.create(name='Pytest Cat')
+    image = SimpleUploadedFile(name='test_image.jpg', content=b'\x00\x01\x02', content_type='image/jpeg')
+    Product.objects.create(name='Product First', unit='1l', price=100, category=category, image=image)
+
+    response = client.get(reverse('home'), {'sort': 'a_price', 'category': category.pk})
+    assert len(response.context['page_obj']) == 1
+
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(reverse('home'), {'category': category.pk, 'sort': 'a_price', 'page': ''})
+    assert len(response.context['page_obj']) == 1
+    assert not [q for q in queries.captured_queries if 'products_' in q['sql']]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Product.objects.create(name='Product Second', unit='1l', price=50, category=category, image=image)
+
+    response = client.get(reverse('home'), {'sort': 'a_price', 'category': category.pk})
+    assert [p.name for p in response.context['page_obj']] == ['Product Second', 'Product First']
@@ -1,6 +1,8 @@
 # products/test_graphql.py
 import pytest
+from django.db import connection
 from django.contrib.auth.models import User
+from django.test.utils import CaptureQueriesContext
 
 from products.models import Product, Category
 
@@ -227,3 +229,78 @@ def test_add_review_mutation(db, client, product, user, token):
     assert data["user"]["id"] == str(user.pk)
     assert data["product"]["id"] == str(product.pk)
 
+
+
+def test_search_products_query(db, client, product, category):
+    """Тест поиска товаров"""
+    Product.objects.create(name='Other prod', unit='1l', price=10, category=category, description='Nothing here')
+    query = """
+        query {
+          searchProducts(q: "Test prod") {
+            name
+          }
+        }
+    """
+
+    response = client.post("/graphql/", data={"query": query}, content_type="application/json")
+    json_data = response.json()
+    assert "errors" not in json_data, json_data.get("errors")
+    data = json_data["data"]["searchProducts"]
+    assert [p["name"] for p in data] == ["Test prod 1"]
+
+
+def test_products_connection_query(db, client, category):
+    """Тест получения товаров страницами по курсору"""
+    for i in range(3):
+        Product.objects.create(name=f'Paged prod {i}', unit='1l', price=10, category=category)
+    query = """
+        query ($after: String) {
+          productsConnection(first: 2, after: $after) {
+            pageInfo { hasNextPage endCursor }
+            edges { node { name } }
+          }
+        }
+    """
+
+    response = client.post("/graphql/", data={"query": query}, content_type="application/json")
+    first = response.json()["data"]["productsConnection"]
+    assert first["pageInfo"]["hasNextPage"] is True
+    assert [e["node"]["name"] for e in first["edges"]] == ["Paged prod 2", "Paged prod 1"]
+
+    response = client.post(
+        "/graphql/",
+        data={"query": query, "variables": {"after": first["pageInfo"]["endCursor"]}},
+        content_type="application/json",
+    )
+    second = response.json()["data"]["productsConnection"]
+    assert second["pageInfo"]["hasNextPage"] is False
+    assert [e["node"]["name"] for e in second["edges"]] == ["Paged prod 0"]
+
+
+def test_all_cats_query_loads_only_requested(db, client, product, category):
+    """Тест выборки только запрошенных полей: без вложенных товаров таблица товаров не читается"""
+    query = """
+        query {
+          allCats { name }
+        }
+    """
+    with CaptureQueriesContext(connection) as ctx:
+        response = client.post("/graphql/", data={"query": query}, content_type="application/json")
+    assert response.json()["data"]["allCats"] == [{"name": "Test cat 1"}]
+    sql = [q["sql"] for q in ctx.captured_queries]
+    assert not any("products_product" in s for s in sql)
+    assert any('"products_category"."name"' in s and '"products_category"."slug"' not in s for s in sql)
+
+    query = """
+        query {
+          allCats { name productSet { name category { name } } }
+        }
+    """
+    with CaptureQueriesContext(connection) as ctx:
+        response = client.post("/graphql/", data={"query": query}, content_type="application/json")
+    json_data = response.json()
+    assert "errors" not in json_data, json_data.get("errors")
+    assert json_data["data"]["allCats"] == [
+        {"name": "Test cat 1", "productSet": [{"name": "Test prod 1", "category": {"name": "Test cat 1"}}]}
+    ]
+    assert len([q for q in ctx.captured_queries if "products_" in q["sql"]]) == 2
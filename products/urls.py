@@ -1,13 +1,17 @@
+from django.conf import settings
 from django.urls import path
 
-from .views import DetailsView, GuidesView, HomeView, AddReviewView
+from .views import AsyncDetailsView, AsyncHomeView, DetailsView, GuidesView, HomeView, AddReviewView
 
 
 app_name='products'
 
+home_view = AsyncHomeView if settings.ASYNC_VIEWS else HomeView
+details_view = AsyncDetailsView if settings.ASYNC_VIEWS else DetailsView
+
 urlpatterns = [
-    path('', HomeView.as_view(), name='home'),
+    path('', home_view.as_view(), name='home'),
     path('guides/', GuidesView.as_view(), name='guides'),
     path('add-review/', AddReviewView.as_view(), name='add-review'),
-    path('<slug:slug>/', DetailsView.as_view(), name='product'),
+    path('<slug:slug>/', details_view.as_view(), name='product'),
 ]
\ No newline at end of file
@@ -1,13 +1,17 @@
 import logging
+from contextlib import nullcontext
 from django.views import View
 from django.contrib import messages
-from django.core.paginator import Paginator
-from django.db.models.functions import Coalesce
 from django.http import HttpResponse, HttpRequest
-from django.shortcuts import render, get_object_or_404, redirect
-from django.db.models import Avg, Count, Q, Value, FloatField
+from asgiref.sync import sync_to_async
+from django.shortcuts import render, get_object_or_404, aget_object_or_404, redirect
 
 from .forms import ReviewForm
+from shop.replica import ReplicaReadMixin, read_primary
+from shop.async_views import arender
+from shop.pagination import KeysetPaginator
+from .search import search_products, is_supported as search_supported
+from . import cache as catalog_cache
 from orders.models import Order
 from orders.cert_session import Cart
 from .models import Product, Category
@@ -17,57 +21,103 @@ from accounts.mixins import AuthenticatedRequiredMixin
 logger = logging.getLogger('logs')
 
 
-class HomeView(View):
+CATALOG_ORDERING = {
+    'new': ('-created_at', '-pk'),
+    'a_price': ('price', 'pk'),
+    'd_price': ('-price', '-pk'),
+    'rating': ('-rating_count', '-rating_avg', '-pk'),
+}
+
+
+class HomeView(ReplicaReadMixin, View):
     """ Контроллер домашней страницы-каталога """
     def get(self, request: HttpRequest) -> HttpResponse:
-        categories = Category.objects.all()
-        products = (Product.objects
-                    .filter(is_active=True)
-                    .select_related('category')
-                    .prefetch_related('reviews')
-                    .order_by('-created_at')
-        )
-
-        q = request.GET.get('q') or ''
+        q = (request.GET.get('q') or '').strip()
         sort = request.GET.get('sort')
+        selected_categories = request.GET.getlist('category')
+
+        querydict = request.GET.copy()
+
+        for key in ('page', 'after', 'before'):
+            querydict.pop(key, None)
+        querystring = querydict.urlencode()
+
+        data = catalog_cache.get_page(request.GET)
+
+        if data is None:
+            with self.cache_fill_source():
+                page_obj = self.get_page_obj(request, q, sort, selected_categories)
+                data = catalog_cache.set_page(request.GET, Category.objects.all(), page_obj)
+
+        return render(request, 'products/index.html', {
+            'page_obj': data['page'],
+            'categories': data['categories'],
+            'querystring': querystring,
+            'sort': sort,
+            'q': q,
+            'selected_categories': list(map(int, selected_categories)),
+        })
+
+    @staticmethod
+    def cache_fill_source():
+        """
+        Страницу из кеша увидят все клиенты, в том числе только что писавшие: при включенном кеше
+        промах читается с основной базы, а не с отстающей реплики, иначе устаревшая страница
+        жила бы в кеше весь CATALOG_CACHE_TIMEOUT. Без кеша каталог читается с реплики
+        """
+        return read_primary() if catalog_cache.is_enabled() else nullcontext()
+
+    @staticmethod
+    def get_paginator(q: str, sort: str, selected_categories: list) -> KeysetPaginator:
+        """ Пагинатор выборки каталога по поиску, сортировке и категориям """
+        products = Product.objects.filter(is_active=True).select_related('category')
+        ordering = CATALOG_ORDERING['new']
+
         if q:
-            products = products.filter(Q(name__icontains=q) | Q(description__icontains=q))
-
-        if sort == 'a_price':
-            products = products.order_by('price')
-        elif sort == 'd_price':
-            products = products.order_by('-price')
-        elif sort == 'rating':
-            products = (
-                products
-                .annotate(
-                    avg_rating=Coalesce(Avg('reviews__rating'), Value(-1), output_field=FloatField()),
-                    has_rating=Count('reviews', filter=Q(reviews__rating__isnull=False)),
-                )
-                .order_by('-has_rating', '-avg_rating')
-            )
-        else:
-            products = products.order_by('-created_at')
+            products = search_products(products, q)
+            if search_supported():
+                ordering = ('-rank', '-created_at', '-pk')
 
-        selected_categories = request.GET.getlist('category')
+        ordering = CATALOG_ORDERING.get(sort, ordering)
 
         if selected_categories:
             products = products.filter(category__id__in=selected_categories)
 
+        return KeysetPaginator(products, 9, ordering=ordering)
+
+    @classmethod
+    def get_page_obj(cls, request: HttpRequest, q: str, sort: str, selected_categories: list):
+        """ Выборка страницы каталога из базы (используется при промахе кеша) """
+        paginator = cls.get_paginator(q, sort, selected_categories)
+
+        return paginator.get_page(after=request.GET.get('after'), before=request.GET.get('before'))
+
+
+class AsyncHomeView(HomeView):
+    """ Асинхронный вариант HomeView (ASGI): страница каталога и категории через async ORM """
+    async def get(self, request: HttpRequest) -> HttpResponse:
+        q = (request.GET.get('q') or '').strip()
+        sort = request.GET.get('sort')
+        selected_categories = request.GET.getlist('category')
+
         querydict = request.GET.copy()
 
-        if 'page' in querydict:
-            querydict.pop('page')
+        for key in ('page', 'after', 'before'):
+            querydict.pop(key, None)
         querystring = querydict.urlencode()
 
-        paginator = Paginator(products, 9)
-        page_number = request.GET.get('page')
-        page_obj = paginator.get_page(page_number)
+        data = await sync_to_async(catalog_cache.get_page)(request.GET)
 
-        return render(request, 'products/index.html', {
-            'page_obj': page_obj,
-            'paginator': paginator,
-            'categories': categories,
+        if data is None:
+            with self.cache_fill_source():
+                paginator = self.get_paginator(q, sort, selected_categories)
+                page_obj = await paginator.aget_page(after=request.GET.get('after'), before=request.GET.get('before'))
+                categories = [c async for c in Category.objects.all()]
+            data = await sync_to_async(catalog_cache.set_page)(request.GET, categories, page_obj)
+
+        return await arender(request, 'products/index.html', {
+            'page_obj': data['page'],
+            'categories': data['categories'],
             'querystring': querystring,
             'sort': sort,
             'q': q,
@@ -81,7 +131,7 @@ class GuidesView(View):
         return render(request, 'products/guides.html')
 
 
-class DetailsView(View):
+class DetailsView(ReplicaReadMixin, View):
     """ Контроллер детальной инфо товара """
     def get(self, request: HttpRequest, slug: str) -> HttpResponse:
         user = request.user
@@ -116,6 +166,38 @@ class DetailsView(View):
         return render(request, 'products/details.html', ctx)
 
 
+class AsyncDetailsView(DetailsView):
+    """ Асинхронный вариант DetailsView (ASGI): товар, покупка и отзывы через async ORM """
+    async def get(self, request: HttpRequest, slug: str) -> HttpResponse:
+        user = await request.auser()
+        obj = await aget_object_or_404(Product, slug=slug)
+        is_bought = await Order.objects.filter(
+            user=user,
+            status=Order.Status.PAID,
+            items__product_id=obj.pk,
+        ).aexists() if user.is_authenticated else False
+        cart = await Cart.aload(request)
+        review_form = ReviewForm()
+        rating_choices = review_form.fields['rating'].choices
+        reviews = [r async for r in obj.reviews.select_related('user').order_by('-id')[:3]]
+        cant_review = (
+            not user.is_authenticated
+            or not is_bought
+            or await obj.reviews.filter(user=user).aexists()
+        )
+
+        ctx = {
+            'object': obj,
+            'review_form': review_form,
+            'rating_choices': rating_choices,
+            'reviews': reviews,
+            'cant_review': cant_review,
+            'in_cart': cart.in_cart(obj),
+        }
+
+        return await arender(request, 'products/details.html', ctx)
+
+
 class AddReviewView(AuthenticatedRequiredMixin, View):
     """ Контроллер добавления оценки и коммента к товару """
     def post(self, request: HttpRequest) -> HttpResponse:
@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+
+
+class ShopConfig(AppConfig):
+    """ Общие части проекта (без моделей): счетчик соединений с базой для /admin/db/ """
+    name = 'shop'
+
+    def ready(self):
+        from .db import count_connection
+        connection_created.connect(count_connection, dispatch_uid='shop.db.count_connection')
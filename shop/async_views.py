@@ -0,0 +1,28 @@
+from asgiref.sync import sync_to_async
+from django.shortcuts import render
+from django.utils.functional import classproperty
+
+from .views import ShopGraphQLView
+
+
+async def arender(request, template_name: str, context: dict = None, **kwargs):
+    """
+    render для async-контроллеров.
+    Основные выборки контроллер делает через async ORM заранее, а шаблон (шапка с user.profile,
+    счетчик корзины и прочие ленивые связи) рендерится в потоке, где синхронный ORM разрешен.
+    """
+    return await sync_to_async(render)(request, template_name, context, **kwargs)
+
+
+class AsyncShopGraphQLView(ShopGraphQLView):
+    """
+    ShopGraphQLView для ASGI.
+    Резолверы graphene-django 3.2 синхронные, поэтому разбор, проверки и выполнение запроса идут
+    в потоке запроса, а event loop воркера свободен для других соединений.
+    """
+    @classproperty
+    def view_is_async(cls):
+        return True
+
+    async def dispatch(self, request, *args, **kwargs):
+        return await sync_to_async(super().dispatch)(request, *args, **kwargs)
@@ -0,0 +1,26 @@
+from .settings import *
+
+# Настройки нагрузочного сравнения WSGI и ASGI (python manage.py benchmark_servers --settings shop.bench_settings).
+# Отдельная SQLite-база с фикстурами, без кеша каталога (каждая страница читается из базы),
+# каждый SQL-запрос ждет BENCH_DB_LATENCY секунд сетевой задержки до базы (shop.benchmark.BenchmarkConfig)
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'bench.sqlite3',
+    },
+}
+
+DATABASE_REPLICAS = []
+
+INSTALLED_APPS = INSTALLED_APPS + ['shop.benchmark.BenchmarkConfig']
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+    }
+}
+
+DEBUG = False
+
+# задержку получают только серверы, которые запускает benchmark_servers (миграции и фикстуры стенда - без нее)
+BENCH_DB_LATENCY = config('BENCH_DB_LATENCY', default=0, cast=float)
@@ -0,0 +1,83 @@
+import time
+import asyncio
+from statistics import quantiles
+from django.apps import AppConfig
+from django.conf import settings
+from django.db.backends.signals import connection_created
+
+
+def query_latency(execute, sql, params, many, context):
+    """
+    Сетевая задержка до базы (BENCH_DB_LATENCY секунд) на каждый SQL-запрос.
+    Ждет тот поток, который выполняет запрос: в WSGI это воркер, в ASGI - поток sync_to_async
+    async ORM, а event loop в это время обслуживает другие соединения
+    """
+    time.sleep(settings.BENCH_DB_LATENCY)
+    return execute(sql, params, many, context)
+
+
+def add_query_latency(sender, connection, **kwargs):
+    if query_latency not in connection.execute_wrappers:
+        connection.execute_wrappers.append(query_latency)
+
+
+class BenchmarkConfig(AppConfig):
+    """
+    Приложение нагрузочного стенда (только в shop.bench_settings): SQLite отвечает мгновенно,
+    поэтому каждому соединению с базой добавляется задержка удаленной PostgreSQL.
+    Нагрузка определяется настоящим вводом-выводом контроллеров: сколько запросов к базе они делают и где ждут
+    """
+    name = 'shop.benchmark'
+    label = 'benchmark'
+
+    def ready(self):
+        if settings.BENCH_DB_LATENCY > 0:
+            connection_created.connect(add_query_latency, dispatch_uid='shop.benchmark.add_query_latency')
+
+
+async def fetch(host: str, port: int, path: str) -> int:
+    """ GET запрос по HTTP/1.1 с закрытием соединения, возвращает код ответа """
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(f'GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n'.encode())
+    await writer.drain()
+
+    status_line = await reader.readline()
+    await reader.read()
+    writer.close()
+    await writer.wait_closed()
+
+    return int(status_line.split()[1])
+
+
+async def run_load(host: str, port: int, paths: list, total: int, concurrency: int) -> dict:
+    """ total запросов по кругу по paths, не больше concurrency одновременно: пропускная способность и задержки """
+    latencies = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(path: str):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                status = await fetch(host, port, path)
+            except OSError:
+                status = 0
+            if status != 200:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(paths[i % len(paths)]) for i in range(total)))
+    elapsed = time.perf_counter() - started
+
+    percentiles = quantiles(latencies, n=100)
+
+    return {
+        'requests': total,
+        'errors': errors,
+        'seconds': round(elapsed, 2),
+        'rps': round(total / elapsed, 1),
+        'p50_ms': round(percentiles[49] * 1000, 1),
+        'p95_ms': round(percentiles[94] * 1000, 1),
+    }
@@ -0,0 +1,135 @@
+from collections import defaultdict
+from django.contrib.auth.models import User
+
+from accounts.models import Profile
+from orders.models import Order, OrderItem
+from products.models import Category, Product, Review
+
+
+class DataLoader:
+    """
+    Батч-загрузчик для синхронного graphene.
+    Ключи всех уже полученных объектов копятся в очереди (prime), и первый промах load()
+    загружает всю очередь одним запросом - так соседние узлы списка не делают запрос каждый.
+    """
+    def __init__(self, registry, batch_load_fn, many=False):
+        self.registry = registry
+        self.batch_load_fn = batch_load_fn
+        self.many = many
+        self.cache = {}
+        self.queue = set()
+
+    def _empty(self):
+        return [] if self.many else None
+
+    def prime(self, key):
+        if key is not None and key not in self.cache:
+            self.queue.add(key)
+
+    def load(self, key):
+        if key is None:
+            return self._empty()
+        if key not in self.cache:
+            self.queue.add(key)
+            self.dispatch()
+
+        return self.cache.get(key, self._empty())
+
+    def load_for(self, root, name: str, key):
+        """ Связь name объекта root: уже подгруженная select_related/prefetch_related или через load(key) """
+        if name in root._state.fields_cache:
+            return root._state.fields_cache[name]
+
+        prefetched = getattr(root, '_prefetched_objects_cache', {})
+        if name in prefetched:
+            return list(prefetched[name])
+
+        return self.load(key)
+
+    def dispatch(self):
+        keys = list(self.queue)
+        self.queue.clear()
+        result = self.batch_load_fn(keys)
+
+        for key in keys:
+            self.cache[key] = result.get(key, self._empty())
+
+        for key in keys:
+            value = self.cache[key]
+            self.registry.seen(value if self.many else [value] if value is not None else [])
+
+
+def by_pk(queryset):
+    """ Загрузка объектов по первичному ключу: {pk: obj} """
+    def load(keys):
+        return {obj.pk: obj for obj in queryset.filter(pk__in=keys)}
+    return load
+
+
+def by_field(queryset, field, many=True):
+    """ Загрузка объектов по значению поля (обратные связи): {value: [obj, ...]} или {value: obj} """
+    def load(keys):
+        result = defaultdict(list) if many else {}
+        for obj in queryset.filter(**{f'{field}__in': keys}):
+            if many:
+                result[getattr(obj, field)].append(obj)
+            else:
+                result[getattr(obj, field)] = obj
+        return result
+    return load
+
+
+class DataLoaderRegistry:
+    """ Набор загрузчиков одного запроса, хранится в info.context """
+    def __init__(self):
+        self.category = DataLoader(self, by_pk(Category.objects.all()))
+        self.product = DataLoader(self, by_pk(Product.objects.all()))
+        self.user = DataLoader(self, by_pk(User.objects.all()))
+        self.order = DataLoader(self, by_pk(Order.objects.all()))
+        self.products_by_category = DataLoader(self, by_field(Product.objects.order_by('pk'), 'category_id'), many=True)
+        self.reviews_by_product = DataLoader(self, by_field(Review.objects.order_by('pk'), 'product_id'), many=True)
+        self.items_by_order = DataLoader(self, by_field(OrderItem.objects.order_by('pk'), 'order_id'), many=True)
+        self.profile_by_user = DataLoader(self, by_field(Profile.objects.all(), 'user_id', many=False))
+
+        # какие ключи копить при появлении объекта модели: (загрузчик, атрибут объекта)
+        self.sources = {
+            Category: [(self.category, 'parent_id'), (self.products_by_category, 'pk')],
+            Product: [(self.category, 'category_id'), (self.reviews_by_product, 'pk')],
+            Review: [(self.product, 'product_id'), (self.user, 'user_id')],
+            Order: [(self.items_by_order, 'pk'), (self.user, 'user_id')],
+            OrderItem: [(self.product, 'product_id'), (self.order, 'order_id')],
+            User: [(self.profile_by_user, 'pk')],
+            Profile: [(self.user, 'user_id')],
+        }
+        self.identity = {
+            Category: self.category,
+            Product: self.product,
+            User: self.user,
+            Order: self.order,
+        }
+
+    def seen(self, objects):
+        """ Регистрация полученных объектов: кладем их в кеш и копим ключи связанных """
+        objects = list(objects)
+
+        for obj in objects:
+            loader = self.identity.get(type(obj))
+            if loader is not None:
+                loader.cache.setdefault(obj.pk, obj)
+            deferred = obj.get_deferred_fields()
+            for loader, attr in self.sources.get(type(obj), []):
+                if attr not in deferred:
+                    loader.prime(getattr(obj, attr))
+
+        return objects
+
+
+def get_loaders(info) -> DataLoaderRegistry:
+    """ Загрузчики текущего запроса (создаются при первом обращении) """
+    context = info.context
+    loaders = getattr(context, 'loaders', None)
+
+    if loaders is None:
+        loaders = context.loaders = DataLoaderRegistry()
+
+    return loaders
@@ -0,0 +1,59 @@
+import os
+from collections import Counter
+from django.db import connections
+
+
+# подключения Django (connection_created) в этом процессе по алиасам. Без пула это новые соединения
+# с базой: при постоянных соединениях счетчик растет только на старте и после разрывов.
+# С пулом (DB_POOL=1) сигнал приходит на каждую выдачу соединения из пула, настоящие
+# соединения с базой считает сам пул - pool.connections_opened
+connects = Counter()
+
+
+def count_connection(sender, connection, **kwargs):
+    """ Обработчик connection_created (подключается в ShopConfig.ready) """
+    connects[connection.alias] += 1
+
+
+def pool_stats(pool) -> dict:
+    """ Метрики пула psycopg_pool: размер, открытые соединения, ожидающие, выдачи соединений и время ожидания """
+    stats = pool.get_stats()
+    checkouts = stats.get('requests_num', 0)
+    wait_ms = stats.get('requests_wait_ms', 0)
+
+    return {
+        'min_size': stats.get('pool_min', 0),
+        'max_size': stats.get('pool_max', 0),
+        'size': stats.get('pool_size', 0),
+        'available': stats.get('pool_available', 0),
+        'connections_opened': stats.get('connections_num', 0),
+        'waiting': stats.get('requests_waiting', 0),
+        'checkouts': checkouts,
+        'queued': stats.get('requests_queued', 0),
+        'wait_ms': wait_ms,
+        'avg_wait_ms': round(wait_ms / checkouts, 2) if checkouts else 0,
+        'request_errors': stats.get('requests_errors', 0),
+        'connection_errors': stats.get('connections_errors', 0),
+        'connections_lost': stats.get('connections_lost', 0),
+    }
+
+
+def connection_stats() -> dict:
+    """ Состояние соединений процесса по всем алиасам базы (у каждого воркера gunicorn - свое) """
+    result = {'pid': os.getpid(), 'databases': {}}
+
+    for alias in connections:
+        connection = connections[alias]
+        stats = {
+            'vendor': connection.vendor,
+            'conn_max_age': connection.settings_dict.get('CONN_MAX_AGE'),
+            'health_checks': connection.settings_dict.get('CONN_HEALTH_CHECKS'),
+            'open': connection.connection is not None,
+            'connects': connects[alias],
+        }
+        pool = getattr(connection, 'pool', None)
+        if pool is not None:
+            stats['pool'] = pool_stats(pool)
+        result['databases'][alias] = stats
+
+    return result
@@ -0,0 +1,173 @@
+"""
+Конфигурация gunicorn (gunicorn -c python:shop.gunicorn_conf).
+
+Число воркеров, потоков и класс воркера выводятся из лимитов контейнера (cgroup v1/v2),
+любое значение можно задать явно через GUNICORN_* в окружении.
+"""
+import os
+import math
+from pathlib import Path
+
+
+CGROUP_ROOT = Path('/sys/fs/cgroup')
+
+WORKER_CLASSES = {
+    'sync': 'sync',
+    'gthread': 'gthread',
+    'uvicorn': 'uvicorn_worker.UvicornWorker',
+}
+
+# память на воркер и запас под мастер-процесс, МБ
+WORKER_MEMORY_MB = 160
+MASTER_MEMORY_MB = 96
+
+
+def read(path: Path) -> str | None:
+    try:
+        return path.read_text().strip()
+    except OSError:
+        return None
+
+
+def cgroup_cpus(root: Path = CGROUP_ROOT) -> float | None:
+    """ Лимит CPU контейнера (квота / период) или None, если лимита нет """
+    cpu_max = read(root / 'cpu.max')  # cgroup v2: "<квота> <период>" или "max <период>"
+    if cpu_max:
+        quota, _, period = cpu_max.partition(' ')
+        if quota != 'max':
+            return int(quota) / int(period or 100000)
+        return None
+
+    quota = read(root / 'cpu' / 'cpu.cfs_quota_us')  # cgroup v1, -1 - без лимита
+    period = read(root / 'cpu' / 'cpu.cfs_period_us')
+    if quota and period and int(quota) > 0:
+        return int(quota) / int(period)
+
+    return None
+
+
+def cgroup_memory_mb(root: Path = CGROUP_ROOT) -> int | None:
+    """ Лимит памяти контейнера в МБ или None, если лимита нет """
+    value = read(root / 'memory.max') or read(root / 'memory' / 'memory.limit_in_bytes')
+    if not value or value == 'max':
+        return None
+
+    limit = int(value)
+    # cgroup v1 без лимита отдает почти 2**63
+    if limit >= 2 ** 60:
+        return None
+
+    return limit // 2 ** 20
+
+
+def available_cpus() -> int:
+    """ Процессоры, доступные процессу (с учетом taskset/cpuset) """
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def autotune(env=os.environ, root: Path = CGROUP_ROOT) -> dict:
+    """
+    Параметры сервера по лимитам контейнера и переменным окружения:
+    SERVER_MODE (wsgi/asgi), GUNICORN_WORKER_CLASS (sync/gthread/uvicorn), GUNICORN_WORKERS, GUNICORN_THREADS,
+    GUNICORN_WORKER_MEMORY_MB, GUNICORN_PRELOAD, GUNICORN_MAX_REQUESTS, GUNICORN_MAX_REQUESTS_JITTER,
+    GUNICORN_KEEPALIVE, GUNICORN_TIMEOUT, GUNICORN_GRACEFUL_TIMEOUT, GUNICORN_BIND.
+    """
+    quota = cgroup_cpus(root)
+    cpus = max(1, math.ceil(min(quota, available_cpus()) if quota else available_cpus()))
+    memory_mb = cgroup_memory_mb(root)
+
+    asgi = env.get('SERVER_MODE', 'wsgi') == 'asgi'
+    kind = env.get('GUNICORN_WORKER_CLASS') or ('uvicorn' if asgi else 'gthread')
+    if kind not in WORKER_CLASSES:
+        raise ValueError(f'GUNICORN_WORKER_CLASS: {kind}, ожидается одно из {", ".join(WORKER_CLASSES)}')
+    if asgi != (kind == 'uvicorn'):
+        raise ValueError(f'GUNICORN_WORKER_CLASS={kind} не подходит для SERVER_MODE={"asgi" if asgi else "wsgi"}')
+
+    # event loop uvicorn-воркера сам держит много соединений - по воркеру на процессор,
+    # синхронным воркерам нужен запас процессов на время ожидания ввода-вывода
+    by_cpu = cpus if kind == 'uvicorn' else 2 * cpus + 1
+    worker_memory_mb = int(env.get('GUNICORN_WORKER_MEMORY_MB', WORKER_MEMORY_MB))
+    by_memory = (memory_mb - MASTER_MEMORY_MB) // worker_memory_mb if memory_mb else by_cpu
+    workers = int(env.get('GUNICORN_WORKERS') or max(1, min(by_cpu, by_memory)))
+
+    if kind == 'gthread':
+        # воркеров меньше, чем позволяют процессоры (не хватает памяти) - недостающее добираем потоками
+        threads = int(env.get('GUNICORN_THREADS') or min(16, 4 * math.ceil(by_cpu / workers)))
+    else:
+        threads = 1
+
+    max_requests = int(env.get('GUNICORN_MAX_REQUESTS', 1000))
+
+    return {
+        'cpus': cpus,
+        'memory_mb': memory_mb,
+        'worker_class': WORKER_CLASSES[kind],
+        'workers': workers,
+        'threads': threads,
+        'wsgi_app': 'shop.asgi:application' if asgi else 'shop.wsgi:application',
+        'bind': env.get('GUNICORN_BIND', '0.0.0.0:8000'),
+        'preload_app': bool(int(env.get('GUNICORN_PRELOAD', 1))),
+        # перезапуск воркера после max_requests (+ случайно до jitter) против утечек памяти,
+        # разброс не дает всем воркерам перезапуститься одновременно
+        'max_requests': max_requests,
+        'max_requests_jitter': int(env.get('GUNICORN_MAX_REQUESTS_JITTER', max_requests // 10)),
+        # дольше keepalive_timeout upstream в nginx (60 с), чтобы соединение закрывал nginx, а не gunicorn
+        'keepalive': int(env.get('GUNICORN_KEEPALIVE', 75)),
+        'timeout': int(env.get('GUNICORN_TIMEOUT', 30)),
+        'graceful_timeout': int(env.get('GUNICORN_GRACEFUL_TIMEOUT', 30)),
+    }
+
+
+# все имена верхнего уровня gunicorn читает как свои настройки, поэтому результат не называется config
+tuned = autotune()
+
+wsgi_app = tuned['wsgi_app']
+bind = tuned['bind']
+worker_class = tuned['worker_class']
+workers = tuned['workers']
+threads = tuned['threads']
+preload_app = tuned['preload_app']
+max_requests = tuned['max_requests']
+max_requests_jitter = tuned['max_requests_jitter']
+keepalive = tuned['keepalive']
+timeout = tuned['timeout']
+graceful_timeout = tuned['graceful_timeout']
+
+
+def on_starting(server):
+    """ Итоговая конфигурация (с учетом аргументов командной строки) в лог запуска """
+    cfg = server.cfg
+    memory = f'{tuned["memory_mb"]} МБ' if tuned['memory_mb'] else 'без лимита'
+    print(f'Gunicorn: CPU {tuned["cpus"]}, память {memory}', flush=True)
+    for name in (
+        'wsgi_app', 'bind', 'worker_class_str', 'workers', 'threads', 'preload_app',
+        'max_requests', 'max_requests_jitter', 'keepalive', 'timeout', 'graceful_timeout',
+    ):
+        print(f'  {name} = {getattr(cfg, name)}', flush=True)
+
+
+def pre_fork(server, worker):
+    """
+    При preload_app приложение загружено в мастере: соединения с базой, пул psycopg_pool
+    и соединения кеша, открытые при импорте, закрываются до fork, иначе воркеры делили бы сокеты мастера
+    """
+    if not server.cfg.preload_app:
+        return
+
+    from django.db import connections
+    from django.core.cache import caches
+
+    for connection in connections.all(initialized_only=True):
+        connection.close()
+        if hasattr(connection, 'close_pool'):
+            connection.close_pool()
+    caches.close_all()
+
+
+def post_fork(server, worker):
+    """ Счетчик подключений (/admin/db/) ведется каждым воркером с нуля """
+    if server.cfg.preload_app:
+        from shop.db import connects
+        connects.clear()
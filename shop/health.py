@@ -0,0 +1,88 @@
+import logging
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.db.migrations.executor import MigrationExecutor
+from django.http import JsonResponse
+
+from .replica import replica_alias
+
+
+logger = logging.getLogger('logs')
+
+LIVE_PATH = '/health/live/'
+READY_PATH = '/health/ready/'
+
+# миграции проверяются до первого успеха: пока процесс жив, схема уже не отстанет от кода
+_migrated = False
+
+
+def check_database(alias: str) -> bool:
+    try:
+        with connections[alias].cursor() as cursor:
+            cursor.execute('SELECT 1')
+        return True
+    except DatabaseError as e:
+        logger.warning(f'Готовность: база {alias} недоступна: {e}')
+        return False
+
+
+def check_migrations() -> bool:
+    global _migrated
+
+    if not _migrated:
+        executor = MigrationExecutor(connections[DEFAULT_DB_ALIAS])
+        _migrated = not executor.migration_plan(executor.loader.graph.leaf_nodes())
+
+    return _migrated
+
+
+def readiness() -> dict:
+    """ Проверки готовности принимать трафик: база (и реплика) отвечает, все миграции применены """
+    checks = {'database': check_database(DEFAULT_DB_ALIAS)}
+
+    alias = replica_alias()
+    if alias:
+        checks['replica'] = check_database(alias)
+
+    checks['migrations'] = checks['database'] and check_migrations()
+
+    return checks
+
+
+def ready_response(checks: dict) -> JsonResponse:
+    ready = all(checks.values())
+    return JsonResponse({'status': 'ok' if ready else 'unavailable', 'checks': checks}, status=200 if ready else 503)
+
+
+class HealthCheckMiddleware:
+    """
+    Проверки для оркестратора, первым в MIDDLEWARE: ответ до проверки хоста (ALLOWED_HOSTS),
+    сессий и остальных middleware.
+    /health/live/ - процесс отвечает (без обращения к базе), /health/ready/ - можно направлять трафик
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        if request.path == LIVE_PATH:
+            return JsonResponse({'status': 'ok'})
+        if request.path == READY_PATH:
+            return ready_response(readiness())
+
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        if request.path == LIVE_PATH:
+            return JsonResponse({'status': 'ok'})
+        if request.path == READY_PATH:
+            return ready_response(await sync_to_async(readiness)())
+
+        return await self.get_response(request)
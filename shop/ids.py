@@ -0,0 +1,61 @@
+import os
+import re
+import time
+import secrets
+import threading
+
+
+# base32 Крокфорда: без I, L, O, U, строки сортируются так же, как числа
+ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+RANDOM_BITS = 80
+ID_RE = re.compile(r'[0-7][0-9A-HJKMNP-TV-Z]{25}')
+
+_lock = threading.Lock()
+_last_ms = 0
+_last_random = 0
+
+
+def _reset():
+    """ После fork дочерний процесс начинает со своей случайной части, а не продолжает родительскую """
+    global _last_ms, _last_random
+    _last_ms = _last_random = 0
+
+
+os.register_at_fork(after_in_child=_reset)
+
+
+def new_id() -> str:
+    """
+    Монотонный сортируемый идентификатор из 26 символов (формат ULID): 48 бит миллисекунд + 80 случайных бит.
+    В пределах процесса идентификаторы строго возрастают (в одну миллисекунду случайная часть увеличивается на 1),
+    между процессами и воркерами уникальность обеспечивает случайная часть.
+    """
+    global _last_ms, _last_random
+
+    with _lock:
+        ms = time.time_ns() // 1_000_000
+        if ms <= _last_ms:
+            ms, random = _last_ms, _last_random + 1
+            if random >> RANDOM_BITS:
+                ms, random = ms + 1, secrets.randbits(RANDOM_BITS)
+        else:
+            random = secrets.randbits(RANDOM_BITS)
+        _last_ms, _last_random = ms, random
+
+    value = ms << RANDOM_BITS | random
+
+    return ''.join(ALPHABET[(value >> shift) & 31] for shift in range(125, -1, -5))
+
+
+def id_timestamp(value: str) -> float:
+    """ Время создания идентификатора (unix time в секундах) """
+    number = 0
+    for char in value.upper():
+        number = number * 32 + ALPHABET.index(char)
+
+    return (number >> RANDOM_BITS) / 1000
+
+
+def is_id(value: str) -> bool:
+    """ Строка похожа на идентификатор new_id (без учета регистра) """
+    return bool(ID_RE.fullmatch(value.strip().upper()))
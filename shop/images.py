@@ -0,0 +1,14 @@
+import base64
+from django.core.files.base import ContentFile
+
+
+def decode_base64_image(data: str) -> tuple:
+    """ Расширение и файл из строки "data:image/png;base64,..." или голого base64 (тогда jpg) """
+    if ';base64,' in data:
+        format, imgstr = data.split(';base64,')
+        ext = format.split('/')[-1]
+    else:
+        imgstr = data
+        ext = 'jpg'
+
+    return ext, ContentFile(base64.b64decode(imgstr))
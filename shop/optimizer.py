@@ -0,0 +1,121 @@
+from django.db.models import Prefetch, QuerySet
+from graphql.language import FieldNode, FragmentSpreadNode, InlineFragmentNode
+from graphene.utils.str_converters import to_snake_case
+
+
+def selection_tree(info, path=()) -> dict:
+    """
+    Дерево запрошенных полей текущего резолвера: {'name': {}, 'category': {'name': {}}}.
+    Фрагменты раскрываются, path позволяет спуститься внутрь обертки (например ('edges', 'node')).
+    """
+    tree = {}
+    for node in info.field_nodes:
+        _merge(tree, _collect(node.selection_set, info.fragments))
+
+    for name in path:
+        tree = tree.get(name, {})
+
+    return tree
+
+
+def _collect(selection_set, fragments) -> dict:
+    tree = {}
+    if selection_set is None:
+        return tree
+
+    for selection in selection_set.selections:
+        if isinstance(selection, FieldNode):
+            name = selection.name.value
+            if name.startswith('__'):
+                continue
+            _merge(tree, {to_snake_case(name): _collect(selection.selection_set, fragments)})
+        elif isinstance(selection, FragmentSpreadNode):
+            fragment = fragments.get(selection.name.value)
+            if fragment is not None:
+                _merge(tree, _collect(fragment.selection_set, fragments))
+        elif isinstance(selection, InlineFragmentNode):
+            _merge(tree, _collect(selection.selection_set, fragments))
+
+    return tree
+
+
+def _merge(target: dict, source: dict):
+    for name, sub in source.items():
+        _merge(target.setdefault(name, {}), sub)
+
+
+def model_fields(model) -> dict:
+    """ Поля модели по именам, под которыми их отдает DjangoObjectType (обратные связи - по accessor) """
+    fields = {f.name: f for f in model._meta.concrete_fields}
+    fields.update({f.name: f for f in model._meta.many_to_many})
+    fields.update({rel.get_accessor_name(): rel for rel in model._meta.related_objects})
+
+    return fields
+
+
+def _plan(model, tree: dict, prefix: str = ''):
+    """ Списки only/select_related/prefetch_related для поддерева выборки модели """
+    fields = model_fields(model)
+    only = {f'{prefix}{model._meta.pk.name}'}
+    select, prefetch = [], []
+    exact = True
+
+    for name, sub in tree.items():
+        field = fields.get(name)
+
+        if field is None:
+            # поле без прямого соответствия в модели - не знаем, что ему нужно, грузим модель целиком
+            exact = False
+            continue
+
+        if not field.is_relation:
+            only.add(f'{prefix}{name}')
+        elif field.many_to_one or (field.one_to_one and field.concrete):
+            only.add(f'{prefix}{name}')
+            select.append(f'{prefix}{name}')
+            sub_only, sub_select, sub_prefetch, sub_exact = _plan(field.related_model, sub, f'{prefix}{name}__')
+            only |= sub_only
+            select += sub_select
+            prefetch += sub_prefetch
+            exact = exact and sub_exact
+        elif field.one_to_one:
+            select.append(f'{prefix}{name}')
+            sub_only, sub_select, sub_prefetch, sub_exact = _plan(field.related_model, sub, f'{prefix}{name}__')
+            only |= sub_only | {f'{prefix}{name}__{field.field.name}'}
+            select += sub_select
+            prefetch += sub_prefetch
+            exact = exact and sub_exact
+        else:
+            queryset = optimize_queryset(field.related_model._default_manager.all(), sub, keep=_back_reference(field))
+            prefetch.append(Prefetch(f'{prefix}{name}', queryset=queryset))
+
+    return only, select, prefetch, exact
+
+
+def _back_reference(field):
+    """ Поле связанной модели, без которого prefetch_related не разложит объекты по родителям """
+    if field.one_to_many:
+        return {field.field.name}
+    return set()
+
+
+def optimize_queryset(queryset: QuerySet, tree: dict, keep=()) -> QuerySet:
+    """ Добавляет к queryset ровно те select_related/prefetch_related/only, которые нужны дереву полей """
+    only, select, prefetch, exact = _plan(queryset.model, tree)
+
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    if exact:
+        queryset = queryset.only(*(only | set(keep)))
+
+    return queryset
+
+
+def optimize(queryset: QuerySet, info, path=(), keep=()) -> QuerySet:
+    """
+    Оптимизация queryset корневого резолвера по запрошенным в GraphQL полям.
+    keep - поля, которые нужны помимо выборки (например, ключ сортировки для курсоров).
+    """
+    return optimize_queryset(queryset, selection_tree(info, path), keep=keep)
@@ -0,0 +1,174 @@
+import json
+import base64
+import binascii
+import datetime
+from functools import reduce
+from django.db.models import Q, QuerySet
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    """ DjangoJSONEncoder обрезает время до миллисекунд, для ключа нужна полная точность """
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def encode_cursor(values: list) -> str:
+    """ Непрозрачный курсор из значений ключа сортировки последней строки """
+    raw = json.dumps(values, cls=CursorEncoder, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str):
+    """ Значения ключа из курсора или None, если курсор битый """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError, binascii.Error):
+        return None
+
+    return values if isinstance(values, list) else None
+
+
+class KeysetPage:
+    """ Страница keyset-пагинации: без COUNT(*) и OFFSET, переходы только вперед/назад по курсору """
+    def __init__(self, object_list: list, has_next: bool, has_previous: bool, ordering: tuple):
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self.ordering = ordering
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self) -> bool:
+        return self._has_next
+
+    def has_previous(self) -> bool:
+        return self._has_previous
+
+    def has_other_pages(self) -> bool:
+        return self._has_next or self._has_previous
+
+    def cursor_for(self, obj) -> str:
+        return encode_cursor([getattr(obj, field.lstrip('-')) for field in self.ordering])
+
+    @property
+    def next_cursor(self):
+        return self.cursor_for(self.object_list[-1]) if self._has_next and self.object_list else None
+
+    @property
+    def previous_cursor(self):
+        return self.cursor_for(self.object_list[0]) if self._has_previous and self.object_list else None
+
+
+class KeysetPaginator:
+    """
+    Пагинация по ключу сортировки, например ('-created_at', '-pk') или ('pk',).
+    Последнее поле ключа должно быть уникальным, поля ключа не должны содержать NULL.
+    """
+    def __init__(self, queryset: QuerySet, per_page: int, ordering=('-created_at', '-pk')):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = tuple(ordering)
+
+    def _seek(self, values: list, backward: bool) -> Q:
+        """ Условие "строго после курсора" в порядке сортировки (или "строго до" при backward) """
+        conditions = []
+        for i, field in enumerate(self.ordering):
+            name = field.lstrip('-')
+            descending = field.startswith('-') != backward
+            equal = {f.lstrip('-'): v for f, v in zip(self.ordering[:i], values[:i])}
+            conditions.append(Q(**equal, **{f'{name}__{"lt" if descending else "gt"}': values[i]}))
+
+        return reduce(lambda a, b: a | b, conditions)
+
+    def _field(self, name: str):
+        """ Поле модели (или аннотации) из ключа сортировки """
+        meta = self.queryset.model._meta
+        if name == 'pk':
+            return meta.pk
+        try:
+            return meta.get_field(name)
+        except FieldDoesNotExist:
+            return self.queryset.query.annotations[name].output_field
+
+    def _decode(self, cursor: str):
+        """ Значения ключа из курсора, приведенные к типам полей, или None, если курсор битый или чужой """
+        values = decode_cursor(cursor)
+
+        if values is None or len(values) != len(self.ordering):
+            return None
+
+        try:
+            values = [self._field(field.lstrip('-')).to_python(value) for field, value in zip(self.ordering, values)]
+        except (ValidationError, TypeError, ValueError):
+            return None
+
+        # поля ключа не содержат NULL, курсор с null - подделка
+        return None if any(value is None for value in values) else values
+
+    def _query(self, after, before):
+        """ Выборка на страницу + 1 строку (признак следующей страницы), курсор и направление """
+        values = self._decode(after or before) if (after or before) else None
+
+        backward = not after and bool(before) and values is not None
+        ordering = self.ordering
+
+        if backward:
+            ordering = tuple(f[1:] if f.startswith('-') else f'-{f}' for f in ordering)
+
+        qs = self.queryset.order_by(*ordering)
+
+        if values is not None:
+            qs = qs.filter(self._seek(values, backward))
+
+        return qs[:self.per_page + 1], values, backward
+
+    def _page(self, rows: list, values, backward: bool) -> KeysetPage:
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        if backward:
+            rows.reverse()
+            return KeysetPage(rows, has_next=True, has_previous=has_more, ordering=self.ordering)
+
+        return KeysetPage(rows, has_next=has_more, has_previous=values is not None, ordering=self.ordering)
+
+    def get_page(self, after=None, before=None) -> KeysetPage:
+        """ Страница после курсора after, до курсора before или первая страница """
+        qs, values, backward = self._query(after, before)
+
+        return self._page(list(qs), values, backward)
+
+    async def aget_page(self, after=None, before=None) -> KeysetPage:
+        """ get_page для async-контроллеров (async ORM) """
+        qs, values, backward = self._query(after, before)
+
+        return self._page([obj async for obj in qs], values, backward)
+
+
+def connection_from_page(connection_type, page: KeysetPage):
+    """ Relay-соединение (edges/pageInfo) из keyset-страницы для GraphQL """
+    from graphene.relay import PageInfo
+
+    edges = [connection_type.Edge(node=obj, cursor=page.cursor_for(obj)) for obj in page]
+
+    return connection_type(
+        edges=edges,
+        page_info=PageInfo(
+            has_next_page=page.has_next(),
+            has_previous_page=page.has_previous(),
+            start_cursor=edges[0].cursor if edges else None,
+            end_cursor=edges[-1].cursor if edges else None,
+        ),
+    )
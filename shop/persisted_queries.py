@@ -0,0 +1,135 @@
+import os
+import json
+import hashlib
+import threading
+from functools import lru_cache
+from collections import OrderedDict
+from django.conf import settings
+from graphql import BREAK, GraphQLError, specified_rules, validate
+from graphql.validation import ValidationRule
+from graphene_django.settings import graphene_settings
+
+
+def query_hash(query: str) -> str:
+    """ Идентификатор операции - sha256 ее текста (как в Apollo persisted queries) """
+    return hashlib.sha256(query.encode()).hexdigest()
+
+
+def requested_hash(request, data) -> str | None:
+    """ Хеш из extensions.persistedQuery.sha256Hash тела запроса или GET-параметра extensions """
+    extensions = request.GET.get('extensions') or data.get('extensions')
+
+    if isinstance(extensions, str):
+        try:
+            extensions = json.loads(extensions)
+        except ValueError:
+            return None
+
+    if not isinstance(extensions, dict):
+        return None
+
+    persisted = extensions.get('persistedQuery')
+
+    return persisted.get('sha256Hash') if isinstance(persisted, dict) else None
+
+
+class PersistedQueryRegistry:
+    """ Зарегистрированные операции {хеш: текст}, хранятся в JSON-файле GRAPHQL_PERSISTED_QUERIES_FILE """
+    def __init__(self, path, queries: dict = None):
+        self.path = path
+        self.queries = queries or {}
+
+    def __contains__(self, digest: str) -> bool:
+        return digest in self.queries
+
+    def __len__(self):
+        return len(self.queries)
+
+    def get(self, digest: str):
+        return self.queries.get(digest)
+
+    def register(self, query: str) -> str:
+        digest = query_hash(query)
+        self.queries[digest] = query
+        return digest
+
+    def save(self):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump(dict(sorted(self.queries.items())), f, ensure_ascii=False, indent=2)
+            f.write('\n')
+
+
+@lru_cache(maxsize=4)
+def _load_registry(path: str, mtime: float) -> PersistedQueryRegistry:
+    with open(path, encoding='utf-8') as f:
+        return PersistedQueryRegistry(path, json.load(f))
+
+
+def get_registry() -> PersistedQueryRegistry:
+    """ Реестр операций: файл читается один раз и перечитывается только после изменения """
+    path = str(settings.GRAPHQL_PERSISTED_QUERIES_FILE)
+    try:
+        mtime = os.stat(path).st_mtime
+    except FileNotFoundError:
+        return PersistedQueryRegistry(path)
+
+    return _load_registry(path, mtime)
+
+
+class DocumentCache:
+    """ Ограниченный LRU результатов валидации документов в памяти процесса """
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            value = self.data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self.lock:
+            self.data[key] = value
+            self.data.move_to_end(key)
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+            self.hits = self.misses = 0
+
+
+documents = DocumentCache(settings.GRAPHQL_DOCUMENT_CACHE_SIZE)
+
+
+class CachedValidationRule(ValidationRule):
+    """
+    Валидация документа с LRU по хешу текста запроса: правила спецификации выполняются
+    только при первой встрече операции, дальше ошибки (или их отсутствие) берутся из documents
+    """
+    def enter_document(self, node, *args):
+        digest = query_hash(node.loc.source.body)
+        errors = documents.get(digest)
+        if errors is None:
+            errors = validate(self.context.schema, node, specified_rules, graphene_settings.MAX_VALIDATION_ERRORS)
+            documents.set(digest, errors)
+
+        for error in errors:
+            self.report_error(error)
+
+        return BREAK
+
+
+def persisted_query_error(message: str, code: str) -> GraphQLError:
+    return GraphQLError(message, extensions={'code': code})
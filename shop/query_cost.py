@@ -0,0 +1,140 @@
+from dataclasses import dataclass
+from graphql import (
+    FieldNode, FragmentSpreadNode, InlineFragmentNode, FragmentDefinitionNode, GraphQLError,
+    Undefined, get_named_type, get_nullable_type, get_operation_ast, is_list_type, value_from_ast,
+)
+
+
+# аргументы, ограничивающие длину списка
+SIZE_ARGUMENTS = ('first', 'last', 'limit')
+
+
+@dataclass
+class QueryCost:
+    """ Оценка запроса: глубина вложенности и число объектов, которые он может загрузить """
+    depth: int = 0
+    cost: int = 0
+
+    def as_dict(self) -> dict:
+        return {'depth': self.depth, 'cost': self.cost}
+
+
+class QueryCostAnalyzer:
+    """
+    Статическая оценка операции до выполнения.
+    Каждое поле-объект стоит столько, сколько объектов может вернуть: множитель списка
+    берется из first/last/limit (литерал, переменная или значение по умолчанию), иначе default_list_size,
+    и умножается на множители всех списков выше по дереву. Скалярные поля бесплатны.
+    """
+    def __init__(self, schema, fragments: dict, variables: dict = None, default_list_size: int = 20):
+        self.schema = schema
+        self.fragments = fragments
+        self.variables = variables or {}
+        self.default_list_size = default_list_size
+
+    def analyze(self, operation) -> QueryCost:
+        root = self.schema.get_root_type(operation.operation)
+        result = QueryCost()
+        if root is not None:
+            result.cost = self._cost(root, operation.selection_set, 1, 1, result, set())
+
+        return result
+
+    def _fields(self, selection_set, visited: set):
+        """ Поля выборки с раскрытыми фрагментами (циклические фрагменты отсекает валидация, здесь - visited) """
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                yield selection
+            elif isinstance(selection, InlineFragmentNode):
+                yield from self._fields(selection.selection_set, visited)
+            elif isinstance(selection, FragmentSpreadNode):
+                name = selection.name.value
+                fragment = self.fragments.get(name)
+                if fragment is not None and name not in visited:
+                    yield from self._fields(fragment.selection_set, visited | {name})
+
+    def _cost(self, parent_type, selection_set, multiplier: int, depth: int, result: QueryCost, visited: set) -> int:
+        total = 0
+        fields = getattr(parent_type, 'fields', {})
+
+        for node in self._fields(selection_set, visited):
+            name = node.name.value
+            if name.startswith('__'):
+                # интроспекция ограничена размером схемы
+                continue
+
+            result.depth = max(result.depth, depth)
+            field = fields.get(name)
+            if field is None or node.selection_set is None:
+                continue
+
+            size = self._list_size(parent_type, name, field, node)
+            child = get_named_type(field.type)
+            child_multiplier = multiplier * size
+
+            if hasattr(child, 'fields'):
+                total += child_multiplier
+                total += self._cost(child, node.selection_set, child_multiplier, depth + 1, result, visited)
+            else:
+                # абстрактные типы: берем самую дорогую из возможных реализаций
+                total += child_multiplier + max(
+                    (self._cost(t, node.selection_set, child_multiplier, depth + 1, result, visited)
+                     for t in self.schema.get_possible_types(child)),
+                    default=0,
+                )
+
+        return total
+
+    def _list_size(self, parent_type, name: str, field, node: FieldNode) -> int:
+        for argument in SIZE_ARGUMENTS:
+            if argument in field.args:
+                value = self._argument(field.args[argument], argument, node)
+                if value is not None:
+                    return max(int(value), 0)
+
+        if not is_list_type(get_nullable_type(field.type)):
+            return 1
+
+        if name == 'edges' and parent_type.name.endswith('Connection'):
+            # размер edges уже учтен в first самого соединения
+            return 1
+
+        return self.default_list_size
+
+    def _argument(self, definition, name: str, node: FieldNode):
+        value = definition.default_value
+        for argument in node.arguments:
+            if argument.name.value == name:
+                value = value_from_ast(argument.value, definition.type, self.variables)
+
+        return None if value is Undefined else value
+
+
+def analyze_query(schema, document, operation_name=None, variables=None, default_list_size=20) -> QueryCost:
+    """ Оценка операции operation_name (или единственной операции) документа """
+    fragments = {d.name.value: d for d in document.definitions if isinstance(d, FragmentDefinitionNode)}
+    operation = get_operation_ast(document, operation_name)
+
+    if operation is None:
+        return QueryCost()
+
+    return QueryCostAnalyzer(schema, fragments, variables, default_list_size).analyze(operation)
+
+
+def check_query_cost(query_cost: QueryCost, max_depth: int, max_cost: int):
+    """ Ошибки GraphQL для запроса сверх бюджета (пустой список, если укладывается) """
+    errors = []
+    extensions = {'code': 'QUERY_TOO_COMPLEX', **query_cost.as_dict()}
+
+    if max_depth and query_cost.depth > max_depth:
+        errors.append(GraphQLError(
+            f'Глубина запроса {query_cost.depth} превышает допустимую {max_depth}',
+            extensions={**extensions, 'maxDepth': max_depth},
+        ))
+    if max_cost and query_cost.cost > max_cost:
+        errors.append(GraphQLError(
+            f'Стоимость запроса {query_cost.cost} превышает допустимую {max_cost}',
+            extensions={**extensions, 'maxCost': max_cost},
+        ))
+
+    return errors
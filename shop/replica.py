@@ -0,0 +1,151 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+# модели, которые всегда читаются с основной базы (сессия только что созданного входа не должна пропасть)
+PRIMARY_ONLY_APPS = {'sessions'}
+
+_reads = ContextVar('replica_reads', default=False)
+_request_state = ContextVar('replica_request_state', default=None)
+
+
+class RequestState:
+    """ Состояние запроса для роутера: была ли запись и закреплен ли запрос за основной базой """
+    __slots__ = ('pinned', 'wrote')
+
+    def __init__(self, pinned: bool):
+        self.pinned = pinned
+        self.wrote = False
+
+
+def replica_alias() -> str | None:
+    """ Алиас реплики для чтения или None, если реплик нет (DATABASE_REPLICAS пуст) """
+    replicas = settings.DATABASE_REPLICAS
+    return replicas[0] if replicas else None
+
+
+@contextmanager
+def read_replica():
+    """ Чтения внутри блока идут на реплику (если она есть и запрос не закреплен за основной базой) """
+    token = _reads.set(True)
+    try:
+        yield
+    finally:
+        _reads.reset(token)
+
+
+@contextmanager
+def read_primary():
+    """ Чтения внутри блока идут на основную базу, даже если контроллер читает с реплики """
+    token = _reads.set(False)
+    try:
+        yield
+    finally:
+        _reads.reset(token)
+
+
+def use_replica(model) -> bool:
+    if not _reads.get() or model._meta.app_label in PRIMARY_ONLY_APPS:
+        return False
+
+    state = _request_state.get()
+    if state is not None and (state.pinned or state.wrote):
+        # read-your-writes: после записи запрос и следующие за ним REPLICA_PIN_SECONDS читают с основной базы
+        return False
+
+    # внутри транзакции читаем то же, что пишем
+    return not connections[DEFAULT_DB_ALIAS].in_atomic_block
+
+
+class ReplicaRouter:
+    """
+    Роутер чтения на реплику.
+    На реплику уходят только чтения внутри read_replica() (каталог, списки админки, GraphQL-запросы каталога),
+    все записи и остальные чтения - на основную базу.
+    """
+    def db_for_read(self, model, **hints):
+        alias = replica_alias()
+        if alias and use_replica(model):
+            return alias
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = _request_state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # реплика - копия основной базы, связи между объектами из них допустимы
+        return True
+
+
+class ReplicaMiddleware:
+    """
+    Закрепление клиента за основной базой после записи.
+    Если за запрос что-то писалось (POST, мутация, вход), ответ ставит cookie на REPLICA_PIN_SECONDS,
+    и пока она жива, чтения клиента не уходят на отстающую реплику.
+    Стоит перед SessionMiddleware, чтобы видеть и запись сессии.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        state = RequestState(pinned=settings.REPLICA_PIN_COOKIE in request.COOKIES)
+        token = _request_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_state.reset(token)
+
+        return self.pin(state, response)
+
+    async def __acall__(self, request):
+        state = RequestState(pinned=settings.REPLICA_PIN_COOKIE in request.COOKIES)
+        token = _request_state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_state.reset(token)
+
+        return self.pin(state, response)
+
+    @staticmethod
+    def pin(state: RequestState, response):
+        if state.wrote and replica_alias():
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE,
+                '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                secure=settings.SESSION_COOKIE_SECURE,
+                httponly=True,
+                samesite='Lax',
+            )
+
+        return response
+
+
+class ReplicaReadMixin:
+    """ Примесь для только читающих контроллеров: GET и HEAD выполняются с чтением с реплики """
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return super().dispatch(request, *args, **kwargs)
+        if self.view_is_async:
+            return self._adispatch(request, *args, **kwargs)
+        with read_replica():
+            return super().dispatch(request, *args, **kwargs)
+
+    async def _adispatch(self, request, *args, **kwargs):
+        with read_replica():
+            return await super().dispatch(request, *args, **kwargs)
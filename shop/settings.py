@@ -40,23 +40,29 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
+    'shop',
     'orders',
     'products',
     'management',
     'accounts',
+    'jobs',
     'rest_framework',
     'graphene_django',
     'graphql_jwt.refresh_token.apps.RefreshTokenConfig',
 ]
 
 MIDDLEWARE = [
+    'shop.health.HealthCheckMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'shop.replica.ReplicaMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'orders.middleware.CartMiddleware',
 ]
 
 ROOT_URLCONF = 'shop.urls'
@@ -78,11 +84,21 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'shop.wsgi.application'
+ASGI_APPLICATION = 'shop.asgi.application'
+
+# ASGI-режим (SERVER_MODE=asgi в docker_entrypoint.py): главная, карточка товара, корзина и /graphql/
+# обслуживаются async-контроллерами, остальные контроллеры Django выполняет в потоке
+ASYNC_VIEWS = bool(int(config('ASYNC_VIEWS', default=0)))
 
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Соединения: либо пул psycopg_pool в каждом процессе (DB_POOL=1), либо постоянное соединение
+# на DB_CONN_MAX_AGE секунд с проверкой перед повторным использованием (Django не дает совмещать)
+
+DB_POOL = bool(int(config('DB_POOL', default=0)))
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
@@ -91,9 +107,46 @@ DATABASES = {
         'PASSWORD': config('DB_PASSWORD'),
         'HOST': config('DB_HOST'),
         'PORT': config('DB_PORT'),
+        'CONN_MAX_AGE': 0 if DB_POOL else config('DB_CONN_MAX_AGE', default=60, cast=int),
+        'CONN_HEALTH_CHECKS': bool(int(config('DB_CONN_HEALTH_CHECKS', default=1))),
+        'OPTIONS': {},
     }
 }
 
+if DB_POOL:
+    from psycopg_pool import ConnectionPool
+
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': config('DB_POOL_MIN_SIZE', default=1, cast=int),
+        'max_size': config('DB_POOL_MAX_SIZE', default=4, cast=int),
+        'timeout': config('DB_POOL_TIMEOUT', default=10, cast=float),
+        'max_idle': config('DB_POOL_MAX_IDLE', default=300, cast=float),
+        'max_lifetime': config('DB_POOL_MAX_LIFETIME', default=1800, cast=float),
+        # соединение проверяется при выдаче из пула, разорванные заменяются новыми
+        'check': ConnectionPool.check_connection,
+    }
+
+# Реплика для чтения (DB_REPLICA_HOST): каталог, списки админки и GraphQL-запросы каталога.
+# После записи клиент на REPLICA_PIN_SECONDS читает с основной базы (cookie REPLICA_PIN_COOKIE)
+
+DATABASE_REPLICAS = []
+
+if config('DB_REPLICA_HOST', default=''):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': config('DB_REPLICA_HOST'),
+        'PORT': config('DB_REPLICA_PORT', default=DATABASES['default']['PORT']),
+        'OPTIONS': {**DATABASES['default']['OPTIONS']},
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS = ['replica']
+
+DATABASE_ROUTERS = ['shop.replica.ReplicaRouter']
+
+REPLICA_PIN_COOKIE = 'db_pin'
+REPLICA_PIN_SECONDS = config('REPLICA_PIN_SECONDS', default=15, cast=int)
+REPLICA_GRAPHQL_FIELDS = ['allCats', 'allProducts', 'productsConnection', 'searchProducts', 'allReviews']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -159,7 +212,63 @@ if config('EMAIL_HOST_USER') and config('EMAIL_HOST_PASSWORD'):
 else:
     EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 
-CART_SESSION_ID = 'cart'
+# Фоновые задачи (python manage.py runworker), JOBS_EAGER - выполнять сразу в процессе запроса
+
+JOBS_EAGER = bool(int(config('JOBS_EAGER', default=0)))
+JOBS_LOCK_TIMEOUT = config('JOBS_LOCK_TIMEOUT', default=300, cast=int)
+
+# Корзина: cookie - вся корзина в подписанной cookie, cache - в кеше CART_CACHE_ALIAS,
+# redis - в Redis по CART_REDIS_URL (memory:// - заменитель в памяти процесса)
+
+CART_BACKEND = config('CART_BACKEND', default='cookie')
+CART_COOKIE_NAME = 'cart'
+CART_COOKIE_AGE = config('CART_COOKIE_AGE', default=60 * 60 * 24 * 30, cast=int)
+CART_CACHE_ALIAS = 'default'
+CART_REDIS_URL = config('CART_REDIS_URL', default='redis://redis:6379/2')
+
+PRODUCT_SEARCH_CONFIGS = ['russian', 'english']
+
+# Cache
+# locmem - отдельный кеш в каждом процессе, для нескольких воркеров gunicorn нужен file или redis
+
+CACHE_BACKEND = config('CACHE_BACKEND', default='locmem')
+
+if CACHE_BACKEND == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': config('CACHE_LOCATION', default='redis://redis:6379/1'),
+        }
+    }
+elif CACHE_BACKEND == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': config('CACHE_LOCATION', default=str(BASE_DIR / 'cache')),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'shop',
+        }
+    }
+
+CATALOG_CACHE_TIMEOUT = config('CATALOG_CACHE_TIMEOUT', default=300, cast=int)
+
+# GraphQL: бюджет запроса, проверяется до выполнения (0 - без ограничения)
+
+GRAPHQL_MAX_DEPTH = config('GRAPHQL_MAX_DEPTH', default=8, cast=int)
+GRAPHQL_MAX_COST = config('GRAPHQL_MAX_COST', default=5000, cast=int)
+GRAPHQL_DEFAULT_LIST_SIZE = config('GRAPHQL_DEFAULT_LIST_SIZE', default=20, cast=int)
+GRAPHQL_COST_LOG_THRESHOLD = config('GRAPHQL_COST_LOG_THRESHOLD', default=1000, cast=int)
+
+# GraphQL: persisted queries (реестр - python manage.py register_queries) и LRU результатов валидации документов
+
+GRAPHQL_PERSISTED_QUERIES_FILE = config('GRAPHQL_PERSISTED_QUERIES_FILE', default=str(BASE_DIR / 'persisted_queries.json'))
+GRAPHQL_PERSISTED_QUERIES_ONLY = bool(int(config('GRAPHQL_PERSISTED_QUERIES_ONLY', default=0)))
+GRAPHQL_DOCUMENT_CACHE_SIZE = config('GRAPHQL_DOCUMENT_CACHE_SIZE', default=256, cast=int)
 
 GRAPHENE = {
     'SCHEMA': 'shop.schema.schema',
@@ -4,9 +4,17 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': ':memory:',  # Используем базу в памяти
-    }
+    },
+    # отдельная база вместо реплики: в нее ничего не реплицируется, то есть она "отстает" всегда.
+    # Роутер ее не использует, пока тест не включит DATABASE_REPLICAS = ['replica']
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+    },
 }
 
+DATABASE_REPLICAS = []
+
 MIDDLEWARE = [mw for mw in MIDDLEWARE if mw not in [
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
@@ -16,3 +24,9 @@ MIDDLEWARE = [mw for mw in MIDDLEWARE if mw not in [
 DEBUG = False
 
 EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+    }
+}
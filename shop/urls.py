@@ -18,18 +18,22 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf.urls.static import static
 from django.conf import settings
-from graphene_django.views import GraphQLView
 
-from products.views import HomeView
+from products.views import AsyncHomeView, HomeView
+from .async_views import AsyncShopGraphQLView
+from .views import ShopGraphQLView
+
+home_view = AsyncHomeView if settings.ASYNC_VIEWS else HomeView
+graphql_view = AsyncShopGraphQLView if settings.ASYNC_VIEWS else ShopGraphQLView
 
 urlpatterns = [
     path('administrator/', admin.site.urls),
-    path("graphql/", GraphQLView.as_view(graphiql=True)),
+    path("graphql/", graphql_view.as_view(graphiql=True)),
     path('accounts/', include('accounts.urls')),
     path('admin/', include('management.urls')),
     path('products/', include('products.urls')),
     path('orders/', include('orders.urls')),
-    path('', HomeView.as_view(), name='home'),
+    path('', home_view.as_view(), name='home'),
 ]
 
 
@@ -0,0 +1,116 @@
+import logging
+from contextlib import nullcontext
+from django.conf import settings
+from graphql import ExecutionContext, ExecutionResult, FieldNode, OperationType
+from graphene_django.views import GraphQLView
+
+from .replica import read_replica
+from .query_cost import QueryCostAnalyzer, check_query_cost
+from .persisted_queries import CachedValidationRule, get_registry, persisted_query_error, query_hash, requested_hash
+
+
+logger = logging.getLogger('api_logs')
+
+
+class ShopExecutionContext(ExecutionContext):
+    """
+    Выполнение провалидированной операции: оценка стоимости до первого резолвера,
+    запросы сверх бюджета не выполняются, оценка уходит в extensions.cost.
+    Запросы списков каталога (REPLICA_GRAPHQL_FIELDS) читают с реплики.
+    """
+    query_cost = None
+
+    def execute_operation(self, operation, root_value):
+        analyzer = QueryCostAnalyzer(
+            self.schema, self.fragments, self.variable_values, default_list_size=settings.GRAPHQL_DEFAULT_LIST_SIZE,
+        )
+        self.query_cost = analyzer.analyze(operation)
+        cost_errors = check_query_cost(self.query_cost, settings.GRAPHQL_MAX_DEPTH, settings.GRAPHQL_MAX_COST)
+        name = operation.name.value if operation.name else 'anonymous'
+
+        if cost_errors:
+            logger.warning(f'Запрос {name} отклонен: стоимость {self.query_cost.cost}, глубина {self.query_cost.depth}')
+            self.errors.extend(cost_errors)
+            return None
+
+        if self.query_cost.cost >= settings.GRAPHQL_COST_LOG_THRESHOLD:
+            logger.warning(f'Дорогой запрос {name}: стоимость {self.query_cost.cost}, глубина {self.query_cost.depth}')
+
+        with read_replica() if reads_from_replica(operation) else nullcontext():
+            return super().execute_operation(operation, root_value)
+
+    def build_response(self, data, errors) -> ExecutionResult:
+        result = super().build_response(data, errors)
+        if self.query_cost is not None:
+            result.extensions = {'cost': self.query_cost.as_dict()}
+        return result
+
+
+def reads_from_replica(operation) -> bool:
+    """ Запрос (не мутация), все корневые поля которого - списки каталога из REPLICA_GRAPHQL_FIELDS """
+    if operation.operation != OperationType.QUERY:
+        return False
+
+    return all(
+        isinstance(node, FieldNode) and node.name.value in settings.REPLICA_GRAPHQL_FIELDS
+        for node in operation.selection_set.selections
+    )
+
+
+class ShopGraphQLView(GraphQLView):
+    """
+    GraphQLView с persisted queries и оценкой стоимости запроса.
+    Вместо текста клиент может прислать extensions.persistedQuery.sha256Hash зарегистрированной операции,
+    результат валидации документа берется из LRU процесса (CachedValidationRule).
+    При GRAPHQL_PERSISTED_QUERIES_ONLY выполняются только зарегистрированные операции.
+    Стоимость, реплика и extensions.cost - в ShopExecutionContext, остальное делает GraphQLView.
+    """
+    execution_context_class = ShopExecutionContext
+    validation_rules = (CachedValidationRule,)
+    extensions = None
+
+    def get_graphql_params(self, request, data):
+        """ Текст зарегистрированной операции, если клиент прислал только ее хеш """
+        query, variables, operation_name, id = super().get_graphql_params(request, data)
+
+        digest = requested_hash(request, data)
+        if digest and not query:
+            query = get_registry().get(digest)
+
+        return query, variables, operation_name, id
+
+    def execute_graphql_request(self, request, data, query, variables, operation_name, show_graphiql=False):
+        self.extensions = None
+
+        error = self.check_persisted_query(request, data, query)
+        if error is not None:
+            return ExecutionResult(errors=[error])
+
+        result = super().execute_graphql_request(request, data, query, variables, operation_name, show_graphiql)
+        if result is not None:
+            self.extensions = result.extensions
+
+        return result
+
+    @staticmethod
+    def check_persisted_query(request, data, query):
+        """ Ошибка persisted query (неизвестный хеш, хеш не совпал с текстом, незарегистрированный запрос) или None """
+        digest = requested_hash(request, data)
+
+        if digest and not query:
+            return persisted_query_error('PersistedQueryNotFound', 'PERSISTED_QUERY_NOT_FOUND')
+
+        if digest and query_hash(query) != digest:
+            return persisted_query_error('provided sha does not match query', 'BAD_PERSISTED_QUERY')
+
+        if query and settings.GRAPHQL_PERSISTED_QUERIES_ONLY and query_hash(query) not in get_registry():
+            logger.warning(f'Незарегистрированный запрос {query_hash(query)} отклонен')
+            return persisted_query_error('Разрешены только зарегистрированные запросы', 'PERSISTED_QUERY_REQUIRED')
+
+        return None
+
+    def json_encode(self, request, d, pretty=False):
+        """ GraphQLView не отдает extensions результата - добавляем их в ответ """
+        if self.extensions:
+            d = {**d, 'extensions': self.extensions}
+        return super().json_encode(request, d, pretty)
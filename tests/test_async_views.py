@@ -0,0 +1,93 @@
+import asyncio
+import importlib
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.management import call_command
+from django.urls import clear_url_caches
+
+import orders.urls
+import products.urls
+import shop.urls
+from orders.cart_store import SignedCookieCartStore
+from products.models import Product
+
+
+@pytest.fixture(autouse=True)
+def async_views(settings, db):
+    """ Маршруты с ASYNC_VIEWS=1 (как в SERVER_MODE=asgi) и данные каталога """
+    call_command('loaddata', 'db_fixtures.json')
+
+    settings.ASYNC_VIEWS = True
+    for module in (products.urls, orders.urls, shop.urls):
+        importlib.reload(module)
+    clear_url_caches()
+
+    yield
+
+    settings.ASYNC_VIEWS = False
+    for module in (products.urls, orders.urls, shop.urls):
+        importlib.reload(module)
+    clear_url_caches()
+
+
+def test_async_catalog_and_product(async_client):
+    """ Проверка главной и карточки товара через ASGI-обработчик """
+    response = async_to_sync(async_client.get)('/')
+    assert response.status_code == 200
+    assert response.resolver_match.func.view_class.__name__ == 'AsyncHomeView'
+    assert len(response.context['page_obj']) > 0
+
+    product = Product.objects.filter(is_active=True).first()
+    response = async_to_sync(async_client.get)(f'/products/{product.slug}/')
+    assert response.status_code == 200
+    assert response.context['object'] == product
+
+    response = async_to_sync(async_client.get)('/products/no-such-product/')
+    assert response.status_code == 404
+
+
+def test_async_cart(async_client):
+    """ Проверка добавления в корзину и страницы корзины через ASGI-обработчик (cookie корзины ставит CartMiddleware) """
+    product = Product.objects.filter(is_active=True, stock__gt=0).first()
+
+    response = async_to_sync(async_client.post)(
+        '/orders/cart/', {'product_id': product.pk, 'action': 'inc', 'next_page': '/orders/cart/'},
+    )
+    assert response.status_code == 302
+    assert 'cart' in response.cookies
+
+    async_client.cookies['cart'] = response.cookies['cart'].value
+    response = async_to_sync(async_client.get)('/orders/cart/')
+    assert response.status_code == 200
+    assert response.context['cart'].in_cart(product) == 1
+
+
+def test_async_views_load_cart_outside_event_loop(async_client, monkeypatch):
+    """ Проверка, что async-контроллеры читают хранилище корзины (cache/redis - блокирующий ввод-вывод) не в event loop """
+    in_loop = []
+    load = SignedCookieCartStore.load
+
+    def spy(self, request):
+        try:
+            asyncio.get_running_loop()
+            in_loop.append(True)
+        except RuntimeError:
+            in_loop.append(False)
+        return load(self, request)
+
+    monkeypatch.setattr(SignedCookieCartStore, 'load', spy)
+    product = Product.objects.filter(is_active=True).first()
+
+    assert async_to_sync(async_client.get)('/orders/cart/').status_code == 200
+    assert async_to_sync(async_client.get)(f'/products/{product.slug}/').status_code == 200
+    assert in_loop == [False, False]
+
+
+def test_async_graphql(async_client):
+    """ Проверка GraphQL-запроса через ASGI-обработчик """
+    response = async_to_sync(async_client.post)(
+        '/graphql/', {'query': '{ allCats { name } }'}, content_type='application/json',
+    )
+    assert response.status_code == 200
+    assert response.json()['data']['allCats']
@@ -0,0 +1,36 @@
+import pytest
+from django.contrib.auth.models import User
+
+from shop.db import pool_stats
+
+
+@pytest.mark.django_db
+def test_connection_stats_endpoint(client):
+    """ Проверка метрик соединений: соединение переиспользуется между запросами, а не открывается заново """
+    client.force_login(User.objects.create_superuser(username='superuser', email='super@user.ru', password='12345'))
+
+    first = client.get('/admin/db/').json()
+    second = client.get('/admin/db/').json()
+    default = second['databases']['default']
+
+    assert default['open'] is True
+    assert default['connects'] == first['databases']['default']['connects']
+    assert 'pool' not in default
+
+    client.logout()
+    assert client.get('/admin/db/').status_code != 200
+
+
+def test_pool_stats():
+    """ Проверка метрик пула: открытые соединения отдельно от выдач, ошибки выдачи - request_errors """
+    class Pool:
+        def get_stats(self):
+            return {'pool_size': 2, 'connections_num': 3, 'requests_num': 40, 'requests_wait_ms': 80, 'requests_errors': 1}
+
+    stats = pool_stats(Pool())
+
+    assert stats['connections_opened'] == 3
+    assert stats['checkouts'] == 40
+    assert stats['avg_wait_ms'] == 2
+    assert stats['request_errors'] == 1
+    assert 'timeouts' not in stats
@@ -0,0 +1,50 @@
+import pytest
+
+from shop.gunicorn_conf import autotune
+
+
+def cgroup(tmp_path, cpu_max: str = 'max 100000', memory_max: str = 'max'):
+    """ Файлы cgroup v2 контейнера с заданными лимитами """
+    (tmp_path / 'cpu.max').write_text(cpu_max)
+    (tmp_path / 'memory.max').write_text(memory_max)
+    return tmp_path
+
+
+def test_workers_follow_container_limits(tmp_path, monkeypatch):
+    """ Проверка расчета воркеров и потоков по лимитам CPU и памяти контейнера """
+    monkeypatch.setattr('shop.gunicorn_conf.available_cpus', lambda: 16)
+
+    config = autotune({}, cgroup(tmp_path, cpu_max='200000 100000'))
+    assert config['cpus'] == 2
+    assert config['worker_class'] == 'gthread'
+    assert (config['workers'], config['threads']) == (5, 4)
+
+    # 512 МБ: памяти хватает на 2 воркера вместо 5, недостающее добирается потоками
+    config = autotune({}, cgroup(tmp_path, cpu_max='200000 100000', memory_max=str(512 * 2 ** 20)))
+    assert (config['workers'], config['threads']) == (2, 12)
+
+    config = autotune({'SERVER_MODE': 'asgi'}, cgroup(tmp_path, cpu_max='150000 100000'))
+    assert config['worker_class'] == 'uvicorn_worker.UvicornWorker'
+    assert config['wsgi_app'] == 'shop.asgi:application'
+    assert (config['workers'], config['threads']) == (2, 1)
+
+    # без лимита CPU - по доступным процессорам
+    assert autotune({'GUNICORN_WORKER_CLASS': 'sync'}, cgroup(tmp_path))['workers'] == 33
+
+
+def test_env_overrides(tmp_path):
+    """ Проверка явных значений из окружения и отказа при несовместимом классе воркера """
+    config = autotune({
+        'GUNICORN_WORKERS': '7',
+        'GUNICORN_THREADS': '2',
+        'GUNICORN_MAX_REQUESTS': '500',
+        'GUNICORN_PRELOAD': '0',
+    }, cgroup(tmp_path))
+    assert (config['workers'], config['threads']) == (7, 2)
+    assert (config['max_requests'], config['max_requests_jitter']) == (500, 50)
+    assert config['preload_app'] is False
+
+    with pytest.raises(ValueError):
+        autotune({'SERVER_MODE': 'asgi', 'GUNICORN_WORKER_CLASS': 'gthread'}, cgroup(tmp_path))
+    with pytest.raises(ValueError):
+        autotune({'GUNICORN_WORKER_CLASS': 'gevent'}, cgroup(tmp_path))
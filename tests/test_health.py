@@ -0,0 +1,31 @@
+import pytest
+from django.db import OperationalError
+
+import shop.health
+
+
+def test_liveness_without_database(client):
+    """ Проверка liveness: ответ без доступа к базе (тест без django_db) и для любого Host (адрес пода) """
+    response = client.get('/health/live/', HTTP_HOST='10.0.0.7:8000')
+
+    assert response.status_code == 200
+    assert response.json() == {'status': 'ok'}
+    assert not response.cookies
+
+
+@pytest.mark.django_db
+def test_readiness(client, monkeypatch):
+    """ Проверка readiness: готов при доступной базе и примененных миграциях, иначе 503 """
+    monkeypatch.setattr(shop.health, '_migrated', False)
+
+    response = client.get('/health/ready/', HTTP_HOST='10.0.0.7:8000')
+    assert response.status_code == 200
+    assert response.json()['checks'] == {'database': True, 'migrations': True}
+
+    def unavailable():
+        raise OperationalError('connection refused')
+
+    monkeypatch.setattr(shop.health.connections['default'], 'cursor', unavailable)
+    response = client.get('/health/ready/')
+    assert response.status_code == 503
+    assert response.json() == {'status': 'unavailable', 'checks': {'database': False, 'migrations': False}}
@@ -0,0 +1,23 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from shop.ids import new_id, id_timestamp, is_id
+
+
+def test_ids_are_monotonic_and_unique():
+    """ Проверка генератора: в пределах процесса идентификаторы строго возрастают и не повторяются """
+    ids = [new_id() for _ in range(10000)]
+
+    assert ids == sorted(ids)
+    assert len(set(ids)) == len(ids)
+    assert all(len(value) == 26 and is_id(value) for value in ids)
+    assert abs(id_timestamp(ids[-1]) - time.time()) < 5
+
+
+def test_ids_are_unique_across_threads():
+    """ Проверка отсутствия повторов при генерации из нескольких потоков """
+    with ThreadPoolExecutor(8) as pool:
+        ids = [value for chunk in pool.map(lambda _: [new_id() for _ in range(1000)], range(8)) for value in chunk]
+
+    assert len(set(ids)) == len(ids)
+    assert not is_id('1_1729500000')
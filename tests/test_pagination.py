@@ -0,0 +1,59 @@
+import pytest
+from django.core.management import call_command
+
+from products.models import Product
+from shop.pagination import KeysetPaginator, encode_cursor
+
+
+@pytest.fixture(autouse=True, scope='function')
+def load_db_fixtures(db):
+    """Подключаем фикстуры к каждому тесту"""
+    call_command('loaddata', 'db_fixtures.json')
+
+
+@pytest.mark.django_db
+def test_keyset_pages_forward_and_back():
+    """ Проверка обхода страниц по курсору вперед и назад """
+    Product.objects.update(created_at='2025-10-21T00:00:00Z')
+    expected = list(Product.objects.order_by('-created_at', '-pk').values_list('pk', flat=True))
+    paginator = KeysetPaginator(Product.objects.all(), 5)
+
+    page = paginator.get_page()
+    seen = [p.pk for p in page]
+    pages = [page]
+    while page.has_next():
+        page = paginator.get_page(after=page.next_cursor)
+        seen += [p.pk for p in page]
+        pages.append(page)
+
+    assert seen == expected
+    assert not pages[0].has_previous()
+
+    previous = paginator.get_page(before=pages[-1].previous_cursor)
+
+    assert [p.pk for p in previous] == [p.pk for p in pages[-2]]
+    assert previous.has_next()
+
+
+@pytest.mark.django_db
+def test_keyset_broken_cursor_gives_first_page():
+    """ Проверка того, что битый курсор отдает первую страницу """
+    paginator = KeysetPaginator(Product.objects.all(), 5, ordering=('pk',))
+
+    page = paginator.get_page(after='not-a-cursor')
+
+    assert [p.pk for p in page] == [1, 2, 3, 4, 5]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('values', [['garbage', 1], ['2025-10-21T00:00:00Z', 'x'], [None, 1], [[1], {'a': 1}], [1]])
+def test_keyset_cursor_with_bad_values_gives_first_page(client, values):
+    """ Проверка того, что корректно закодированный курсор с неверными значениями отдает первую страницу, а не 500 """
+    paginator = KeysetPaginator(Product.objects.all(), 5, ordering=('-created_at', '-pk'))
+    first = [p.pk for p in paginator.get_page()]
+
+    assert [p.pk for p in paginator.get_page(after=encode_cursor(values))] == first
+    assert [p.pk for p in paginator.get_page(before=encode_cursor(values))] == first
+
+    response = client.get('/', {'after': encode_cursor(values)})
+    assert response.status_code == 200
@@ -0,0 +1,53 @@
+import pytest
+from django.core.management import call_command
+
+from shop.persisted_queries import documents, query_hash
+
+
+QUERY = 'query AllCats { allCats { name } }\n'
+
+
+@pytest.fixture
+def registered(settings, tmp_path):
+    """ Реестр во временной папке с одной зарегистрированной операцией """
+    settings.GRAPHQL_PERSISTED_QUERIES_FILE = str(tmp_path / 'persisted_queries.json')
+    (tmp_path / 'all_cats.graphql').write_text(QUERY)
+    call_command('register_queries', str(tmp_path))
+    documents.clear()
+    return query_hash(QUERY)
+
+
+def post(client, body):
+    return client.post('/graphql/', data=body, content_type='application/json')
+
+
+@pytest.mark.django_db
+def test_persisted_query_by_hash(client, registered):
+    """ Проверка выполнения зарегистрированной операции по хешу и кеша результата валидации """
+    body = {'extensions': {'persistedQuery': {'version': 1, 'sha256Hash': registered}}}
+
+    for _ in range(3):
+        json_data = post(client, body).json()
+        assert json_data['data'] == {'allCats': []}
+
+    assert documents.misses == 1
+    assert documents.hits == 2
+
+    json_data = post(client, {'extensions': {'persistedQuery': {'version': 1, 'sha256Hash': 'f' * 64}}}).json()
+    assert json_data['errors'][0]['extensions']['code'] == 'PERSISTED_QUERY_NOT_FOUND'
+
+    json_data = post(client, {'query': '{ allCats { slug } }', 'extensions': body['extensions']}).json()
+    assert json_data['errors'][0]['extensions']['code'] == 'BAD_PERSISTED_QUERY'
+
+
+@pytest.mark.django_db
+def test_persisted_queries_only_mode(client, settings, registered):
+    """ Проверка режима allow-list: незарегистрированный текст отклоняется, зарегистрированный выполняется """
+    settings.GRAPHQL_PERSISTED_QUERIES_ONLY = True
+
+    response = post(client, {'query': '{ allCats { slug } }'})
+    assert response.status_code == 400
+    assert response.json()['errors'][0]['extensions']['code'] == 'PERSISTED_QUERY_REQUIRED'
+
+    response = post(client, {'query': QUERY})
+    assert response.json()['data'] == {'allCats': []}
@@ -0,0 +1,42 @@
+import pytest
+from graphql import parse
+
+from shop.schema import schema
+from shop.query_cost import analyze_query
+
+
+def test_query_cost_uses_list_arguments():
+    """ Проверка оценки: множители списков берутся из first/limit, переменных и значений по умолчанию """
+    document = parse("""
+        query ($n: Int) {
+          allProducts(limit: $n) { name category { name } reviews { comment } }
+          productsConnection { edges { node { name } } }
+        }
+    """)
+    result = analyze_query(schema.graphql_schema, document, variables={'n': 3}, default_list_size=10)
+
+    # allProducts: 3 + category 3 + reviews 3*10; productsConnection(first=20): 1*20 + edges 20 + node 20
+    assert result.cost == 3 + 3 + 30 + 20 + 20 + 20
+    assert result.depth == 4
+
+
+@pytest.mark.django_db
+def test_graphql_rejects_expensive_query(client, settings):
+    """ Проверка отказа в запросе сверх бюджета и отчета о стоимости в extensions """
+    settings.GRAPHQL_MAX_DEPTH = 4
+    query = """
+        query {
+          allCats { productSet { reviews { user { username } } } }
+        }
+    """
+    response = client.post("/graphql/", data={"query": query}, content_type="application/json")
+    json_data = response.json()
+    assert response.status_code == 400
+    assert "data" not in json_data
+    assert json_data["errors"][0]["extensions"]["code"] == "QUERY_TOO_COMPLEX"
+    assert json_data["extensions"]["cost"]["depth"] == 5
+
+    response = client.post("/graphql/", data={"query": "query { allCats { name } }"}, content_type="application/json")
+    json_data = response.json()
+    assert json_data["data"]["allCats"] == []
+    assert json_data["extensions"]["cost"] == {"depth": 2, "cost": 20}
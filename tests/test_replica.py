@@ -0,0 +1,69 @@
+import pytest
+from django.core.cache import cache
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+from django.core.management import call_command
+from django.contrib.auth.models import User
+
+from products.models import Category, Product
+
+
+# без обертки теста в транзакцию: внутри транзакции роутер читает с основной базы
+pytestmark = pytest.mark.django_db(transaction=True, databases=['default', 'replica'])
+
+
+@pytest.fixture(autouse=True)
+def lagging_replica(settings):
+    """ Данные есть только в основной базе: вторая SQLite-база играет реплику, которая еще не догнала """
+    call_command('loaddata', 'db_fixtures.json', database='default')
+    settings.DATABASE_REPLICAS = ['replica']
+
+
+def test_catalog_reads_from_replica(client):
+    """ Проверка чтения каталога и GraphQL-запросов каталога с реплики, остальных запросов - с основной базы """
+    assert Product.objects.count() > 0
+    assert Product.objects.using('replica').count() == 0
+
+    response = client.get('/')
+    assert list(response.context['page_obj']) == []
+
+    response = client.post('/graphql/', data={'query': '{ allCats { name } }'}, content_type='application/json')
+    assert response.json()['data']['allCats'] == []
+
+    pk = Category.objects.first().pk
+    response = client.post('/graphql/', data={'query': f'{{ catById(pk: {pk}) {{ name }} }}'}, content_type='application/json')
+    assert response.json()['data']['catById']['name']
+
+
+def test_reads_stick_to_primary_after_write(client):
+    """ Проверка read-your-writes: после записи клиент читает с основной базы, пока жива cookie """
+    User.objects.create_user(username='Test', email='test@bk.ru', password='12345')
+
+    response = client.post('/accounts/login/', {'email': 'test@bk.ru', 'password': '12345'})
+    assert 'db_pin' in response.cookies
+
+    response = client.get('/')
+    assert len(response.context['page_obj']) > 0
+    assert 'db_pin' not in response.cookies
+
+    del client.cookies['db_pin']
+    response = client.get('/')
+    assert list(response.context['page_obj']) == []
+
+
+def test_catalog_cache_is_filled_from_primary(client, settings):
+    """ Проверка, что страница каталога попадает в общий кеш с основной базы, а не с отстающей реплики """
+    settings.CACHES = {
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'replica-catalog'},
+    }
+    cache.clear()
+
+    first = client.get('/')
+    assert len(first.context['page_obj']) > 0
+
+    with CaptureQueriesContext(connections['replica']) as replica_queries:
+        second = client.get('/')
+
+    assert [p.pk for p in second.context['page_obj']] == [p.pk for p in first.context['page_obj']]
+    assert not [q for q in replica_queries if 'products_product' in q['sql']]
+    cache.clear()
@@ -0,0 +1,40 @@
+import pytest
+from django.db import connection
+from django.core.management import call_command
+from django.test.utils import CaptureQueriesContext
+from django.contrib.sessions.backends.db import SessionStore
+
+from products.models import Product, Category
+from orders import cart_store
+
+
+@pytest.fixture(autouse=True, scope='function')
+def load_db_fixtures(db):
+    """Подключаем фикстуры к каждому тесту"""
+    call_command('loaddata', 'db_fixtures.json')
+
+
+@pytest.mark.django_db
+def test_catalog_crawl_does_not_touch_sessions(client, monkeypatch):
+    """ Проверка обхода каталога анонимом: ни одной записи сессии, корзина читается не больше раза за запрос """
+    saves, loads = [], []
+    original_save, original_load = SessionStore.save, cart_store.SignedCookieCartStore.load
+    monkeypatch.setattr(SessionStore, 'save', lambda self, *a, **kw: saves.append(1) or original_save(self, *a, **kw))
+    monkeypatch.setattr(cart_store.SignedCookieCartStore, 'load', lambda self, r: loads.append(1) or original_load(self, r))
+
+    urls = ['/', '/products/', '/products/guides/', '/?sort=a_price', '/?q=hops']
+    urls += [f'/?category={c.pk}' for c in Category.objects.all()]
+    urls += [f'/products/{p.slug}/' for p in Product.objects.all()]
+
+    with CaptureQueriesContext(connection) as ctx:
+        for url in urls:
+            assert client.get(url).status_code == 200
+        response = client.get('/')
+        if response.context['page_obj'].has_next():
+            assert client.get(f'/?after={response.context["page_obj"].next_cursor}').status_code == 200
+
+    assert saves == []
+    assert not any('django_session' in q['sql'] for q in ctx.captured_queries)
+    assert len(loads) <= len(urls) + 2
+    assert 'sessionid' not in client.cookies
+    assert 'cart' not in client.cookies